@@ -1,19 +1,25 @@
+import json
 import uvicorn
 import logging
 
 from fastapi import FastAPI, HTTPException, Body, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi import status
+from typing import Dict, Any, Iterator
 
 from backend.src.backend.pydantic_models import DataIngestionQuery
-from backend.src.constants import ENDPOINT_URLS
+from backend.src.constants import ENDPOINT_URLS, RESPONSE_CACHE_CONFIG
 from backend.src.data_ingestion.data_pipeline import DataPipeline
+from backend.src.data_ingestion.response_cache import enable_response_cache, disable_response_cache
+from backend.src.data_ingestion.scheduler import get_source_scheduler
 from backend.src.backend.user_authentication.utils import validate_request
 
 app = FastAPI()
 logger = logging.getLogger('uvicorn.error')
 
 data_pipeline = DataPipeline()
+response_cache = enable_response_cache(**RESPONSE_CACHE_CONFIG) # Identical queries skip the arXiv and Semantic Scholar APIs
 
 @app.post(
         ENDPOINT_URLS['data_ingestion']['path'], 
@@ -32,6 +38,8 @@ async def data_ingestion(query_request:DataIngestionQuery=Body(...)) -> JSONResp
         all_entries = data_pipeline.run(user_queries=query_request.user_queries)
         success_message = f"Successfully called data ingestion pipeline, collected {len(all_entries)} entries."
         logger.info(success_message)
+        logger.info(f"Response cache statistics: {response_cache.get_stats()}")
+        logger.info(f"Source scheduler statistics: {get_source_scheduler().get_stats()}")
         return JSONResponse(
                             content={
                                 "all_entries": all_entries, 
@@ -41,6 +49,55 @@ async def data_ingestion(query_request:DataIngestionQuery=Body(...)) -> JSONResp
                             )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+def stream_lines(first_entry:Dict[str, Any], entries:Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Yields each processed entry as a line of NDJSON as soon as it is ready.
+
+    Args:
+        first_entry (Dict[str, Any]): The first entry, processed before the response started.
+        entries (Iterator[Dict[str, Any]]): The stream of the other entries (see DataPipeline.run_stream).
+    """
+    num_entries = 1
+    yield json.dumps(first_entry) + "\n"
+    for entry in entries:
+        num_entries += 1
+        yield json.dumps(entry) + "\n"
+    logger.info(f"Successfully streamed {num_entries} entries.")
+
+@app.post(
+        ENDPOINT_URLS['data_ingestion']['additional_paths']['stream'],
+        description="Handles data ingestion from various sources, streaming the entries as NDJSON as soon as each is processed.",
+        dependencies=[Depends(validate_request)]
+        )
+async def data_ingestion_stream(query_request:DataIngestionQuery=Body(...)) -> StreamingResponse:
+    """
+    Handles data ingestion from various sources, returning one JSON entry per line as soon
+    as it is processed. Entries are processed as each source and query is fetched, so that
+    the first entries can be indexed while the others are still fetched and processed.
+
+    Args:
+        query_request (DataIngestionQuery): The request containing the user queries.
+    """
+    try:
+        logger.info(f"Calling streaming data ingestion pipeline with queries: {query_request.user_queries}")
+        entries = data_pipeline.run_stream(user_queries=query_request.user_queries)
+        # Wait for the first entry before the response starts, so that errors of the first fetches are still reported with an error status
+        first_entry = await run_in_threadpool(next, entries, None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if first_entry is None:
+        return StreamingResponse(iter(()), media_type="application/x-ndjson")
+    # The (blocking) fetches and processing run in a thread pool as the response is sent
+    return StreamingResponse(stream_lines(first_entry, entries), media_type="application/x-ndjson")
+
+@app.on_event("shutdown")
+def close_response_cache() -> None:
+    """
+    Stops the fetch thread pools of the data pipeline, waits for the running response refreshes and closes the response cache.
+    """
+    data_pipeline.close()
+    disable_response_cache()
     
 if __name__ == "__main__":
     uvicorn.run("app_data_ingestion:app", host="0.0.0.0", port=8001, reload=True)
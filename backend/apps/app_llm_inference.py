@@ -5,9 +5,10 @@ import os
 from fastapi import FastAPI, HTTPException, Body, Depends, Request
 from fastapi.responses import JSONResponse
 from fastapi import status
-from backend.src.backend.pydantic_models import LLMInferenceQuery
-from backend.src.constants import ENDPOINT_URLS
+from backend.src.backend.pydantic_models import LLMInferenceQuery, LLMInferenceBatchQuery
+from backend.src.constants import ENDPOINT_URLS, BATCH_INFERENCE_CONFIG
 from backend.src.RAG.query_responder import QueryResponder
+from backend.src.RAG.memory import close_mongo_clients
 from backend.src.backend.user_authentication.utils import validate_request,verify_token
 from dotenv import load_dotenv
 import traceback
@@ -22,7 +23,7 @@ if "OPENAI_API_KEY" not in os.environ:
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 if not OPENAI_API_KEY:
     raise EnvironmentError("openai key not set in environment.")
-query_responder = QueryResponder(openai_api_key=OPENAI_API_KEY,session_id="foo")
+query_responder = QueryResponder(openai_api_key=OPENAI_API_KEY) # Shared between requests, the session ID is passed per call
 logger.info(query_responder)
 
 @app.post(
@@ -51,13 +52,13 @@ async def llm_inference(request:Request,inference_request:LLMInferenceQuery=Body
                 detail="User ID not found in token."
             )
         
-        query_responder.session_id = username
-        logger.info(query_responder.session_id)
+        logger.info(f"Session ID: {username}")
         responses = inference_request.responses
         user_query = inference_request.user_query
-        final_answer = query_responder.generate_answer(
+        final_answer = await query_responder.agenerate_answer(
                                                         retrieved_docs=responses, 
-                                                        user_query=user_query
+                                                        user_query=user_query,
+                                                        session_id=username
                                                         ) # Use original user query
         logger.info(final_answer)
         return JSONResponse(content={"answer": final_answer}, status_code=status.HTTP_200_OK)
@@ -65,5 +66,61 @@ async def llm_inference(request:Request,inference_request:LLMInferenceQuery=Body
         logger.error(f"Error in llm_inference: {traceback.format_exc()}") 
         raise HTTPException(status_code=500, detail=str(e))
     
+@app.post(
+        f"{ENDPOINT_URLS['llm_inference']['path']}/batch", 
+        description="Handles LLM inference for several questions at once.",
+        dependencies=[Depends(validate_request)]
+        )
+async def llm_inference_batch(request:Request,batch_request:LLMInferenceBatchQuery=Body(...)) -> JSONResponse:
+    """
+    Answers several questions concurrently (e.g., for evaluation runs and reports).
+    - Questions that fail or time out get an error instead of an answer, the others are still answered.
+
+    Args:
+        batch_request (LLMInferenceBatchQuery): The questions along with their retrieved documents.
+    """
+    try:
+        payload = verify_token(request)
+        username = payload.get("user_id")
+        if not username:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User ID not found in token."
+            )
+        
+        num_requests = len(batch_request.requests)
+        if num_requests > BATCH_INFERENCE_CONFIG["max_batch_size"]:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {BATCH_INFERENCE_CONFIG['max_batch_size']} questions per batch, got {num_requests}."
+            )
+        logger.info(f"Answering a batch of {num_requests} questions for {username}")
+
+        session_id = username if batch_request.use_history else None
+        results = await query_responder.agenerate_answers_batch(
+                                                                requests=[
+                                                                    {
+                                                                        "user_query": inference_request.user_query,
+                                                                        "retrieved_docs": inference_request.responses,
+                                                                        "session_id": session_id
+                                                                    }
+                                                                    for inference_request in batch_request.requests
+                                                                ],
+                                                                timeout=batch_request.timeout
+                                                                )
+        return JSONResponse(content={"answers": results}, status_code=status.HTTP_200_OK)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in llm_inference_batch: {traceback.format_exc()}") 
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.on_event("shutdown")
+def close_mongo_connections() -> None:
+    """
+    Writes the cached chat messages and closes the connection pool of the chat history database.
+    """
+    close_mongo_clients()
+
 if __name__ == "__main__":
     uvicorn.run("app_llm_inference:app", host="0.0.0.0", port=8003, reload=True)
@@ -5,15 +5,18 @@ import requests
 
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi import status
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from backend.src.RAG.retrieval_engine import RetrievalEngine
+from backend.src.RAG.indexing_queue import IndexingQueue, IndexingTicket
 from backend.src.RAG.query_generator import ResearchQueryGenerator
+from backend.src.RAG.memory import close_mongo_clients
 from backend.src.RAG.utils import clean_search_query
 from backend.src.backend.pydantic_models import ResearchPaperQuery
-from backend.src.constants import ENDPOINT_URLS
+from backend.src.constants import ENDPOINT_URLS, INDEXING_QUEUE_CONFIG
 from backend.src.backend.user_authentication.utils import validate_request,verify_token
 import traceback 
 
@@ -29,13 +32,40 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 if not OPENAI_API_KEY:
     raise EnvironmentError("openai key not set in environment.")
 
-query_generator = ResearchQueryGenerator(openai_api_key=OPENAI_API_KEY,session_id="foo")
-retrieval_engine = RetrievalEngine(openai_api_key=OPENAI_API_KEY)
+query_generator = ResearchQueryGenerator(openai_api_key=OPENAI_API_KEY) # Shared between requests, the session ID is passed per call
+retrieval_engine = RetrievalEngine(openai_api_key=OPENAI_API_KEY, return_parent_documents=True, use_retrieval_cache=True)
+indexing_queue = IndexingQueue(retrieval_engine=retrieval_engine)
+
+# Warm start a new replica from a snapshot instead of re-ingesting and re-embedding everything
+CHROMA_SNAPSHOT_DIR = os.getenv("CHROMA_SNAPSHOT_DIR")
+if CHROMA_SNAPSHOT_DIR and retrieval_engine.vector_store._collection.count() == 0:
+    num_records = retrieval_engine.import_snapshot(snapshot_dir=CHROMA_SNAPSHOT_DIR)
+    logger.info(f"Imported {num_records} records from snapshot: {CHROMA_SNAPSHOT_DIR}")
 
 DATA_INGESTION_URL = f"http://{ENDPOINT_URLS['data_ingestion']['base_url']}{ENDPOINT_URLS['data_ingestion']['path']}"
 
+def wait_for_indexing(ticket:IndexingTicket) -> bool:
+    """
+    Waits for newly ingested documents to be indexed, for at most INDEXING_QUEUE_CONFIG["wait_timeout"] seconds.
+    - If the indexing takes longer, the documents already indexed are served (the others are
+      still indexed in the background).
+
+    Args:
+        ticket (IndexingTicket): The ticket of the submitted documents.
 
-def use_fast_pipeline(request:Request, additional_queries:List[str]) -> List[Dict[str, Any]]:
+    Returns:
+        bool: True if the documents were indexed in time.
+    """
+    is_done = ticket.wait(timeout=INDEXING_QUEUE_CONFIG["wait_timeout"])
+    if not is_done:
+        logger.warning(f"Indexing {ticket.num_docs} documents took more than {INDEXING_QUEUE_CONFIG['wait_timeout']} seconds, serving the documents already indexed")
+    return is_done
+
+def use_fast_pipeline(
+                    request:Request,
+                    additional_queries:List[str],
+                    metadata_filter:Optional[Dict[str, Any]]=None
+                    ) -> List[Dict[str, Any]]:
     """
     Helper function to retrieve documents using the fast pipeline.
     - By "fast" pipeline, we mean that we first attempt to retrieve documents
@@ -45,10 +75,11 @@ def use_fast_pipeline(request:Request, additional_queries:List[str]) -> List[Dic
     Args:
         request (Request): The request object containing the user query.
         additional_queries (List[str]): The additional queries generated by the query generator.
+        metadata_filter (Optional[Dict[str, Any]]): The metadata filter applied inside the vector search.
     """
     # Attempt to retrieve documents the existing database
     logger.info("Attempting to retrieve documents from the existing database")
-    responses = retrieval_engine.retrieve(user_queries=additional_queries)
+    responses = retrieval_engine.retrieve(user_queries=additional_queries, metadata_filter=metadata_filter)
 
     # Attempt to retrieve documents via data ingestion
     if responses:
@@ -65,13 +96,18 @@ def use_fast_pipeline(request:Request, additional_queries:List[str]) -> List[Dic
             logger.info("No entries could be found for this query, please try to rephrase your query.")
         else:
             docs = retrieval_engine.convert_entries_to_docs(entries=all_entries)
-            retrieval_engine.split_and_add_documents(docs=docs) # Add documents to ChromaDB (save)
+            ticket = indexing_queue.submit(docs=docs) # Add documents to ChromaDB (save) in the background
+            wait_for_indexing(ticket) # Nothing was found before, so we need to read our own writes
 
         # Attempt to retrieve the documents again (should be successful this time)
-        responses = retrieval_engine.retrieve(user_queries=additional_queries)
+        responses = retrieval_engine.retrieve(user_queries=additional_queries, metadata_filter=metadata_filter)
     return responses
 
-def use_specific_pipeline(request:Request, additional_queries:List[str]) -> List[Dict[str, Any]]:
+def use_specific_pipeline(
+                        request:Request,
+                        additional_queries:List[str],
+                        metadata_filter:Optional[Dict[str, Any]]=None
+                        ) -> List[Dict[str, Any]]:
     """
     Helper function to retrieve documents using the specific pipeline.
     - By "specific" pipeline, we mean that we always ingest new data and then
@@ -81,6 +117,7 @@ def use_specific_pipeline(request:Request, additional_queries:List[str]) -> List
     Args:
         request (Request): The request object containing the user query.
         additional_queries (List[str]): The additional queries generated by the query generator
+        metadata_filter (Optional[Dict[str, Any]]): The metadata filter applied inside the vector search.
     """
     logger.info("Searching for relevant documents...")
     data_ingestion_result = requests.post(url=DATA_INGESTION_URL, json={"user_queries": additional_queries}, headers=request.headers)
@@ -91,10 +128,11 @@ def use_specific_pipeline(request:Request, additional_queries:List[str]) -> List
         logger.info("No entries could be found for this query, please try to rephrase your query.")
     else:
         docs = retrieval_engine.convert_entries_to_docs(entries=all_entries)
-        retrieval_engine.split_and_add_documents(docs=docs)
+        ticket = indexing_queue.submit(docs=docs)
+        wait_for_indexing(ticket) # The newly ingested documents should be part of the results
     
     # Attempt to retrieve the documents again (should be successful this time)
-    responses = retrieval_engine.retrieve(user_queries=additional_queries)
+    responses = retrieval_engine.retrieve(user_queries=additional_queries, metadata_filter=metadata_filter)
     return responses
 
 @app.post(
@@ -123,32 +161,57 @@ async def retrieve_documents(request:Request, query_request:ResearchPaperQuery)
                 detail="User ID not found in token."
             )
         
-        query_generator.session_id = username
         user_input = query_request.user_query
         mode = query_request.mode
         
         logger.info(f"Using mode: {mode}")
 
+        metadata_filter = retrieval_engine.build_metadata_filter(
+                                                                year_from=query_request.year_from,
+                                                                year_to=query_request.year_to,
+                                                                sources=query_request.sources,
+                                                                categories=query_request.categories,
+                                                                min_citations=query_request.min_citations
+                                                                )
+        logger.info(f"Using metadata filter: {metadata_filter}")
+
         # Generate additional queries
-        additional_queries = query_generator.generate(user_input)
+        additional_queries = await query_generator.agenerate(user_input, session_id=username)
         print(additional_queries)
 
         if additional_queries == "ERROR":
             print("ERROR")
             return {"responses":"ERROR"}
         
+        # The pipelines make blocking calls (data ingestion, embeddings, ChromaDB), so run them off the event loop
         if mode == "fast":
-            responses = use_fast_pipeline(request=request, additional_queries=additional_queries)
+            responses = await run_in_threadpool(use_fast_pipeline, request=request, additional_queries=additional_queries, metadata_filter=metadata_filter)
         elif mode == "specific":
-            responses = use_specific_pipeline(request=request, additional_queries=additional_queries)
+            responses = await run_in_threadpool(use_specific_pipeline, request=request, additional_queries=additional_queries, metadata_filter=metadata_filter)
         else:
             raise Exception("Invalid mode specified. Please select either 'fast' or 'specific'.")
         
         logger.info(f"Responses: {responses}")
+        if retrieval_engine.retrieval_cache is not None:
+            logger.info(f"Retrieval cache statistics: {retrieval_engine.retrieval_cache.get_stats()}")
         return JSONResponse(content={"responses": responses}, status_code=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error in retrieval: {traceback.format_exc()}") 
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.on_event("shutdown")
+def shutdown_indexing_queue() -> None:
+    """
+    Commits any documents still waiting in the indexing queue before the app stops.
+    """
+    indexing_queue.close()
+
+@app.on_event("shutdown")
+def close_mongo_connections() -> None:
+    """
+    Writes the cached chat messages and closes the connection pool of the chat history database.
+    """
+    close_mongo_clients()
+
 if __name__ == "__main__":
     uvicorn.run("app_retrieval:app", host="0.0.0.0", port=8002, reload=True)
\ No newline at end of file
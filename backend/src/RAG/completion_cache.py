@@ -0,0 +1,93 @@
+import threading
+
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+
+class CompletionCache(BaseCache):
+    """
+    A local LLM completion cache, keyed by the exact rendered prompt and the model parameters.
+
+    - Passed to the chat model (e.g., `ChatOpenAI(cache=...)`), which looks it up before calling the API.
+    - Holds at most `max_size` completions, evicting the least recently used one.
+    - Also tracks how many prompt tokens of the API calls were served from the provider's
+      prompt cache, i.e., how often the stable prompt prefix was reused.
+    """
+    def __init__(self, max_size:int=256, store_completions:bool=True):
+        """
+        Initialises an empty cache.
+
+        Args:
+            max_size (int): The maximum number of cached completions.
+            store_completions (bool): Whether to store completions (if False, only the usage metrics are tracked).
+        """
+        self.max_size = max_size
+        self.store_completions = store_completions
+        self.lock = threading.Lock()
+        self.completions = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "api_calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0}
+
+    def lookup(self, prompt:str, llm_string:str) -> Optional[RETURN_VAL_TYPE]:
+        """
+        Returns the cached completion of the prompt, or None on a miss.
+
+        Args:
+            prompt (str): The serialised prompt messages.
+            llm_string (str): The serialised model parameters.
+        """
+        with self.lock:
+            if not self.store_completions:
+                return None
+            key = (prompt, llm_string)
+            if key in self.completions:
+                self.completions.move_to_end(key)
+                self.stats["hits"] += 1
+                return self.completions[key]
+            self.stats["misses"] += 1
+            return None
+
+    def update(self, prompt:str, llm_string:str, return_val:RETURN_VAL_TYPE) -> None:
+        """
+        Stores the completion of an API call and records its prompt token usage.
+
+        Args:
+            prompt (str): The serialised prompt messages.
+            llm_string (str): The serialised model parameters.
+            return_val (RETURN_VAL_TYPE): The generations returned by the model.
+        """
+        with self.lock:
+            self.stats["api_calls"] += 1
+            for generation in return_val:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.stats["prompt_tokens"] += usage.get("input_tokens", 0)
+                self.stats["cached_prompt_tokens"] += (usage.get("input_token_details") or {}).get("cache_read", 0)
+
+            if not self.store_completions:
+                return
+            self.completions[(prompt, llm_string)] = return_val
+            self.completions.move_to_end((prompt, llm_string))
+            while len(self.completions) > self.max_size:
+                self.completions.popitem(last=False)
+
+    def clear(self, **kwargs:Any) -> None:
+        """
+        Drops all cached completions.
+        """
+        with self.lock:
+            self.completions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns the cache hit rate and the share of prompt tokens served from the provider's prompt cache.
+        """
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                    **self.stats,
+                    "size": len(self.completions),
+                    "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                    "prefix_reuse_rate": (
+                                        self.stats["cached_prompt_tokens"] / self.stats["prompt_tokens"]
+                                        if self.stats["prompt_tokens"] else 0.0
+                                        )
+                    }
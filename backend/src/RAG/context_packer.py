@@ -0,0 +1,194 @@
+import re
+import tiktoken
+
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+class ContextPacker:
+    """
+    A class that packs the retrieved documents into an LLM context of bounded size.
+
+    - Tokens are counted with the tokenizer of the LLM.
+    - Near-duplicate passages (e.g., the same abstract retrieved by several query variations)
+      are removed, keeping the first one.
+    - Passages keep the retrieval order, most similar to the query first (see `RetrievalEngine.search`).
+    - If the passages do not fit into the token budget, they are added by relevance to the user
+      query (ties keep the retrieval order) until the budget is full, the passage that does not
+      fit is truncated at a sentence boundary. The packed passages keep the retrieval order.
+    """
+    def __init__(self, model_name:str="gpt-4o-mini", max_context_tokens:int=4000, duplicate_threshold:float=0.8):
+        """
+        Initialises the packer.
+
+        Args:
+            model_name (str): The LLM whose tokenizer is used to count tokens.
+            max_context_tokens (int): The maximum number of tokens of the packed context.
+            duplicate_threshold (float): The minimum Jaccard similarity (of word 3-grams) for two passages to be near-duplicates.
+        """
+        self.model_name = model_name
+        self.max_context_tokens = max_context_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.separator = "\n\n"
+        self.sentence_pattern = re.compile(r"(?<=[.!?])\s+")
+        self.word_pattern = re.compile(r"\w+")
+        self._encoding = None
+
+    @property
+    def encoding(self) -> tiktoken.Encoding:
+        """
+        The tokenizer of the LLM, loaded on first use.
+        """
+        if self._encoding is None:
+            self._encoding = tiktoken.encoding_for_model(self.model_name)
+        return self._encoding
+
+    def format_document(self, doc:Dict[str, Any], content:Optional[str]=None) -> str:
+        """
+        Formats a retrieved document for the LLM.
+
+        Args:
+            doc (Dict[str, Any]): The retrieved document.
+            content (Optional[str]): Replaces the content of the document (e.g., when truncated).
+        """
+        content = doc["page_content"] if content is None else content
+        return f"Source: {doc['metadata']['link']}\nContent: {content}"
+
+    def get_shingles(self, text:str) -> Set[Tuple[str, ...]]:
+        """
+        Returns the set of word 3-grams of a text, used to detect near-duplicates.
+
+        Args:
+            text (str): The text.
+        """
+        words = self.word_pattern.findall(text.lower())
+        if len(words) < 3:
+            return {tuple(words)}
+        return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+    def remove_duplicates(self, retrieved_docs:List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Removes near-duplicate documents, keeping the first occurrence.
+
+        Args:
+            retrieved_docs (List[Dict[str, Any]]): The retrieved documents.
+        """
+        unique_docs, unique_shingles = [], []
+        for doc in retrieved_docs:
+            shingles = self.get_shingles(doc["page_content"])
+            is_duplicate = any(
+                            len(shingles & other) / len(shingles | other) >= self.duplicate_threshold
+                            for other in unique_shingles
+                            )
+            if not is_duplicate:
+                unique_docs.append(doc)
+                unique_shingles.append(shingles)
+        return unique_docs
+
+    def rank_by_relevance(self, retrieved_docs:List[Dict[str, Any]], user_query:str) -> List[int]:
+        """
+        Returns the indices of the documents ordered by the fraction of the query terms they contain.
+        - The sort is stable, so documents with the same score keep the retrieval order.
+
+        Args:
+            retrieved_docs (List[Dict[str, Any]]): The retrieved documents.
+            user_query (str): The user query.
+        """
+        indices = list(range(len(retrieved_docs)))
+        query_terms = {word for word in self.word_pattern.findall(user_query.lower()) if len(word) > 2}
+        if not query_terms:
+            return indices
+
+        def relevance(idx:int) -> float:
+            doc_terms = set(self.word_pattern.findall(retrieved_docs[idx]["page_content"].lower()))
+            return len(query_terms & doc_terms) / len(query_terms)
+
+        return sorted(indices, key=relevance, reverse=True)
+
+    def truncate(self, doc:Dict[str, Any], max_tokens:int) -> Optional[str]:
+        """
+        Truncates a document to its leading sentences that fit into the token budget.
+
+        Args:
+            doc (Dict[str, Any]): The document to truncate.
+            max_tokens (int): The maximum number of tokens of the formatted document.
+
+        Returns:
+            Optional[str]: The formatted truncated document, or None if not even one sentence fits.
+        """
+        sentences = [sentence for sentence in self.sentence_pattern.split(doc["page_content"]) if sentence.strip()]
+        if not sentences:
+            return None
+
+        # Running count of the tokens of the leading sentences, each sentence is encoded once
+        num_tokens = len(self.encoding.encode(self.format_document(doc, content="")))
+        sentence_tokens = self.encoding.encode_batch([" " + sentence for sentence in sentences])
+        num_kept = 0
+        for tokens in sentence_tokens:
+            if num_tokens + len(tokens) > max_tokens:
+                break
+            num_tokens += len(tokens)
+            num_kept += 1
+
+        # The count is an estimate (tokens can merge across sentences), so the result is checked
+        while num_kept > 0:
+            formatted_doc = self.format_document(doc, content=" ".join(sentences[:num_kept]))
+            if len(self.encoding.encode(formatted_doc)) <= max_tokens:
+                return formatted_doc
+            num_kept -= 1
+        return None
+
+    def pack(self, retrieved_docs:List[Dict[str, Any]], user_query:Optional[str]=None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Packs the retrieved documents into a context that fits into the token budget.
+
+        Args:
+            retrieved_docs (List[Dict[str, Any]]): The retrieved documents.
+            user_query (Optional[str]): The user query, used to choose the documents by relevance when they do not fit.
+
+        Returns:
+            Tuple[str, Dict[str, Any]]: The packed context and the packing statistics (including the tokens saved).
+        """
+        if len(retrieved_docs) == 0:
+            return "", {"num_documents": 0, "num_packed": 0, "input_tokens": 0, "packed_tokens": 0, "tokens_saved": 0}
+
+        # Tokens of the unpacked context (every document, in the retrieval order)
+        formatted_docs = [self.format_document(doc) for doc in retrieved_docs]
+        separator_tokens = len(self.encoding.encode(self.separator))
+        input_tokens = sum(len(tokens) for tokens in self.encoding.encode_batch(formatted_docs))
+        input_tokens += separator_tokens * (len(formatted_docs) - 1)
+
+        docs = self.remove_duplicates(retrieved_docs)
+        formatted_docs = [self.format_document(doc) for doc in docs]
+        doc_tokens = [len(tokens) for tokens in self.encoding.encode_batch(formatted_docs)]
+
+        # Documents are only chosen by relevance when they do not all fit
+        order = list(range(len(docs)))
+        total_tokens = sum(doc_tokens) + separator_tokens * (len(docs) - 1)
+        if user_query and total_tokens > self.max_context_tokens:
+            order = self.rank_by_relevance(docs, user_query)
+
+        packed, packed_tokens, num_truncated = {}, 0, 0
+        for idx in order:
+            formatted_doc, num_tokens = formatted_docs[idx], doc_tokens[idx]
+            remaining_tokens = self.max_context_tokens - packed_tokens - (separator_tokens if packed else 0)
+            if remaining_tokens <= 0:
+                break
+            if num_tokens > remaining_tokens:
+                formatted_doc = self.truncate(docs[idx], max_tokens=remaining_tokens)
+                if formatted_doc is None:
+                    continue
+                num_tokens = len(self.encoding.encode(formatted_doc))
+                num_truncated += 1
+            packed_tokens += num_tokens + (separator_tokens if packed else 0)
+            packed[idx] = formatted_doc
+        packed = [packed[idx] for idx in sorted(packed)] # Back to the retrieval order
+
+        stats = {
+                "num_documents": len(retrieved_docs),
+                "num_duplicates": len(retrieved_docs) - len(docs),
+                "num_packed": len(packed),
+                "num_truncated": num_truncated,
+                "input_tokens": input_tokens,
+                "packed_tokens": packed_tokens,
+                "tokens_saved": input_tokens - packed_tokens
+                }
+        return self.separator.join(packed), stats
@@ -0,0 +1,83 @@
+import json
+import sqlite3
+import threading
+
+from typing import List, Optional
+from langchain_core.documents import Document
+
+class ParentDocumentStore:
+    """
+    A persistent key-value store for the parent documents (e.g., full abstracts) of the chunks
+    held in the vector store, keyed by the paper link.
+    - Backed by a single SQLite file so lookups are a primary-key read, with no embedding or vector search.
+    """
+    def __init__(self, path:str):
+        """
+        Opens (or creates) the document store.
+
+        Args:
+            path (str): The path of the SQLite file (":memory:" for a non-persistent store).
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+                                "CREATE TABLE IF NOT EXISTS parent_documents "
+                                "(key TEXT PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+                                )
+        self.connection.commit()
+
+    def mset(self, key_doc_pairs:List[tuple]) -> None:
+        """
+        Stores (or replaces) several documents in a single transaction.
+
+        Args:
+            key_doc_pairs (List[tuple]): A list of (key, Document) pairs.
+        """
+        rows = [(key, doc.page_content, json.dumps(doc.metadata)) for key, doc in key_doc_pairs]
+        with self.lock:
+            self.connection.executemany(
+                                        "INSERT OR REPLACE INTO parent_documents (key, page_content, metadata) VALUES (?, ?, ?)",
+                                        rows
+                                        )
+            self.connection.commit()
+
+    def mget(self, keys:List[str]) -> List[Optional[Document]]:
+        """
+        Fetches several documents by key.
+
+        Args:
+            keys (List[str]): The keys to fetch.
+
+        Returns:
+            List[Optional[Document]]: The documents in the same order as the keys (None for missing keys).
+        """
+        if len(keys) == 0:
+            return []
+        placeholders = ", ".join("?" for _ in keys)
+        with self.lock:
+            rows = self.connection.execute(
+                                        f"SELECT key, page_content, metadata FROM parent_documents WHERE key IN ({placeholders})",
+                                        list(keys)
+                                        ).fetchall()
+        docs = {key: Document(page_content=page_content, metadata=json.loads(metadata)) for key, page_content, metadata in rows}
+        return [docs.get(key) for key in keys]
+
+    def mdelete(self, keys:List[str]) -> None:
+        """
+        Deletes several documents by key.
+
+        Args:
+            keys (List[str]): The keys to delete.
+        """
+        with self.lock:
+            self.connection.executemany("DELETE FROM parent_documents WHERE key = ?", [(key,) for key in keys])
+            self.connection.commit()
+
+    def close(self) -> None:
+        """
+        Closes the connection to the SQLite file.
+        """
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,357 @@
+import time
+import atexit
+import logging
+import threading
+
+from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from pymongo.errors import BulkWriteError
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage
+from backend.src.RAG.mongo_history import IndexedChatMessageHistory, TIMESTAMP_KEY
+
+logger = logging.getLogger(__name__)
+
+class CachedSession:
+    """
+    The last messages of a session along with the messages not yet written to MongoDB.
+    """
+    def __init__(self, messages:List[BaseMessage], version:Optional[datetime]):
+        self.messages = messages
+        self.version = version # Timestamp of the newest stored message
+        self.pending = [] # Appended, not yet flushed
+        self.num_in_flight = 0 # Taken by the flusher, not yet confirmed
+        self.last_access = time.monotonic()
+        self.last_checked = time.monotonic()
+
+class HistoryCache:
+    """
+    An in-process cache of recent chat histories with write-behind batching.
+
+    - Reads are served from memory. A cached session is re-validated against MongoDB at most
+      every `version_check_interval` seconds by comparing the timestamp of the newest stored
+      message (the version of the session), so messages written by other replicas are picked up.
+    - Only the last `max_messages_per_session` messages of a session are cached (and messages
+      not written yet), reads of longer histories go to MongoDB (see `get_all_messages`).
+    - Appended messages are cached immediately and written by a background thread, which
+      inserts the messages of all sessions of a collection in one bulk insert.
+    - At most `max_sessions` sessions are cached (least recently used are evicted first), and
+      sessions idle for more than `ttl` seconds are dropped. Sessions with unwritten messages
+      are only dropped once they have been flushed.
+    - `close` (also run at exit) writes all remaining messages.
+    """
+    def __init__(
+                self,
+                max_sessions:int=1000,
+                max_messages_per_session:int=100,
+                ttl:float=600,
+                flush_interval:float=0.5,
+                version_check_interval:float=2.0
+                ):
+        """
+        Initialises the cache and starts the background flusher.
+
+        Args:
+            max_sessions (int): The maximum number of cached sessions.
+            max_messages_per_session (int): The maximum number of cached messages of a session.
+            ttl (float): The number of seconds after which an idle session is dropped.
+            flush_interval (float): The maximum number of seconds appended messages wait before being written.
+            version_check_interval (float): The number of seconds a cached session is trusted without checking MongoDB.
+        """
+        self.max_sessions = max_sessions
+        self.max_messages_per_session = max_messages_per_session
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.version_check_interval = version_check_interval
+
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.sessions = OrderedDict() # (collection name, session ID) -> CachedSession
+        self.histories = {} # (collection name, session ID) -> IndexedChatMessageHistory used to write
+        self.stats = {"hits": 0, "misses": 0, "reloads": 0, "flushes": 0, "flushed_messages": 0, "failed_flushes": 0, "evictions": 0}
+
+        self.closed = False
+        self.flush_requested = threading.Event()
+        self.worker = threading.Thread(target=self.run, daemon=True, name="history-cache-flusher")
+        self.worker.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def get_key(history:IndexedChatMessageHistory) -> Tuple[str, str]:
+        """
+        Returns the cache key of a history.
+
+        Args:
+            history (IndexedChatMessageHistory): The history of a session.
+        """
+        return (history.collection_name, history.session_id)
+
+    def get_messages(self, history:IndexedChatMessageHistory) -> List[BaseMessage]:
+        """
+        Returns the last `max_messages_per_session` messages of a session, loading them from
+        MongoDB on a miss or version change.
+
+        Args:
+            history (IndexedChatMessageHistory): The history of the session.
+        """
+        key = self.get_key(history)
+        now = time.monotonic()
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is not None and now - session.last_access > self.ttl and not session.pending and not session.num_in_flight:
+                del self.sessions[key]
+                self.histories.pop(key, None)
+                session = None
+            if session is not None:
+                self.sessions.move_to_end(key)
+                session.last_access = now
+                # Messages being written cannot be compared to the stored ones, trust the cache
+                if now - session.last_checked < self.version_check_interval or session.num_in_flight:
+                    self.stats["hits"] += 1
+                    return list(session.messages)
+                expected_version = session.version
+
+        if session is not None:
+            stored_version = history.get_last_timestamp()
+            with self.lock:
+                if stored_version == expected_version or session.num_in_flight:
+                    session.last_checked = time.monotonic()
+                    self.stats["hits"] += 1
+                    return list(session.messages)
+                self.stats["reloads"] += 1
+        else:
+            with self.lock:
+                self.stats["misses"] += 1
+
+        # Read before the messages, so a message written in between triggers a reload rather than being missed
+        stored_version = history.get_last_timestamp()
+        stored_messages = history.get_messages(self.max_messages_per_session)
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = CachedSession(messages=list(stored_messages), version=stored_version)
+                self.sessions[key] = session
+                self.evict()
+            elif not session.num_in_flight:
+                session.messages = list(stored_messages) + session.pending
+                session.version = stored_version
+                session.last_checked = time.monotonic()
+            self.trim(session)
+            return list(session.messages)
+
+    def get_all_messages(self, history:IndexedChatMessageHistory) -> List[BaseMessage]:
+        """
+        Returns the messages of a session read from MongoDB (up to the size of the history), for reads
+        longer than the cached messages.
+        - The pending messages are written first, those that could not be written are appended.
+
+        Args:
+            history (IndexedChatMessageHistory): The history of the session.
+        """
+        self.flush()
+        stored_messages = history.messages
+        with self.lock:
+            session = self.sessions.get(self.get_key(history))
+            return stored_messages + (list(session.pending) if session is not None else [])
+
+    def add_messages(self, history:IndexedChatMessageHistory, messages:List[BaseMessage]) -> None:
+        """
+        Appends messages to a session, they are written to MongoDB in the background.
+
+        Args:
+            history (IndexedChatMessageHistory): The history of the session.
+            messages (List[BaseMessage]): The messages to append.
+        """
+        if self.closed:
+            history.add_messages(messages)
+            return
+        key = self.get_key(history)
+        with self.lock:
+            is_cached = key in self.sessions
+        if not is_cached:
+            # Usually already loaded by the read before the LLM call
+            self.get_messages(history)
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = CachedSession(version=history.get_last_timestamp(), messages=history.get_messages(self.max_messages_per_session))
+                self.sessions[key] = session
+            session.messages.extend(messages)
+            session.pending.extend(messages)
+            session.last_access = time.monotonic()
+            self.histories[key] = history
+            self.trim(session)
+
+    def clear(self, history:IndexedChatMessageHistory) -> None:
+        """
+        Deletes the messages of a session from MongoDB and the cache.
+
+        Args:
+            history (IndexedChatMessageHistory): The history of the session.
+        """
+        self.flush()
+        with self.lock:
+            self.sessions.pop(self.get_key(history), None)
+            self.histories.pop(self.get_key(history), None)
+        history.clear()
+
+    def trim(self, session:CachedSession) -> None:
+        """
+        Drops the oldest messages of a session above `max_messages_per_session`, keeping unwritten ones.
+        - Must be called with the lock held.
+
+        Args:
+            session (CachedSession): The cached session.
+        """
+        max_messages = max(self.max_messages_per_session, len(session.pending) + session.num_in_flight)
+        if len(session.messages) > max_messages:
+            session.messages = session.messages[-max_messages:]
+
+    def evict(self) -> None:
+        """
+        Drops the least recently used sessions above `max_sessions`, keeping unwritten ones.
+        - Must be called with the lock held.
+        """
+        for key in list(self.sessions.keys()):
+            if len(self.sessions) <= self.max_sessions:
+                break
+            session = self.sessions[key]
+            if not session.pending and not session.num_in_flight:
+                del self.sessions[key]
+                self.histories.pop(key, None)
+                self.stats["evictions"] += 1
+
+    def flush(self) -> int:
+        """
+        Writes all pending messages, one ordered bulk insert per collection.
+        - If the insert fails part way, only the messages that were not inserted are written again later.
+
+        Returns:
+            int: The number of messages written.
+        """
+        with self.flush_lock:
+            batches = {} # collection name -> [(key, history, messages)]
+            with self.lock:
+                for key, session in self.sessions.items():
+                    if not session.pending:
+                        continue
+                    history = self.histories[key]
+                    batches.setdefault(history.collection_name, []).append((key, history, session.pending))
+                    session.num_in_flight += len(session.pending)
+                    session.pending = []
+
+            num_flushed = 0
+            for items in batches.values():
+                collection = items[0][1].collection
+                session_docs = [history.to_documents(messages) for _, history, messages in items]
+                docs = [doc for documents in session_docs for doc in documents]
+                try:
+                    collection.insert_many(docs, ordered=True)
+                    num_inserted = len(docs)
+                except Exception as e:
+                    # An ordered insert stops at the first error, the documents before it are stored
+                    num_inserted = e.details.get("nInserted", 0) if isinstance(e, BulkWriteError) else 0
+                    logger.warning("Failed to write %d of %d chat messages, retrying later: %s", len(docs) - num_inserted, len(docs), e)
+
+                with self.lock:
+                    remaining = num_inserted
+                    for (key, _, messages), documents in zip(items, session_docs):
+                        num_written = min(remaining, len(messages))
+                        remaining -= num_written
+                        session = self.sessions.get(key)
+                        if session is None:
+                            continue
+                        session.num_in_flight -= len(messages)
+                        if num_written < len(messages):
+                            session.pending = messages[num_written:] + session.pending
+                        if num_written > 0:
+                            session.version = documents[num_written - 1][TIMESTAMP_KEY]
+                        if num_written == len(messages):
+                            session.last_checked = time.monotonic()
+                    if num_inserted < len(docs):
+                        self.stats["failed_flushes"] += 1
+                    else:
+                        self.stats["flushes"] += 1
+                    self.stats["flushed_messages"] += num_inserted
+                    num_flushed += num_inserted
+            return num_flushed
+
+    def run(self) -> None:
+        """
+        Background loop writing the pending messages every `flush_interval` seconds.
+        """
+        while not self.closed:
+            self.flush_requested.wait(timeout=self.flush_interval)
+            self.flush_requested.clear()
+            self.flush()
+            with self.lock:
+                self.evict()
+
+    def close(self) -> None:
+        """
+        Stops the background flusher and writes all remaining messages.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.flush_requested.set()
+        self.worker.join()
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns the cache metrics.
+        """
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["reloads"]
+            return {
+                    **self.stats,
+                    "sessions": len(self.sessions),
+                    "pending_messages": sum(len(session.pending) for session in self.sessions.values()),
+                    "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+                    }
+
+class CachedChatMessageHistory(BaseChatMessageHistory):
+    """
+    A chat message history of a session served from the shared HistoryCache.
+    - Histories longer than the cached messages of a session (or unbounded) are read from MongoDB.
+    """
+    def __init__(self, cache:HistoryCache, history:IndexedChatMessageHistory, history_size:Optional[int]=None):
+        """
+        Args:
+            cache (HistoryCache): The shared history cache.
+            history (IndexedChatMessageHistory): The MongoDB history of the session (loading `history_size` messages).
+            history_size (Optional[int]): The number of most recent messages to return (None for all).
+        """
+        self.cache = cache
+        self.history = history
+        self.history_size = history_size
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """
+        The (most recent) messages of the session.
+        """
+        if self.history_size is None:
+            return self.cache.get_all_messages(self.history)
+        if self.history_size > self.cache.max_messages_per_session:
+            messages = self.cache.get_all_messages(self.history)
+        else:
+            messages = self.cache.get_messages(self.history)
+        return messages[-self.history_size:] if self.history_size > 0 else []
+
+    def add_messages(self, messages:List[BaseMessage]) -> None:
+        """
+        Appends messages to the session.
+
+        Args:
+            messages (List[BaseMessage]): The messages to append.
+        """
+        self.cache.add_messages(self.history, messages)
+
+    def clear(self) -> None:
+        """
+        Deletes the messages of the session.
+        """
+        self.cache.clear(self.history)
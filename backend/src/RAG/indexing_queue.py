@@ -0,0 +1,259 @@
+import queue
+import logging
+import threading
+import time
+
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+class IndexingTicket:
+    """
+    A handle returned for every submission to the indexing queue.
+    - Lets a request wait for its own documents to be committed to the vector store
+      (read-your-writes) without forcing every request to do so.
+    """
+    def __init__(self, num_docs:int):
+        self.num_docs = num_docs
+        self.error = None
+        self._done = threading.Event()
+
+    def set_done(self, error:Optional[Exception]=None) -> None:
+        """
+        Marks the ticket as committed (or failed).
+
+        Args:
+            error (Optional[Exception]): The exception raised while committing the batch, if any.
+        """
+        self.error = error
+        self._done.set()
+
+    def done(self) -> bool:
+        """
+        Returns whether the batch containing this submission has been committed.
+        """
+        return self._done.is_set()
+
+    def wait(self, timeout:Optional[float]=None) -> bool:
+        """
+        Blocks until the batch containing this submission has been committed.
+        - Re-raises the error if the batch failed to commit.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait (None waits forever).
+
+        Returns:
+            bool: True if the documents were committed, False if the timeout expired first.
+        """
+        is_done = self._done.wait(timeout)
+        if is_done and self.error is not None:
+            raise self.error
+        return is_done
+
+class IndexingQueue:
+    """
+    A background write-behind worker for adding documents to the vector store.
+
+    - Requests submit their documents to a bounded queue and return immediately.
+    - A single worker thread drains the queue, coalesces duplicate documents
+      (by link) across all pending submissions and commits them in one large
+      write through the retrieval engine (which checks the stored links of the
+      whole batch with one lookup, see RetrievalEngine.split_and_add_documents).
+    - Each submission gets an IndexingTicket which can be waited on when the
+      caller needs to read its own writes.
+    """
+    def __init__(
+                self,
+                retrieval_engine,
+                max_queue_size:int=1000,
+                max_batch_size:int=256,
+                max_wait_time:float=0.2
+                ):
+        """
+        Initialises the indexing queue and starts the background worker.
+
+        Args:
+            retrieval_engine (RetrievalEngine): The retrieval engine used to split and store the documents.
+            max_queue_size (int): The maximum number of pending submissions (callers block when full).
+            max_batch_size (int): The maximum number of documents committed in a single write.
+            max_wait_time (float): The number of seconds to wait for more submissions before committing a batch.
+        """
+        self.retrieval_engine = retrieval_engine
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+
+        self.pending = queue.Queue(maxsize=max_queue_size)
+        self.stats = {"submitted_docs": 0, "committed_docs": 0, "coalesced_docs": 0, "batches": 0, "failed_batches": 0}
+        self._stats_lock = threading.Lock()
+        self._is_closed = False
+        self._close_lock = threading.Lock() # Nothing is queued after the closing sentinel
+
+        self.worker = threading.Thread(target=self._run, name="indexing-queue-worker", daemon=True)
+        self.worker.start()
+
+    def submit(self, docs:List[Document], timeout:Optional[float]=None) -> IndexingTicket:
+        """
+        Queues documents to be added to the vector store.
+
+        Args:
+            docs (List[Document]): The documents to add.
+            timeout (Optional[float]): The maximum number of seconds to block if the queue is full.
+
+        Returns:
+            IndexingTicket: A ticket that can be waited on for read-your-writes.
+        """
+        ticket = IndexingTicket(num_docs=len(docs))
+        with self._close_lock:
+            if self._is_closed:
+                raise RuntimeError("Cannot submit documents to a closed indexing queue.")
+            if len(docs) == 0:
+                ticket.set_done()
+                return ticket
+            self.pending.put((docs, ticket), timeout=timeout)
+        with self._stats_lock:
+            self.stats["submitted_docs"] += len(docs)
+        return ticket
+
+    def coalesce(self, submissions:List[Tuple[List[Document], IndexingTicket]]) -> List[Document]:
+        """
+        Merges the documents of several submissions, keeping only the first document for each link.
+
+        Args:
+            submissions (List[Tuple[List[Document], IndexingTicket]]): The submissions to merge.
+        """
+        unique_docs: Dict[str, Document] = {}
+        for docs, _ in submissions:
+            for doc in docs:
+                link = doc.metadata.get("link")
+                if link not in unique_docs:
+                    unique_docs[link] = doc
+        return list(unique_docs.values())
+
+    def _collect_batch(self) -> List[Tuple[List[Document], IndexingTicket]]:
+        """
+        Blocks for the first submission, then keeps collecting submissions until the batch
+        is full or no new submissions arrive within the wait time.
+        """
+        submissions = [self.pending.get()]
+        if submissions[0] is None: # Closing
+            return submissions
+        num_docs = len(submissions[0][0])
+        deadline = time.monotonic() + self.max_wait_time
+
+        while num_docs < self.max_batch_size:
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0:
+                break
+            try:
+                submission = self.pending.get(timeout=remaining_time)
+            except queue.Empty:
+                break
+            submissions.append(submission)
+            if submission is None: # Closing, commit what we have
+                break
+            num_docs += len(submission[0])
+        return submissions
+
+    def _commit(self, submissions:List[Tuple[List[Document], IndexingTicket]]) -> None:
+        """
+        Writes the coalesced documents of a batch to the vector store and resolves the tickets.
+
+        Args:
+            submissions (List[Tuple[List[Document], IndexingTicket]]): The submissions in the batch.
+        """
+        # Sentinel (None) submissions are only used to wake up the worker when closing
+        submissions = [submission for submission in submissions if submission is not None]
+        if len(submissions) == 0:
+            return
+
+        docs = self.coalesce(submissions)
+        num_submitted = sum(len(submission_docs) for submission_docs, _ in submissions)
+        error = None
+        try:
+            self.retrieval_engine.split_and_add_documents(docs=docs)
+        except Exception as e:
+            logger.error(f"Error indexing batch of {len(docs)} documents: {e}")
+            error = e
+
+        with self._stats_lock:
+            self.stats["batches"] += 1
+            self.stats["coalesced_docs"] += num_submitted - len(docs)
+            if error is None:
+                self.stats["committed_docs"] += len(docs)
+            else:
+                self.stats["failed_batches"] += 1
+
+        for _, ticket in submissions:
+            ticket.set_done(error)
+
+    def _run(self) -> None:
+        """
+        The worker loop which commits batches until the queue is closed and drained.
+        """
+        while True:
+            submissions = self._collect_batch()
+            is_closing = any(submission is None for submission in submissions)
+            self._commit(submissions)
+            for _ in submissions:
+                self.pending.task_done()
+            if is_closing:
+                self._fail_pending()
+                return
+
+    def _fail_pending(self) -> None:
+        """
+        Fails the tickets of any submission left in the queue once the worker stops, so no caller waits forever.
+        """
+        while True:
+            try:
+                submission = self.pending.get_nowait()
+            except queue.Empty:
+                return
+            if submission is not None:
+                submission[1].set_done(RuntimeError("The indexing queue was closed before the documents were indexed."))
+            self.pending.task_done()
+
+    def flush(self, timeout:Optional[float]=None) -> bool:
+        """
+        Blocks until every submission queued so far has been committed.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait (None waits forever).
+
+        Returns:
+            bool: True if the queue was fully committed, False if the timeout expired first.
+        """
+        if timeout is None:
+            self.pending.join()
+            return True
+
+        end_time = time.monotonic() + timeout
+        while self.pending.unfinished_tasks > 0:
+            if time.monotonic() >= end_time:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout:Optional[float]=None) -> None:
+        """
+        Stops accepting submissions, commits everything still queued and stops the worker.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait for the worker to finish.
+        """
+        with self._close_lock:
+            if self._is_closed:
+                return
+            self._is_closed = True
+            self.pending.put(None)
+        self.worker.join(timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns a snapshot of the indexing statistics.
+        """
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["queued_submissions"] = self.pending.qsize()
+        return stats
@@ -1,14 +1,20 @@
 
+import time
+import uuid
+import threading
+
 from operator import itemgetter
-from typing import List
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, Future, wait
 
 from langchain_openai.chat_models import ChatOpenAI
-from langchain_mongodb import MongoDBChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.documents import Document
-from langchain_core.messages import BaseMessage, AIMessage
+from langchain_core.messages import BaseMessage, AIMessage, SystemMessage, HumanMessage, get_buffer_string
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from dotenv import load_dotenv
 import os
@@ -16,8 +22,13 @@ import logging
 from pymongo import MongoClient
 from pymongo.server_api import ServerApi
 from langchain_community.adapters.openai import convert_dict_to_message
+from backend.src.RAG.history_cache import HistoryCache, CachedChatMessageHistory
+from backend.src.RAG.mongo_history import IndexedChatMessageHistory, ensure_history_indexes, get_timestamps, TIMESTAMP_KEY
+from backend.src.RAG.sqlite_history import SQLiteDatabase, SQLiteChatMessageHistory, SQLiteSummaryStore
+from backend.src.constants import HISTORY_SUMMARY_CONFIG, MONGO_CLIENT_CONFIG, HISTORY_CACHE_CONFIG, IN_MEMORY_HISTORY_CONFIG, HISTORY_STORE_CONFIG, HISTORY_BACKEND_CONFIG
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 # uri = os.getenv("MONGODB_URI")
 # if not uri:
 #     raise Exception("MongoDB URI not found. Please set 'MONGODB_URI' in the environment variables.")
@@ -40,46 +51,866 @@ class InMemoryHistory(BaseChatMessageHistory, BaseModel):
     """In memory implementation of chat message history."""
 
     messages: List[BaseMessage] = Field(default_factory=list)
+    max_messages: Optional[int] = None # Only the most recent messages are kept (None for all)
+    _on_change: Optional[Callable[[], None]] = PrivateAttr(default=None)
 
     def add_messages(self, messages: List[BaseMessage]) -> None:
         """Add a list of messages to the store"""
         self.messages.extend(messages)
+        if self.max_messages is not None and len(self.messages) > self.max_messages:
+            del self.messages[:len(self.messages) - self.max_messages]
+        if self._on_change is not None:
+            self._on_change()
 
     def clear(self) -> None:
         self.messages = []
+        if self._on_change is not None:
+            self._on_change()
+
+def get_message_size(message:BaseMessage) -> int:
+    """
+    Returns the approximate memory used by a message (the length of its content).
+
+    Args:
+        message (BaseMessage): The message.
+    """
+    return len(message.content) if isinstance(message.content, str) else len(str(message.content))
+
+class BoundedSessionStore:
+    """
+    A bounded in-memory store of chat histories, used for local and offline deployments.
+
+    - Each session keeps at most `max_messages_per_session` of its most recent messages.
+    - Sessions idle for more than `ttl` seconds are dropped.
+    - The least recently used sessions are dropped when there are more than `max_sessions`
+      sessions or the messages of all sessions exceed `max_total_size` characters.
+    - `on_remove` is called with the ID of every dropped session (e.g., to delete its summary).
+    """
+    def __init__(
+                self,
+                max_sessions:int=1000,
+                max_messages_per_session:int=100,
+                ttl:float=3600,
+                max_total_size:int=50_000_000,
+                on_remove:Optional[Callable[[str], None]]=None
+                ):
+        """
+        Args:
+            max_sessions (int): The maximum number of sessions.
+            max_messages_per_session (int): The maximum number of messages per session.
+            ttl (float): The number of seconds after which an idle session is dropped.
+            max_total_size (int): The maximum total length (in characters) of the messages of all sessions.
+            on_remove (Optional[Callable[[str], None]]): Called with the ID of each dropped session.
+        """
+        self.max_sessions = max_sessions
+        self.max_messages_per_session = max_messages_per_session
+        self.ttl = ttl
+        self.max_total_size = max_total_size
+        self.on_remove = on_remove
+
+        self.lock = threading.RLock()
+        self.sessions = OrderedDict() # session ID -> InMemoryHistory, least recently used first
+        self.last_access = {}
+        self.sizes = {}
+        self.total_size = 0
+        self.stats = {"evicted_idle": 0, "evicted_max_sessions": 0, "evicted_max_size": 0}
+
+    def get(self, session_id:str) -> InMemoryHistory:
+        """
+        Returns the history of a session, creating it if needed.
+
+        Args:
+            session_id (str): The session ID.
+        """
+        with self.lock:
+            self.evict_idle()
+            if session_id not in self.sessions:
+                history = InMemoryHistory(max_messages=self.max_messages_per_session)
+                history._on_change = lambda: self.update_size(session_id, history)
+                self.sessions[session_id] = history
+                self.sizes[session_id] = 0
+            self.sessions.move_to_end(session_id)
+            self.last_access[session_id] = time.monotonic()
+            self.evict(keep=session_id)
+            return self.sessions[session_id]
+
+    def update_size(self, session_id:str, history:InMemoryHistory) -> None:
+        """
+        Updates the size of a session after its messages changed, dropping other sessions if needed.
+
+        Args:
+            session_id (str): The session ID.
+            history (InMemoryHistory): The history of the session.
+        """
+        with self.lock:
+            if self.sessions.get(session_id) is not history:
+                return # Already dropped
+            size = sum(get_message_size(message) for message in history.messages)
+            self.total_size += size - self.sizes[session_id]
+            self.sizes[session_id] = size
+            self.sessions.move_to_end(session_id)
+            self.last_access[session_id] = time.monotonic()
+            self.evict(keep=session_id)
+
+    def remove(self, session_id:str, reason:str) -> None:
+        """
+        Drops a session.
+        - Must be called with the lock held.
+
+        Args:
+            session_id (str): The session ID.
+            reason (str): The eviction statistic to increment.
+        """
+        self.sessions.pop(session_id)
+        self.total_size -= self.sizes.pop(session_id)
+        self.last_access.pop(session_id)
+        self.stats[reason] += 1
+        if self.on_remove is not None:
+            self.on_remove(session_id)
+
+    def evict_idle(self) -> None:
+        """
+        Drops the sessions idle for more than `ttl` seconds.
+        - Must be called with the lock held.
+        """
+        now = time.monotonic()
+        for session_id in list(self.sessions.keys()):
+            if now - self.last_access[session_id] <= self.ttl:
+                break # Sessions are ordered by last access
+            self.remove(session_id, reason="evicted_idle")
+
+    def evict(self, keep:str) -> None:
+        """
+        Drops the least recently used sessions until the store is within its limits.
+        - Must be called with the lock held.
+
+        Args:
+            keep (str): The session in use, which is never dropped.
+        """
+        for session_id in list(self.sessions.keys()):
+            if session_id == keep:
+                continue
+            if len(self.sessions) > self.max_sessions:
+                self.remove(session_id, reason="evicted_max_sessions")
+            elif self.total_size > self.max_total_size:
+                self.remove(session_id, reason="evicted_max_size")
+            else:
+                break
+
+    def clear(self) -> None:
+        """
+        Drops all sessions.
+        """
+        with self.lock:
+            if self.on_remove is not None:
+                for session_id in self.sessions:
+                    self.on_remove(session_id)
+            self.sessions.clear()
+            self.last_access.clear()
+            self.sizes.clear()
+            self.total_size = 0
+
+    def __contains__(self, session_id:str) -> bool:
+        with self.lock:
+            return session_id in self.sessions
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.sessions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns the number of sessions, the total size of their messages and the eviction counts.
+        """
+        with self.lock:
+            return {**self.stats, "sessions": len(self.sessions), "total_size": self.total_size}
+
+store = BoundedSessionStore(**IN_MEMORY_HISTORY_CONFIG) # Chat histories of local and offline deployments
+
+mongo_clients = {} # One pooled client per MongoDB URI, shared by every history in the process
+mongo_clients_lock = threading.Lock()
+
+def get_mongo_client(uri:str) -> MongoClient:
+    """
+    Returns the process-wide MongoDB client for a URI, creating it on first use.
+    - MongoClient is thread-safe and keeps a connection pool, so sharing one client avoids a
+      DNS lookup, TLS handshake and server selection for every chat history.
+
+    Args:
+        uri (str): The MongoDB connection string.
+    """
+    with mongo_clients_lock:
+        if uri not in mongo_clients:
+            mongo_clients[uri] = MongoClient(uri, server_api=ServerApi('1'), **MONGO_CLIENT_CONFIG)
+        return mongo_clients[uri]
+
+history_cache = None # Shared by every history in the process, see get_history_cache
+history_cache_lock = threading.Lock()
+
+def get_history_cache() -> HistoryCache:
+    """
+    Returns the process-wide chat history cache, creating it on first use.
+    """
+    global history_cache
+    with history_cache_lock:
+        if history_cache is None:
+            history_cache = HistoryCache(
+                                        max_sessions=HISTORY_CACHE_CONFIG["max_sessions"],
+                                        max_messages_per_session=HISTORY_CACHE_CONFIG["max_messages_per_session"],
+                                        ttl=HISTORY_CACHE_CONFIG["ttl"],
+                                        flush_interval=HISTORY_CACHE_CONFIG["flush_interval"],
+                                        version_check_interval=HISTORY_CACHE_CONFIG["version_check_interval"]
+                                        )
+        return history_cache
+
+sqlite_databases = {} # One connection per SQLite file, shared by every history in the process
+sqlite_databases_lock = threading.Lock()
+
+def get_sqlite_database(path:str) -> SQLiteDatabase:
+    """
+    Returns the process-wide SQLite chat history database of a file, opening it on first use.
+
+    Args:
+        path (str): The path of the database file.
+    """
+    with sqlite_databases_lock:
+        if path not in sqlite_databases:
+            sqlite_databases[path] = SQLiteDatabase(path)
+        return sqlite_databases[path]
 
-store = {} # <--------- replace this with mongoDB or some other database and then use it to get session by id 
+def close_mongo_clients() -> None:
+    """
+    Finishes the queued summaries, writes the cached chat messages and closes the shared MongoDB clients and
+    SQLite databases (e.g., when the app shuts down).
+    """
+    global history_cache, history_summarizer
+    with history_summarizer_lock:
+        if history_summarizer is not None:
+            history_summarizer.close()
+            history_summarizer = None
+    with history_cache_lock:
+        if history_cache is not None:
+            history_cache.close()
+            history_cache = None
+    with mongo_clients_lock:
+        for client in mongo_clients.values():
+            client.close()
+        mongo_clients.clear()
+    with sqlite_databases_lock:
+        for database in sqlite_databases.values():
+            database.close()
+        sqlite_databases.clear()
 
 def get_by_session_id(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = InMemoryHistory()
-    return store[session_id]
+    return store.get(session_id)
 
 
-class Memory():
-    def __init__(self):
-        load_dotenv()
-        self.uri = os.getenv("MONGODB_URI")
+class SummaryStore:
+    """
+    Stores the running summary of the older turns of each session in a MongoDB collection.
+    - Summaries carry the timestamp of their last update, so the TTL index of the collection
+      deletes them with the messages of idle sessions (see MongoHistoryBackend.get_summary_store).
+    """
+    def __init__(self, collection):
+        """
+        Args:
+            collection: The MongoDB collection holding one summary document per session.
+        """
+        self.collection = collection
+
+    def get(self, session_id:str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the summary document ("summary", "last_summarized") of the session, or None.
+
+        Args:
+            session_id (str): The session ID.
+        """
+        return self.collection.find_one({"SessionId": session_id}, {"_id": 0, "summary": 1, "last_summarized": 1})
+
+    def set(self, session_id:str, summary:str, last_summarized:str) -> None:
+        """
+        Stores the summary of the session.
+
+        Args:
+            session_id (str): The session ID.
+            summary (str): The summary of the older turns.
+            last_summarized (str): The ID of the last message folded into the summary.
+        """
+        self.collection.update_one(
+                                {"SessionId": session_id},
+                                {"$set": {"summary": summary, "last_summarized": last_summarized, TIMESTAMP_KEY: get_timestamps(1)[0]}},
+                                upsert=True
+                                )
+
+    def delete(self, session_id:str) -> None:
+        """
+        Deletes the summary of the session.
+
+        Args:
+            session_id (str): The session ID.
+        """
+        self.collection.delete_one({"SessionId": session_id})
+
+class HistorySummarizer:
+    """
+    Folds the older turns of conversations into running summaries with an LLM.
+    - Runs in a background thread, so summarizing never delays a request.
+    - At most one summarization per session is queued at a time.
+    """
+    def __init__(self, llm=None, max_workers:int=1):
+        """
+        Args:
+            llm: The chat model writing the summaries (defaults to gpt-4o-mini, created on first use).
+            max_workers (int): The number of background threads.
+        """
+        self.llm = llm
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="history-summarizer")
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.closed = False
+
+    def get_llm(self):
+        """
+        Returns the chat model writing the summaries.
+        """
+        if self.llm is None:
+            self.llm = ChatOpenAI(model="gpt-4o-mini")
+        return self.llm
+
+    def summarize(self, previous_summary:str, messages:List[BaseMessage], token_budget:int) -> str:
+        """
+        Extends the summary of a conversation with new messages.
+
+        Args:
+            previous_summary (str): The current summary (empty if there is none).
+            messages (List[BaseMessage]): The messages to fold into the summary.
+            token_budget (int): The maximum number of tokens of the summary.
+        """
+        prompt = [
+            SystemMessage(content=(
+                "You summarise conversations between a user and a research assistant. "
+                "Extend the existing summary with the new messages. Keep the research topics, questions, "
+                "constraints and the papers (with their links) that were discussed, drop everything else. "
+                f"Write at most {token_budget} tokens."
+            )),
+            HumanMessage(content=f"Existing summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{get_buffer_string(messages)}")
+        ]
+        return self.get_llm().invoke(prompt, max_tokens=token_budget).content
+
+    def compact(
+            self,
+            session_id:str,
+            full_history:BaseChatMessageHistory,
+            summary_store:SummaryStore,
+            keep_last_turns:int,
+            token_budget:int
+            ) -> bool:
+        """
+        Folds the messages older than the last turns of a session into its summary.
+        - Progress is tracked by the ID of the last folded message, not by a count, as backends
+          drop the oldest messages of a session (trimming, retention). If that message was dropped,
+          every remaining older message came after it and is folded into the summary.
+        - The summary of a session without messages (e.g., expired) is deleted.
+
+        Args:
+            session_id (str): The session ID.
+            full_history (BaseChatMessageHistory): All messages of the session.
+            summary_store (SummaryStore): The store of the session summaries.
+            keep_last_turns (int): The number of most recent turns (user and assistant message) kept verbatim.
+            token_budget (int): The maximum number of tokens of the summary.
+
+        Returns:
+            bool: True if the summary was updated.
+        """
+        messages = full_history.messages
+        state = summary_store.get(session_id)
+        if len(messages) == 0:
+            if state is not None:
+                summary_store.delete(session_id)
+            return False
+        state = state or {"summary": "", "last_summarized": None}
+
+        older_messages = messages[:max(0, len(messages) - 2 * keep_last_turns)]
+        message_ids = [message.id for message in messages]
+        if state.get("last_summarized") in message_ids:
+            new_messages = older_messages[message_ids.index(state["last_summarized"]) + 1:]
+        else:
+            new_messages = older_messages
+        if len(new_messages) == 0:
+            return False
+
+        summary = self.summarize(state["summary"], new_messages, token_budget=token_budget)
+        summary_store.set(session_id, summary=summary, last_summarized=new_messages[-1].id)
+        return True
+
+    def schedule(self, key:str, compact_fn:Callable[[], bool]) -> Optional[Future]:
+        """
+        Runs a compaction in the background unless one is already queued for the same key
+        or the summarizer is closed.
+
+        Args:
+            key (str): The key of the session (e.g., collection and session ID).
+            compact_fn (Callable[[], bool]): The compaction to run.
+        """
+        with self.lock:
+            if self.closed or key in self.pending:
+                return None
+            future = self.executor.submit(self.run, key, compact_fn)
+            self.pending[key] = future
+            return future
+
+    def run(self, key:str, compact_fn:Callable[[], bool]) -> bool:
+        """
+        Runs a compaction, logging (not raising) any error.
+
+        Args:
+            key (str): The key of the session.
+            compact_fn (Callable[[], bool]): The compaction to run.
+        """
+        try:
+            return compact_fn()
+        except Exception as e:
+            logger.warning("Failed to summarise the history of %s: %s", key, e)
+            return False
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def flush(self, timeout:Optional[float]=None) -> bool:
+        """
+        Waits for the queued compactions to finish.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if all compactions finished.
+        """
+        with self.lock:
+            futures = list(self.pending.values())
+        _, not_done = wait(futures, timeout=timeout)
+        return len(not_done) == 0
+
+    def close(self) -> None:
+        """
+        Stops accepting compactions, waits for the queued ones and stops the background threads.
+        """
+        with self.lock:
+            self.closed = True
+        self.executor.shutdown(wait=True)
+
+history_summarizer = None # Shared by every Memory in the process, see get_history_summarizer
+history_summarizer_lock = threading.Lock()
+
+def get_history_summarizer() -> HistorySummarizer:
+    """
+    Returns the summarizer shared by the chat histories of the process, creating it on first use.
+    """
+    global history_summarizer
+    with history_summarizer_lock:
+        if history_summarizer is None:
+            history_summarizer = HistorySummarizer()
+        return history_summarizer
+
+class InMemorySummaryStore:
+    """
+    Stores the running summary of the older turns of each session in a bounded dictionary.
+    - The least recently used summaries are dropped above `max_sessions` sessions.
+    """
+    def __init__(self, max_sessions:int=1000):
+        """
+        Args:
+            max_sessions (int): The maximum number of summaries.
+        """
+        self.max_sessions = max_sessions
+        self.summaries = OrderedDict() # session ID -> summary, least recently used first
+        self.lock = threading.Lock()
+
+    def get(self, session_id:str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            if session_id not in self.summaries:
+                return None
+            self.summaries.move_to_end(session_id)
+            return self.summaries[session_id]
+
+    def set(self, session_id:str, summary:str, last_summarized:str) -> None:
+        with self.lock:
+            self.summaries[session_id] = {"summary": summary, "last_summarized": last_summarized}
+            self.summaries.move_to_end(session_id)
+            while len(self.summaries) > self.max_sessions:
+                self.summaries.popitem(last=False)
+
+    def delete(self, session_id:str) -> None:
+        with self.lock:
+            self.summaries.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.summaries)
+
+class RecentMessagesHistory(BaseChatMessageHistory):
+    """
+    A view of a chat message history returning only its most recent messages.
+    """
+    def __init__(self, history:BaseChatMessageHistory, history_size:Optional[int]=None):
+        """
+        Args:
+            history (BaseChatMessageHistory): The history of the session.
+            history_size (Optional[int]): The number of most recent messages to return (None for all).
+        """
+        self.history = history
+        self.history_size = history_size
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        messages = self.history.messages
+        if self.history_size is not None:
+            messages = messages[-self.history_size:] if self.history_size > 0 else []
+        return messages
+
+    def add_messages(self, messages:List[BaseMessage]) -> None:
+        self.history.add_messages(messages)
+
+    def clear(self) -> None:
+        self.history.clear()
+
+class SummarizedHistory(BaseChatMessageHistory):
+    """
+    A chat message history that returns a running summary of the older turns followed
+    by the last turns verbatim, bounding the size of the history in the prompt.
+    - New messages are written to the underlying history. Once `compaction_threshold` messages
+      older than the last turns are not summarized yet, they are folded into the summary in
+      the background (until then they are returned verbatim).
+    - Only the last `2 * keep_last_turns + compaction_threshold` messages are read per request,
+      the full history is only read by the compactions.
+    """
+    def __init__(
+                self,
+                session_id:str,
+                history:BaseChatMessageHistory,
+                full_history:BaseChatMessageHistory,
+                summary_store:SummaryStore,
+                summarizer:HistorySummarizer,
+                keep_last_turns:int,
+                token_budget:int,
+                compaction_threshold:int=1
+                ):
+        """
+        Args:
+            session_id (str): The session ID.
+            history (BaseChatMessageHistory): The history returning (at least) the last
+                                              `2 * keep_last_turns + compaction_threshold` messages.
+            full_history (BaseChatMessageHistory): The history returning all messages, read when summarizing.
+            summary_store (SummaryStore): The store of the session summaries.
+            summarizer (HistorySummarizer): The background summarizer.
+            keep_last_turns (int): The number of most recent turns kept verbatim.
+            token_budget (int): The maximum number of tokens of the summary.
+            compaction_threshold (int): The number of unsummarized messages older than the last turns
+                                        that triggers a compaction (at least 1).
+        """
+        if compaction_threshold < 1:
+            raise ValueError("The compaction threshold must be at least 1.")
+        self.session_id = session_id
+        self.history = history
+        self.full_history = full_history
+        self.summary_store = summary_store
+        self.summarizer = summarizer
+        self.keep_last_turns = keep_last_turns
+        self.token_budget = token_budget
+        self.compaction_threshold = compaction_threshold
+
+    def get_window(self) -> List[BaseMessage]:
+        """
+        Returns the messages read per request: the last turns and the older messages that do not trigger a compaction yet.
+        """
+        return self.history.messages[-(2 * self.keep_last_turns + self.compaction_threshold):]
+
+    @staticmethod
+    def get_unsummarized(window:List[BaseMessage], state:Optional[Dict[str, Any]]) -> List[BaseMessage]:
+        """
+        Returns the messages of the window that came after the last message folded into the summary.
+
+        Args:
+            window (List[BaseMessage]): The last messages of the session.
+            state (Optional[Dict[str, Any]]): The summary of the session.
+        """
+        message_ids = [message.id for message in window]
+        if state and state.get("last_summarized") in message_ids:
+            return window[message_ids.index(state["last_summarized"]) + 1:]
+        return window
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """
+        The summary of the older turns (if any) followed by the messages not summarized yet
+        (at least the last turns).
+        """
+        window = self.get_window()
+        if len(window) == 0:
+            return window # A summary left by an expired session is stale
+        state = self.summary_store.get(self.session_id)
+        recent_messages = self.get_unsummarized(window, state)
+        if not state or not state.get("summary"):
+            return recent_messages
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{state['summary']}")] + recent_messages
+
+    def add_messages(self, messages:List[BaseMessage]) -> None:
+        """
+        Stores new messages and schedules the compaction of the older turns once enough of them are
+        not summarized yet.
+        - Messages without an ID are given one, as the summary records the last message it folded.
+
+        Args:
+            messages (List[BaseMessage]): The messages to add.
+        """
+        messages = [message if message.id else message.model_copy(update={"id": str(uuid.uuid4())}) for message in messages]
+        self.history.add_messages(messages)
+
+        window = self.get_window()
+        unsummarized = self.get_unsummarized(window, self.summary_store.get(self.session_id))
+        if len(unsummarized) < 2 * self.keep_last_turns + self.compaction_threshold:
+            return
+        self.summarizer.schedule(
+                                key=f"{id(self.summary_store)}:{self.session_id}",
+                                compact_fn=lambda: self.summarizer.compact(
+                                                                        session_id=self.session_id,
+                                                                        full_history=self.full_history,
+                                                                        summary_store=self.summary_store,
+                                                                        keep_last_turns=self.keep_last_turns,
+                                                                        token_budget=self.token_budget
+                                                                        )
+                                )
+
+    def clear(self) -> None:
+        """
+        Deletes the messages and the summary of the session.
+        """
+        self.history.clear()
+        self.summary_store.delete(self.session_id)
+
+class HistoryBackend(ABC):
+    """
+    Stores the chat histories and summaries of the chains (see HISTORY_BACKEND_CONFIG).
+    - Messages are grouped in collections, one per chain.
+    """
+    @abstractmethod
+    def create_history(self, session_id:str, collection_name:str, history_size:Optional[int]) -> BaseChatMessageHistory:
+        """
+        Creates the chat history of a session.
+
+        Args:
+            session_id (str): The session ID.
+            collection_name (str): The collection holding the messages of the chain.
+            history_size (Optional[int]): The number of most recent messages to load (None for all).
+        """
+
+    @abstractmethod
+    def get_summary_store(self, collection_name:str):
+        """
+        Returns the store of the session summaries of a collection (with get, set and delete).
+
+        Args:
+            collection_name (str): The collection holding the messages of the chain.
+        """
+
+class MongoHistoryBackend(HistoryBackend):
+    """
+    Stores the chat histories in MongoDB, the backend of deployments.
+    """
+    def __init__(self, uri:Optional[str]=None):
+        """
+        Args:
+            uri (Optional[str]): The MongoDB connection string (defaults to MONGODB_URI).
+        """
+        self.uri = uri or os.getenv("MONGODB_URI")
         if not self.uri:
             raise Exception("MongoDB URI not found. Please set 'MONGODB_URI' in the environment variables.")
-    
-    def get_session_query_generator(self,session_id:str) -> BaseChatMessageHistory:
-        current_message= MongoDBChatMessageHistory(
+        self.indexed_collections = set()
+        self.lock = threading.Lock()
+
+    def get_collection(self, collection_name:str):
+        """
+        Returns a chat history collection of the shared client, creating (or checking) its indexes once.
+
+        Args:
+            collection_name (str): The name of the collection.
+        """
+        collection = get_mongo_client(self.uri)[HISTORY_STORE_CONFIG["database_name"]][collection_name]
+        with self.lock:
+            if collection_name not in self.indexed_collections:
+                actions = ensure_history_indexes(collection, ttl=HISTORY_STORE_CONFIG["ttl"])
+                if any(action != "ok" for action in actions.values()):
+                    logger.info("Indexes of chat history collection '%s': %s", collection_name, actions)
+                self.indexed_collections.add(collection_name)
+        return collection
+
+    def create_history(self, session_id:str, collection_name:str, history_size:Optional[int]) -> BaseChatMessageHistory:
+        """
+        Creates a lightweight chat history of a session on top of the shared client.
+        - If enabled, reads and writes go through the shared history cache (see HISTORY_CACHE_CONFIG),
+          which holds the last messages of the session, longer histories are read from MongoDB.
+
+        Args:
+            session_id (str): The session ID.
+            collection_name (str): The collection holding the messages of the chain.
+            history_size (Optional[int]): The number of most recent messages to load (None for all).
+        """
+        collection = self.get_collection(collection_name)
+        use_cache = HISTORY_CACHE_CONFIG["enabled"]
+        history = IndexedChatMessageHistory(
                 session_id=session_id,
-                connection_string=self.uri,
-                database_name="chat-history",
-                collection_name="test_user_history_generator",
-                history_size=10
+                connection_string=None,
+                database_name=HISTORY_STORE_CONFIG["database_name"],
+                collection_name=collection_name,
+                client=collection.database.client,
+                create_index=False,
+                history_size=history_size
             )
-        return current_message
+        if use_cache:
+            return CachedChatMessageHistory(cache=get_history_cache(), history=history, history_size=history_size)
+        return history
+
+    def get_summary_store(self, collection_name:str) -> SummaryStore:
+        """
+        Returns the store of the session summaries of a collection.
+        - The summaries get the indexes of the messages, so they expire with idle sessions.
+
+        Args:
+            collection_name (str): The collection holding the messages of the chain.
+        """
+        return SummaryStore(self.get_collection(f"{collection_name}_summaries"))
+
+class SQLiteHistoryBackend(HistoryBackend):
+    """
+    Stores the chat histories in a single SQLite file, for offline runs and single-node deployments.
+    """
+    def __init__(self, path:Optional[str]=None):
+        """
+        Args:
+            path (Optional[str]): The path of the database file (defaults to HISTORY_BACKEND_CONFIG["sqlite_path"]).
+        """
+        self.database = get_sqlite_database(path or HISTORY_BACKEND_CONFIG["sqlite_path"])
+
+    def create_history(self, session_id:str, collection_name:str, history_size:Optional[int]) -> BaseChatMessageHistory:
+        return SQLiteChatMessageHistory(self.database, collection_name=collection_name, session_id=session_id, history_size=history_size)
+
+    def get_summary_store(self, collection_name:str) -> SQLiteSummaryStore:
+        return SQLiteSummaryStore(self.database, collection_name=collection_name)
+
+class InMemoryHistoryBackend(HistoryBackend):
+    """
+    Keeps the chat histories in bounded in-process stores (see IN_MEMORY_HISTORY_CONFIG), for tests and benchmarks.
+    - The histories are lost when the process stops.
+    """
+    def __init__(self):
+        self.stores = {} # collection name -> BoundedSessionStore
+        self.summary_stores = {} # collection name -> InMemorySummaryStore
+        self.lock = threading.Lock()
+
+    def get_stores(self, collection_name:str) -> Tuple[BoundedSessionStore, InMemorySummaryStore]:
+        """
+        Returns the session and summary stores of a collection, creating them if needed.
+        - The summary of a dropped session is deleted with it.
+
+        Args:
+            collection_name (str): The collection holding the messages of the chain.
+        """
+        with self.lock:
+            if collection_name not in self.stores:
+                summary_store = InMemorySummaryStore(max_sessions=IN_MEMORY_HISTORY_CONFIG["max_sessions"])
+                self.summary_stores[collection_name] = summary_store
+                self.stores[collection_name] = BoundedSessionStore(**IN_MEMORY_HISTORY_CONFIG, on_remove=summary_store.delete)
+            return self.stores[collection_name], self.summary_stores[collection_name]
+
+    def create_history(self, session_id:str, collection_name:str, history_size:Optional[int]) -> BaseChatMessageHistory:
+        store, _ = self.get_stores(collection_name)
+        return RecentMessagesHistory(store.get(session_id), history_size=history_size)
+
+    def get_summary_store(self, collection_name:str) -> InMemorySummaryStore:
+        _, summary_store = self.get_stores(collection_name)
+        return summary_store
+
+HISTORY_BACKENDS = {
+    "mongodb": MongoHistoryBackend,
+    "sqlite": SQLiteHistoryBackend,
+    "memory": InMemoryHistoryBackend,
+}
+
+def get_history_backend(name:str) -> HistoryBackend:
+    """
+    Creates a chat history backend.
+
+    Args:
+        name (str): The name of the backend ("mongodb", "sqlite" or "memory").
+    """
+    if name not in HISTORY_BACKENDS:
+        raise ValueError(f"Unknown history backend: '{name}', expected one of {list(HISTORY_BACKENDS.keys())}")
+    return HISTORY_BACKENDS[name]()
+
+class Memory():
+    def __init__(self, backend:Optional[HistoryBackend]=None, summarizer:Optional[HistorySummarizer]=None):
+        """
+        Args:
+            backend (Optional[HistoryBackend]): Stores the chat histories (defaults to the backend
+                                                named by HISTORY_BACKEND or HISTORY_BACKEND_CONFIG).
+            summarizer (Optional[HistorySummarizer]): Summarizes the older turns (defaults to the
+                                                      summarizer shared by the process).
+        """
+        load_dotenv()
+        if backend is None:
+            backend = get_history_backend(os.getenv("HISTORY_BACKEND") or HISTORY_BACKEND_CONFIG["backend"])
+        self.backend = backend
+        self.summarizer = summarizer
+
+    def create_history(self, session_id:str, collection_name:str, history_size:Optional[int]) -> BaseChatMessageHistory:
+        """
+        Creates the chat history of a session with the configured backend.
+
+        Args:
+            session_id (str): The session ID.
+            collection_name (str): The collection holding the messages of the chain.
+            history_size (Optional[int]): The number of most recent messages to load (None for all).
+        """
+        return self.backend.create_history(session_id, collection_name, history_size=history_size)
+
+    def get_session_history(self, session_id:str, collection_name:str, summary_config:Dict[str, Any]) -> BaseChatMessageHistory:
+        """
+        Returns the chat history of a session stored in a collection of the backend.
+        - If enabled, older turns are replaced by a running summary (see HISTORY_SUMMARY_CONFIG).
+
+        Args:
+            session_id (str): The session ID.
+            collection_name (str): The collection holding the messages of the chain.
+            summary_config (Dict[str, Any]): The summarization settings of the chain.
+        """
+        if not summary_config["enabled"]:
+            return self.create_history(session_id, collection_name, history_size=10)
+
+        history_size = 2 * summary_config["keep_last_turns"] + summary_config["compaction_threshold"]
+        history = self.create_history(session_id, collection_name, history_size=history_size)
+        full_history = self.create_history(session_id, collection_name, history_size=None)
+        return SummarizedHistory(
+                                session_id=session_id,
+                                history=history,
+                                full_history=full_history,
+                                summary_store=self.backend.get_summary_store(collection_name),
+                                summarizer=self.summarizer or get_history_summarizer(),
+                                keep_last_turns=summary_config["keep_last_turns"],
+                                token_budget=summary_config["summary_token_budget"],
+                                compaction_threshold=summary_config["compaction_threshold"]
+                                )
+
+    def get_session_query_generator(self,session_id:str) -> BaseChatMessageHistory:
+        return self.get_session_history(
+                                        session_id=session_id,
+                                        collection_name="test_user_history_generator",
+                                        summary_config=HISTORY_SUMMARY_CONFIG["query_generator"]
+                                        )
     
     def get_session_query_responder(self,session_id:str) -> BaseChatMessageHistory:
-        current_message= MongoDBChatMessageHistory(
-                session_id=session_id,
-                connection_string=self.uri,
-                database_name="chat-history",
-                collection_name="test_user_history_responder",
-                history_size=10
-            )
-        return current_message
+        return self.get_session_history(
+                                        session_id=session_id,
+                                        collection_name="test_user_history_responder",
+                                        summary_config=HISTORY_SUMMARY_CONFIG["query_responder"]
+                                        )
         
\ No newline at end of file
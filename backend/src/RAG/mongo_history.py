@@ -0,0 +1,225 @@
+import json
+import argparse
+import threading
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from pymongo import ASCENDING, DESCENDING
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_mongodb import MongoDBChatMessageHistory
+
+from backend.src.constants import HISTORY_STORE_CONFIG
+
+TIMESTAMP_KEY = "CreatedAt"
+SESSION_INDEX_NAME = "session_created_at"
+TTL_INDEX_NAME = "created_at_ttl"
+
+last_timestamp = datetime.min.replace(tzinfo=timezone.utc)
+timestamp_lock = threading.Lock()
+
+def get_timestamps(n:int) -> List[datetime]:
+    """
+    Returns `n` increasing timestamps, later than all the timestamps returned before.
+    - MongoDB dates have a millisecond precision, so consecutive messages are at least 1 ms
+      apart to keep their order when sorted by timestamp.
+
+    Args:
+        n (int): The number of timestamps.
+    """
+    global last_timestamp
+    with timestamp_lock:
+        now = datetime.now(timezone.utc)
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000) # Stored with a millisecond precision
+        start = max(now, last_timestamp + timedelta(milliseconds=1))
+        timestamps = [start + timedelta(milliseconds=i) for i in range(n)]
+        if timestamps:
+            last_timestamp = timestamps[-1]
+        return timestamps
+
+def ensure_history_indexes(collection, session_id_key:str="SessionId", ttl:Optional[int]=None) -> Dict[str, str]:
+    """
+    Creates (or checks) the indexes of a chat history collection.
+    - A compound index on the session ID and the timestamp serves the sorted and limited
+      reads of the last messages of a session.
+    - A TTL index on the timestamp deletes messages older than `ttl` seconds (a single
+      field index, as MongoDB does not expire documents through compound indexes).
+    - An existing TTL index with a different retention is updated in place.
+
+    Args:
+        collection: The MongoDB collection holding the messages.
+        session_id_key (str): The field holding the session ID.
+        ttl (Optional[int]): The number of seconds messages are retained (None to keep them forever).
+
+    Returns:
+        Dict[str, str]: The action taken for each index ("created", "updated", "dropped" or "ok").
+    """
+    indexes = collection.index_information()
+    actions = {}
+
+    session_key = [(session_id_key, ASCENDING), (TIMESTAMP_KEY, ASCENDING)]
+    if SESSION_INDEX_NAME in indexes and indexes[SESSION_INDEX_NAME]["key"] == session_key:
+        actions[SESSION_INDEX_NAME] = "ok"
+    else:
+        collection.create_index(session_key, name=SESSION_INDEX_NAME)
+        actions[SESSION_INDEX_NAME] = "created"
+
+    existing_ttl = indexes.get(TTL_INDEX_NAME, {}).get("expireAfterSeconds")
+    if ttl is None:
+        if TTL_INDEX_NAME in indexes:
+            collection.drop_index(TTL_INDEX_NAME)
+            actions[TTL_INDEX_NAME] = "dropped"
+    elif TTL_INDEX_NAME not in indexes:
+        collection.create_index([(TIMESTAMP_KEY, ASCENDING)], name=TTL_INDEX_NAME, expireAfterSeconds=ttl)
+        actions[TTL_INDEX_NAME] = "created"
+    elif existing_ttl != ttl:
+        collection.database.command("collMod", collection.name, index={"name": TTL_INDEX_NAME, "expireAfterSeconds": ttl})
+        actions[TTL_INDEX_NAME] = "updated"
+    else:
+        actions[TTL_INDEX_NAME] = "ok"
+    return actions
+
+def backfill_timestamps(collection) -> int:
+    """
+    Sets the timestamp of messages written before timestamps were stored, using the
+    creation time encoded in their ObjectId.
+
+    Args:
+        collection: The MongoDB collection holding the messages.
+
+    Returns:
+        int: The number of updated messages.
+    """
+    result = collection.update_many(
+                                    {TIMESTAMP_KEY: {"$exists": False}},
+                                    [{"$set": {TIMESTAMP_KEY: {"$toDate": "$_id"}}}]
+                                    )
+    return result.modified_count
+
+class IndexedChatMessageHistory(MongoDBChatMessageHistory):
+    """
+    A MongoDB chat message history storing a timestamp with every message.
+
+    - Reads fetch only the message field of the last `history_size` messages with a single
+      sorted and limited query served by the (session ID, timestamp) index, instead of
+      counting and skipping over all messages of the session.
+    - The timestamp also drives the retention of the TTL index (see `ensure_history_indexes`).
+    """
+    def to_documents(self, messages:List[BaseMessage]) -> List[Dict[str, Any]]:
+        """
+        Converts messages to MongoDB documents, each with a distinct increasing timestamp.
+
+        Args:
+            messages (List[BaseMessage]): The messages to convert.
+        """
+        return [
+                {
+                    self.session_id_key: self.session_id,
+                    self.history_key: json.dumps(message_to_dict(message)),
+                    TIMESTAMP_KEY: timestamp
+                }
+                for message, timestamp in zip(messages, get_timestamps(len(messages)))
+                ]
+
+    def get_messages(self, limit:Optional[int]) -> List[BaseMessage]:
+        """
+        Returns the last `limit` messages of the session, oldest first.
+
+        Args:
+            limit (Optional[int]): The number of most recent messages (None for all).
+        """
+        query = {self.session_id_key: self.session_id}
+        projection = {"_id": 0, self.history_key: 1}
+        if limit is None:
+            cursor = self.collection.find(query, projection).sort(TIMESTAMP_KEY, ASCENDING)
+            documents = list(cursor)
+        elif limit <= 0:
+            documents = []
+        else:
+            cursor = self.collection.find(query, projection).sort(TIMESTAMP_KEY, DESCENDING).limit(limit)
+            documents = list(cursor)[::-1]
+        return messages_from_dict([json.loads(document[self.history_key]) for document in documents])
+
+    def get_last_timestamp(self) -> Optional[datetime]:
+        """
+        Returns the timestamp of the newest message of the session (None if it has no messages).
+        - Read from the (session ID, timestamp) index, it changes whenever a message is appended.
+        """
+        document = self.collection.find_one(
+                                            {self.session_id_key: self.session_id},
+                                            {"_id": 0, TIMESTAMP_KEY: 1},
+                                            sort=[(TIMESTAMP_KEY, DESCENDING)]
+                                            )
+        if document is None or TIMESTAMP_KEY not in document:
+            return None
+        timestamp = document[TIMESTAMP_KEY]
+        return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc) # Naive unless the client is tz_aware
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """
+        The (most recent) messages of the session, oldest first.
+        """
+        return self.get_messages(self.history_size)
+
+    def add_messages(self, messages:List[BaseMessage]) -> None:
+        """
+        Appends messages to the session with a single insert.
+
+        Args:
+            messages (List[BaseMessage]): The messages to append.
+        """
+        if messages:
+            self.collection.insert_many(self.to_documents(messages), ordered=True)
+
+    def add_message(self, message:BaseMessage) -> None:
+        self.add_messages([message])
+
+def migrate(uri:str, database_name:str, collection_names:List[str], ttl:Optional[int], drop_legacy_index:bool) -> None:
+    """
+    Adds the indexes to the chat history collections of an existing deployment.
+
+    Args:
+        uri (str): The MongoDB connection string.
+        database_name (str): The database holding the chat histories.
+        collection_names (List[str]): The chat history collections.
+        ttl (Optional[int]): The number of seconds messages are retained (None to keep them forever).
+        drop_legacy_index (bool): Whether to drop the single field session ID index, now covered by the compound index.
+    """
+    from backend.src.RAG.memory import get_mongo_client, close_mongo_clients
+
+    database = get_mongo_client(uri)[database_name]
+    for collection_name in collection_names:
+        collection = database[collection_name]
+        num_backfilled = backfill_timestamps(collection)
+        actions = ensure_history_indexes(collection, ttl=ttl)
+        if drop_legacy_index and "SessionId_1" in collection.index_information():
+            collection.drop_index("SessionId_1")
+            actions["SessionId_1"] = "dropped"
+        print(f"{collection_name}: backfilled {num_backfilled} timestamps, indexes: {actions}")
+    close_mongo_clients()
+
+def main() -> None:
+    import os
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Adds the session and TTL indexes to the chat history collections.")
+    parser.add_argument("--uri", default=os.getenv("MONGODB_URI"), help="MongoDB connection string (defaults to MONGODB_URI).")
+    parser.add_argument("--database", default=HISTORY_STORE_CONFIG["database_name"])
+    parser.add_argument("--collections", nargs="+", default=HISTORY_STORE_CONFIG["collections"])
+    parser.add_argument("--ttl", type=int, default=HISTORY_STORE_CONFIG["ttl"], help="Retention in seconds (0 to keep messages forever).")
+    parser.add_argument("--drop-legacy-index", action="store_true", help="Drop the old single field SessionId index.")
+    args = parser.parse_args()
+
+    if not args.uri:
+        raise Exception("MongoDB URI not found. Please pass --uri or set 'MONGODB_URI' in the environment variables.")
+    migrate(
+        uri=args.uri,
+        database_name=args.database,
+        collection_names=args.collections,
+        ttl=args.ttl or None,
+        drop_legacy_index=args.drop_legacy_index
+        )
+
+if __name__ == "__main__":
+    main()
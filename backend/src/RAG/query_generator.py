@@ -1,7 +1,7 @@
 import json
 
 from langchain_openai import ChatOpenAI
-from typing import List
+from typing import List, Optional
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from backend.src.RAG.utils import clean_search_query
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -15,8 +15,17 @@ load_dotenv()
 class ResearchQueryGenerator:
     """
     A class to generate multiple variations of a research query while handling edge cases.
+    - The session ID is passed with every call, so a single instance can be shared between
+      concurrent requests of different users.
     """
-    def __init__(self, openai_api_key:str,session_id:str):
+    def __init__(self, openai_api_key:str,session_id:Optional[str]=None):
+        """
+        Initialises the query generation chain.
+
+        Args:
+            openai_api_key (str): The OpenAI API key.
+            session_id (Optional[str]): The default session ID, used when no session ID is passed to `generate`.
+        """
         self.memory = Memory()
         self.session_id = session_id
         self.system_prompt_template = """
@@ -63,15 +72,50 @@ class ResearchQueryGenerator:
             history_messages_key="history"
             )
 
-    def generate(self, user_prompt:str) -> List[str]:
+    def get_session_config(self, session_id:Optional[str]) -> dict:
+        """
+        Returns the chain config selecting the chat history of the session.
+
+        Args:
+            session_id (Optional[str]): The session ID of the request (falls back to the default session ID).
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            raise ValueError("A session ID is required to load the chat history.")
+        return {"configurable":{"session_id":session_id}}
+
+    def generate(self, user_prompt:str, session_id:Optional[str]=None) -> List[str]:
         """
         Generates multiple variations of a research query while handling edge cases.
         - Returns a JSON list of possible queries or an error message.
         
         Args:
             user_prompt (str): The user's query.
+            session_id (Optional[str]): The session ID (e.g., username) whose chat history is used.
+        """
+        generated_query = self.query_chain.invoke({"question":user_prompt},config=self.get_session_config(session_id)).content
+        return self.parse_generated_queries(generated_query)
+
+    async def agenerate(self, user_prompt:str, session_id:Optional[str]=None) -> List[str]:
+        """
+        Asynchronous version of `generate`, so the event loop is not blocked while waiting for the LLM.
+        - The chat history is also read and written asynchronously.
+
+        Args:
+            user_prompt (str): The user's query.
+            session_id (Optional[str]): The session ID (e.g., username) whose chat history is used.
+        """
+        generated_query = (await self.query_chain.ainvoke({"question":user_prompt},config=self.get_session_config(session_id))).content
+        return self.parse_generated_queries(generated_query)
+
+    def parse_generated_queries(self, generated_query:str) -> List[str]:
+        """
+        Parses the output of the LLM into a list of queries.
+        - Returns a JSON list of possible queries or an error message.
+
+        Args:
+            generated_query (str): The output of the LLM.
         """
-        generated_query = self.query_chain.invoke({"question":user_prompt},config={"configurable":{"session_id":self.session_id}}).content
         print(generated_query)
         if "error" in generated_query.lower():
             return "ERROR"
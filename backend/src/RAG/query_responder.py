@@ -1,31 +1,46 @@
 import os
-from typing import List, Dict
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from backend.src.RAG.memory import get_by_session_id
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_mongodb import MongoDBChatMessageHistory
+from backend.src.RAG.context_packer import ContextPacker
+from backend.src.RAG.completion_cache import CompletionCache
+from backend.src.constants import CONTEXT_PACKING_CONFIG, COMPLETION_CACHE_CONFIG, BATCH_INFERENCE_CONFIG
 from dotenv import load_dotenv
 from .memory import Memory
 load_dotenv()
+logger = logging.getLogger(__name__)
+
 class QueryResponder:
     """
     Class that responds to a user query by combining the context and user query and
     passing it to an LLM model for a context-aware response.    
+    - The session ID is passed with every call, so a single instance can be shared between
+      concurrent requests of different users.
     """
-    def __init__(self, openai_api_key:str,session_id:str):
+    def __init__(self, openai_api_key:str,session_id:Optional[str]=None):
+        """
+        Initialises the question answering chain.
+
+        Args:
+            openai_api_key (str): The OpenAI API key.
+            session_id (Optional[str]): The default session ID, used when no session ID is passed to `generate_answer`.
+        """
         self.memory = Memory()
         self.session_id  = session_id
         
-        answer_prompt_template = """
+        # The instructions do not depend on the request, so they are sent first and form a prefix
+        # that stays the same between calls (and can be cached by the provider). The growing history
+        # follows, and the retrieved context and question come last.
+        system_prompt_template = """
         You are a helpful research assistant. 
         Please provide a concise, well-structured answer **and include direct quotes or references** from the provided context. 
         Use the format [Source: link] (link will be given to you with every paper right after word source).
-        Below are relevant excepts from academic papers:
-        {context}
-        
-        The user has asked the following question:
-        {question}
+        The relevant excerpts from academic papers and the question of the user are given in the last message.
 
         make as many points as necessary and make sure the answer is in numbered boullet points and ensure you conver as many papers 
         as possible 
@@ -34,14 +49,27 @@ class QueryResponder:
         If there is not context available DO NOT PROVIDE ANY LINKS OR INFORMATION and do not answer any questions UNLESSits a general question like
         hi, hello, my name is Raghav etc.
         """
-        query_template = ChatPromptTemplate([
+        question_template = """
+        Below are relevant excepts from academic papers:
+        {context}
+        
+        The user has asked the following question:
+        {question}
+        """
+        self.prompt_template = ChatPromptTemplate([
+            ("system", system_prompt_template),
             MessagesPlaceholder(variable_name="history"),
-            ("system", answer_prompt_template)
-            # Equivalently:
-            # MessagesPlaceholder(variable_name="conversation", optional=True)
+            ("human", question_template)
         ])
         
-        chain = query_template | ChatOpenAI(model="gpt-4o-mini", api_key=openai_api_key)
+        LLM_MODEL = "gpt-4o-mini"
+        self.completion_cache = CompletionCache(
+                                            max_size=COMPLETION_CACHE_CONFIG["max_size"],
+                                            store_completions=COMPLETION_CACHE_CONFIG["enabled"]
+                                            )
+        chain = self.prompt_template | ChatOpenAI(model=LLM_MODEL, api_key=openai_api_key, cache=self.completion_cache)
+        self.answer_chain = chain # Without chat history, used for independent questions (e.g., evaluation)
+        self.context_packer = ContextPacker(model_name=LLM_MODEL, **CONTEXT_PACKING_CONFIG)
         
         self.qa_chain = RunnableWithMessageHistory(
             chain,
@@ -50,17 +78,18 @@ class QueryResponder:
             history_messages_key="history"
             )
 
-    def format_documents(self, retrieved_docs:List[str]) -> str:
+    def format_documents(self, retrieved_docs:List[str], user_query:Optional[str]=None) -> str:
         """
         Formats the retrieved documents into a single string for the LLM model.
+        - Near-duplicates are removed and the documents are cut to the context token budget
+          (see CONTEXT_PACKING_CONFIG), keeping the most relevant to the user query if they do not fit.
 
         Args:
             retrieved_docs (List[str]): A list of retrieved documents.
+            user_query (Optional[str]): The user query, used to choose the documents by relevance when they do not fit.
         """
-        formatted_content = "\n\n".join(
-                                f"Source: {doc['metadata']['link']}\nContent: {doc['page_content']}"
-                                for doc in retrieved_docs
-                                )
+        formatted_content, packing_stats = self.context_packer.pack(retrieved_docs, user_query=user_query)
+        logger.debug(f"Context packing statistics: {packing_stats}")
         return formatted_content
     
     def combine_context_and_question(self, context_text:str, user_query:str) -> Dict[str, str]:
@@ -73,11 +102,52 @@ class QueryResponder:
         """
         return {"context": context_text, "question": user_query}
     
-    def generate_answer(self, retrieved_docs:List[str], user_query:str) -> str:
+    def get_session_config(self, session_id:Optional[str]) -> dict:
+        """
+        Returns the chain config selecting the chat history of the session.
+
+        Args:
+            session_id (Optional[str]): The session ID of the request (falls back to the default session ID).
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            raise ValueError("A session ID is required to load the chat history.")
+        return {"configurable":{"session_id":session_id}}
+
+    def generate_answer(self, retrieved_docs:List[str], user_query:str, session_id:Optional[str]=None) -> str:
         """
         Generates an answer based on the retrieved documents and user query by
         prompting the LLM model.
 
+        Args:
+            retrieved_docs (List[str]): A list of retrieved documents.
+            user_query (str): The user query.
+            session_id (Optional[str]): The session ID (e.g., username) whose chat history is used.
+        """
+        prompt = self.build_prompt(retrieved_docs=retrieved_docs, user_query=user_query)
+        answer = self.qa_chain.invoke(prompt,config=self.get_session_config(session_id)).content
+        logger.debug(f"Completion cache statistics: {self.completion_cache.get_stats()}")
+        return answer
+
+    async def agenerate_answer(self, retrieved_docs:List[str], user_query:str, session_id:Optional[str]=None) -> str:
+        """
+        Asynchronous version of `generate_answer`, so the event loop is not blocked while waiting for the LLM.
+        - The chat history is also read and written asynchronously.
+
+        Args:
+            retrieved_docs (List[str]): A list of retrieved documents.
+            user_query (str): The user query.
+            session_id (Optional[str]): The session ID (e.g., username) whose chat history is used.
+        """
+        prompt = self.build_prompt(retrieved_docs=retrieved_docs, user_query=user_query)
+        answer = (await self.qa_chain.ainvoke(prompt,config=self.get_session_config(session_id))).content
+        logger.debug(f"Completion cache statistics: {self.completion_cache.get_stats()}")
+        return answer
+
+    def build_prompt(self, retrieved_docs:List[str], user_query:str) -> Dict[str, str]:
+        """
+        Builds the prompt inputs from the retrieved documents and user query.
+
         Args:
             retrieved_docs (List[str]): A list of retrieved documents.
             user_query (str): The user query.
@@ -85,7 +155,75 @@ class QueryResponder:
         if len(retrieved_docs) == 0:
             formatted_content = ""
         else:
-            formatted_content = self.format_documents(retrieved_docs)
-        prompt = self.combine_context_and_question(context_text=formatted_content, user_query=user_query)
-        answer = self.qa_chain.invoke(prompt,config={"configurable":{"session_id":self.session_id}}).content
-        return answer
\ No newline at end of file
+            formatted_content = self.format_documents(retrieved_docs, user_query=user_query)
+        return self.combine_context_and_question(context_text=formatted_content, user_query=user_query)
+
+    async def agenerate_answers_batch(
+                                    self,
+                                    requests:List[Dict[str, Any]],
+                                    max_concurrency:Optional[int]=None,
+                                    timeout:Optional[float]=None
+                                    ) -> List[Dict[str, Any]]:
+        """
+        Generates the answers to several questions concurrently.
+        - At most `max_concurrency` LLM calls are in flight at once.
+        - Each question has its own timeout, covering the wait for its session and for a free slot,
+          and a failed or timed out question does not fail the others.
+        - Questions of the same session are answered in order, so its chat history stays consistent.
+        - Questions without a session are answered without chat history.
+
+        Args:
+            requests (List[Dict[str, Any]]): The questions, each a dictionary with "user_query",
+                                             "retrieved_docs" and (optionally) "session_id".
+            max_concurrency (Optional[int]): The maximum number of concurrent LLM calls (see BATCH_INFERENCE_CONFIG).
+            timeout (Optional[float]): The maximum number of seconds per question (see BATCH_INFERENCE_CONFIG).
+
+        Returns:
+            List[Dict[str, Any]]: The "answer" (or None) and "error" (or None) of each question, in the same order.
+        """
+        max_concurrency = max_concurrency or BATCH_INFERENCE_CONFIG["max_concurrency"]
+        timeout = timeout or BATCH_INFERENCE_CONFIG["timeout"]
+        semaphore = asyncio.Semaphore(max_concurrency)
+        session_locks = {request.get("session_id"): asyncio.Lock() for request in requests if request.get("session_id")}
+
+        async def answer(request:Dict[str, Any]) -> str:
+            prompt = self.build_prompt(retrieved_docs=request.get("retrieved_docs", []), user_query=request["user_query"])
+            session_id = request.get("session_id")
+            if session_id is None:
+                async with semaphore:
+                    return (await self.answer_chain.ainvoke({**prompt, "history": []})).content
+            async with session_locks[session_id]:
+                async with semaphore:
+                    config = self.get_session_config(session_id)
+                    return (await self.qa_chain.ainvoke(prompt, config=config)).content
+
+        async def answer_or_error(request:Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                return {"answer": await asyncio.wait_for(answer(request), timeout=timeout), "error": None}
+            except asyncio.TimeoutError:
+                return {"answer": None, "error": f"Timed out after {timeout} seconds"}
+            except Exception as e:
+                return {"answer": None, "error": str(e)}
+
+        results = await asyncio.gather(*(answer_or_error(request) for request in requests))
+        num_failed = sum(result["error"] is not None for result in results)
+        logger.info(f"Answered {len(results) - num_failed}/{len(results)} questions, completion cache statistics: {self.completion_cache.get_stats()}")
+        return list(results)
+
+    def generate_answers_batch(
+                            self,
+                            requests:List[Dict[str, Any]],
+                            max_concurrency:Optional[int]=None,
+                            timeout:Optional[float]=None
+                            ) -> List[Dict[str, Any]]:
+        """
+        Synchronous version of `agenerate_answers_batch` for scripts (e.g., evaluation runs).
+        - Must not be called from a running event loop, use `agenerate_answers_batch` there.
+
+        Args:
+            requests (List[Dict[str, Any]]): The questions, each a dictionary with "user_query",
+                                             "retrieved_docs" and (optionally) "session_id".
+            max_concurrency (Optional[int]): The maximum number of concurrent LLM calls.
+            timeout (Optional[float]): The maximum number of seconds per question.
+        """
+        return asyncio.run(self.agenerate_answers_batch(requests, max_concurrency=max_concurrency, timeout=timeout))
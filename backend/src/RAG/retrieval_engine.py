@@ -1,10 +1,43 @@
 import os
+import json
+import shutil
+import logging
+import tempfile
+import threading
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set, Iterable, Tuple
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
+from backend.src.RAG.snapshot import export_snapshot, import_snapshot
+from backend.src.RAG.text_splitter import TokenTextSplitter
+from backend.src.RAG.document_store import ParentDocumentStore
+from backend.src.RAG.semantic_cache import SemanticRetrievalCache
+from backend.src.RAG.utils import parse_published_date, ReadWriteLock
+from backend.src.constants import VECTOR_INDEX_CONFIG, RETRIEVAL_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "production_collection"
+# Index parameters that only take effect when the collection is created, the others are applied at search time
+REBUILD_ONLY_PARAMETERS = ("hnsw:space", "hnsw:M", "hnsw:construction_ef")
+
+def get_collection_metadata(index_config:Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts the vector index configuration into the ChromaDB collection metadata
+    used to build the HNSW index.
+
+    Args:
+        index_config (Dict[str, Any]): The vector index configuration (see VECTOR_INDEX_CONFIG).
+    """
+    return {
+            "hnsw:space": index_config["space"],
+            "hnsw:M": index_config["M"],
+            "hnsw:construction_ef": index_config["ef_construction"],
+            "hnsw:search_ef": index_config["ef_search"],
+            "hnsw:batch_size": index_config["batch_size"],
+            "hnsw:sync_threshold": index_config["sync_threshold"],
+            }
 
 class RetrievalEngine:
     """
@@ -16,27 +49,150 @@ class RetrievalEngine:
         - It then converts the retrieved entries to documents and adds them to the ChromaDB.
         - It then attempts to retrieve the documents again.
     """
-    def __init__(self, openai_api_key:str):
+    def __init__(
+                self,
+                openai_api_key:str,
+                chunk_size:int=256,
+                chunk_overlap:int=32,
+                return_parent_documents:bool=False,
+                parent_window:int=1,
+                index_config:Optional[Dict[str, Any]]=None,
+                use_retrieval_cache:bool=False,
+                retrieval_cache_config:Optional[Dict[str, Any]]=None
+                ):
         """
         Initialize the Retrieval Engine with the OpenAI API key and the ChromaDB.
 
         Args:
             openai_api_key (str): The OpenAI API key for the OpenAI services.
+            chunk_size (int): The maximum number of embedding-model tokens per chunk.
+            chunk_overlap (int): The maximum number of tokens shared by consecutive chunks of a document.
+            return_parent_documents (bool): Whether to return one parent document (e.g., the full abstract)
+                                            per paper instead of the matching chunks.
+            parent_window (int): The number of neighbouring chunks on each side stitched together when
+                                 the parent document is not in the document store.
+            index_config (Optional[Dict[str, Any]]): Overrides for the vector index parameters (see VECTOR_INDEX_CONFIG).
+            use_retrieval_cache (bool): Whether to reuse the results of earlier queries with a similar embedding.
+            retrieval_cache_config (Optional[Dict[str, Any]]): Overrides for the retrieval cache (see RETRIEVAL_CACHE_CONFIG).
         """
         os.environ["USER_AGENT"] = "myagent" # Always set a user agent
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-large", api_key=openai_api_key)
+        self.index_config = {**VECTOR_INDEX_CONFIG, **(index_config or {})}
+
+        EMBEDDING_MODEL = "text-embedding-3-large"
+        self.embeddings = OpenAIEmbeddings(
+                                        model=EMBEDDING_MODEL,
+                                        api_key=openai_api_key,
+                                        chunk_size=self.index_config["embedding_batch_size"]
+                                        )
 
         PERSIST_DIR = "chroma_db"
         if not os.path.exists(PERSIST_DIR):
             os.makedirs(PERSIST_DIR)
+        self.persist_dir = PERSIST_DIR
+
+        # Writes to the collection (adds, imports, rebuilds) run one at a time, and searches
+        # never run while a rebuild swaps the collection
+        self.write_lock = threading.RLock()
+        self.store_lock = ReadWriteLock()
         
-        self.vector_store = Chroma(collection_name="production_collection",persist_directory=PERSIST_DIR, embedding_function=embeddings)
+        self.vector_store = self.create_vector_store()
+        self.check_index_config()
+        self.document_store = ParentDocumentStore(path=os.path.join(PERSIST_DIR, "parent_documents.sqlite3"))
+        self.return_parent_documents = return_parent_documents
+        self.parent_window = parent_window
     
-        self.SEARCH_K = 5 # Number of documents to return
-        self.FETCH_K = self.SEARCH_K * 3 # Number of documents to fetch
+        self.SEARCH_K = self.index_config["search_k"] # Number of documents to return
+        self.FETCH_K = self.index_config["fetch_k"] # Number of documents to fetch
         self.initiate_vector_retriever()
 
-        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+        self.text_splitter = TokenTextSplitter(model_name=EMBEDDING_MODEL, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+        # Incremented whenever this process changes the corpus, so cached retrieval results can be invalidated
+        # (see `get_corpus_version` for the changes made by other processes)
+        self.corpus_version = 0
+        self.retrieval_cache = None
+        if use_retrieval_cache:
+            self.retrieval_cache = SemanticRetrievalCache(**{**RETRIEVAL_CACHE_CONFIG, **(retrieval_cache_config or {})})
+
+    def create_vector_store(self, collection_name:str=COLLECTION_NAME) -> Chroma:
+        """
+        Opens the ChromaDB collection, creating it with the configured index parameters if it does not exist.
+
+        Args:
+            collection_name (str): The name of the collection.
+        """
+        return Chroma(
+                    collection_name=collection_name,
+                    persist_directory=self.persist_dir,
+                    embedding_function=self.embeddings,
+                    collection_metadata=get_collection_metadata(self.index_config)
+                    )
+
+    def check_index_config(self) -> bool:
+        """
+        Checks whether the existing collection was built with the configured index parameters.
+        - The parameters of the graph (see REBUILD_ONLY_PARAMETERS) of an existing collection cannot
+          be changed, it has to be rebuilt. The other parameters (e.g., "hnsw:search_ef") are not checked.
+
+        Returns:
+            bool: True if the collection matches the configuration.
+        """
+        expected_metadata = get_collection_metadata(self.index_config)
+        current_metadata = self.vector_store._collection.metadata or {}
+        mismatches = {
+                    key: (current_metadata.get(key), expected_metadata[key])
+                    for key in REBUILD_ONLY_PARAMETERS
+                    if current_metadata.get(key) != expected_metadata[key]
+                    }
+        if mismatches:
+            logger.warning(
+                f"Vector index parameters differ from the configuration (current, configured): {mismatches}. "
+                "Call RetrievalEngine.rebuild_index() to apply them."
+                )
+        return len(mismatches) == 0
+
+    def rebuild_index(self) -> int:
+        """
+        Rebuilds the collection with the configured index parameters.
+        - The records are exported to a temporary snapshot and imported with their stored
+          embeddings into a new collection, so the embedding API is not called.
+        - The new collection only replaces the live one once the import succeeded. If the import
+          fails, the live collection is kept as is.
+        - If the swap itself fails, the snapshot is kept and its path is part of the error.
+        - Writes (e.g., from the indexing queue) wait from the export until the swap, so no chunk
+          added meanwhile is lost. Searches keep running on the live collection and only wait for the swap.
+
+        Returns:
+            int: The number of records in the rebuilt collection.
+        """
+        with self.write_lock:
+            temp_dir = tempfile.mkdtemp(prefix="chroma_rebuild_")
+            snapshot_dir = os.path.join(temp_dir, "snapshot")
+            rebuild_name = f"{COLLECTION_NAME}_rebuild"
+            export_snapshot(self.vector_store, output_dir=snapshot_dir)
+
+            new_store = None
+            try:
+                self.create_vector_store(collection_name=rebuild_name).delete_collection() # Left over by an earlier failed rebuild
+                new_store = self.create_vector_store(collection_name=rebuild_name)
+                num_records = import_snapshot(new_store, snapshot_dir=snapshot_dir)
+            except Exception:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                if new_store is not None:
+                    new_store.delete_collection()
+                raise
+
+            with self.store_lock.write():
+                try:
+                    self.vector_store.delete_collection()
+                    new_store._collection.modify(name=COLLECTION_NAME)
+                    self.vector_store = self.create_vector_store()
+                except Exception as e:
+                    raise RuntimeError(f"Failed to swap in the rebuilt vector index, the records are kept in the snapshot: {snapshot_dir}") from e
+                self.corpus_version += 1
+                self.initiate_vector_retriever()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return num_records
 
     def initiate_vector_retriever(self) -> None:
         """
@@ -48,6 +204,72 @@ class RetrievalEngine:
                                                             search_kwargs={"k": self.SEARCH_K, "fetch_k": self.FETCH_K}
                                                             )
     
+    def get_filterable_metadata(self, entry:Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalises the metadata of an entry into typed fields that can be filtered on
+        inside the vector search (ChromaDB only supports str/int/float/bool values, so
+        unknown values are left out rather than stored as None).
+
+        Args:
+            entry (Dict[str, Any]): The entry containing information about the research paper.
+        """
+        metadata = {}
+
+        published_date = parse_published_date(entry.get("published"))
+        if published_date is not None:
+            metadata["published_timestamp"] = int(published_date.timestamp())
+            metadata["year"] = published_date.year
+
+        source = entry.get("source")
+        if source is None: # Entries that were ingested before the source was recorded
+            source = "semantic_scholar" if entry.get("paper_link") else "arxiv"
+        metadata["source"] = source
+
+        if entry.get("citationCount") is not None:
+            metadata["citation_count"] = int(entry["citationCount"])
+        if entry.get("influentialCitationCount") is not None:
+            metadata["influential_citation_count"] = int(entry["influentialCitationCount"])
+        if entry.get("primary_category"):
+            metadata["category"] = entry["primary_category"]
+        return metadata
+
+    def build_metadata_filter(
+                            self,
+                            year_from:Optional[int]=None,
+                            year_to:Optional[int]=None,
+                            sources:Optional[List[str]]=None,
+                            categories:Optional[List[str]]=None,
+                            min_citations:Optional[int]=None
+                            ) -> Optional[Dict[str, Any]]:
+        """
+        Builds a ChromaDB "where" filter from the metadata filters of a query.
+        - Returns None if no filters are set.
+
+        Args:
+            year_from (Optional[int]): The earliest publication year (inclusive).
+            year_to (Optional[int]): The latest publication year (inclusive).
+            sources (Optional[List[str]]): The data sources to keep, e.g., ["arxiv"].
+            categories (Optional[List[str]]): The arXiv categories to keep, e.g., ["cs.CL"].
+            min_citations (Optional[int]): The minimum number of citations.
+        """
+        conditions = []
+        if year_from is not None:
+            conditions.append({"year": {"$gte": year_from}})
+        if year_to is not None:
+            conditions.append({"year": {"$lte": year_to}})
+        if sources:
+            conditions.append({"source": {"$in": list(sources)}})
+        if categories:
+            conditions.append({"category": {"$in": list(categories)}})
+        if min_citations is not None:
+            conditions.append({"citation_count": {"$gte": min_citations}})
+
+        if len(conditions) == 0:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
     def convert_entries_to_docs(self, entries:List[Dict[str, str]]) -> List[Document]:
         """
         Converts the retrieved entries into document objects.
@@ -66,7 +288,8 @@ class RetrievalEngine:
                         metadata={
                                 "title": entry["title"],
                                 "published": entry["published"],
-                                "link": link
+                                "link": link,
+                                **self.get_filterable_metadata(entry)
                                 },
                         )
             docs.append(doc)
@@ -74,37 +297,142 @@ class RetrievalEngine:
     
     def document_exists(self,link):
         """Check if a document with the same link exists in ChromaDB."""
-        print(f"link : {link}")
-        search_results = self.vector_store.similarity_search("", k=1, filter={"link": link})
-        print(search_results)
-        print(bool(search_results))  # Filter by link
-        return bool(search_results)  # If a document with the same link exists, return True
+        return link in self.get_existing_links([link])
+
+    def get_existing_links(self, links:Iterable[str]) -> Set[str]:
+        """
+        Returns the links that already have chunks in the ChromaDB.
+        - A single metadata lookup for all links, no query embedding is needed.
+
+        Args:
+            links (Iterable[str]): The links of the documents to check.
+        """
+        links = list(set(links))
+        if len(links) == 0:
+            return set()
+        results = self.vector_store.get(where={"link": {"$in": links}}, include=["metadatas"])
+        return {metadata.get("link") for metadata in results["metadatas"]}
 
 
     def split_and_add_documents(self, docs:List[Document]) -> None:
         """
         Splits the documents into chunks and adds the chunks to the ChromaDB.
+        - Documents whose link is already stored (or repeated in `docs`) are skipped, checked with
+          a single lookup for the whole batch.
+        - Waits for a running index rebuild to finish (see `rebuild_index`).
 
         Args:
             docs (List[Document]): A list of documents to split and add to the ChromaDB.
         """
-        
-        unique_docs = []
-        print(docs)
-        for doc in docs:
-            if not self.document_exists(doc.metadata["link"]):
-                unique_docs.append(doc)
-        
-        if len(unique_docs) == 0:
-            return
-        
-        all_splits = self.text_splitter.split_documents(unique_docs)
+        with self.write_lock:
+            known_links = self.get_existing_links(doc.metadata["link"] for doc in docs)
+            unique_docs = []
+            for doc in docs:
+                if doc.metadata["link"] not in known_links:
+                    known_links.add(doc.metadata["link"])
+                    unique_docs.append(doc)
+            
+            if len(unique_docs) == 0:
+                return
+            
+            # Keep the full documents so that retrieval can return them instead of the chunks
+            self.document_store.mset([(doc.metadata["link"], doc) for doc in unique_docs])
+
+            all_splits = self.text_splitter.split_documents(unique_docs)
+            logger.debug(f"Chunk statistics: {self.text_splitter.last_stats}")
+
+            # Index chunks into Chroma
+            self.vector_store.add_documents(documents=all_splits)
+            self.corpus_version += 1
+
+            # Update the vector retriever
+            self.initiate_vector_retriever() 
+
+    def export_snapshot(self, output_dir:str) -> Dict[str, Any]:
+        """
+        Exports the vector store (ids, embeddings, documents and metadata) to a snapshot directory.
+
+        Args:
+            output_dir (str): The directory to write the snapshot to.
+        """
+        return export_snapshot(self.vector_store, output_dir=output_dir)
+
+    def import_snapshot(self, snapshot_dir:str) -> int:
+        """
+        Bulk imports a snapshot into the vector store without re-embedding the documents.
+        - Used to warm start a new replica with an empty ChromaDB.
+
+        Args:
+            snapshot_dir (str): The directory containing the snapshot.
+        """
+        with self.write_lock:
+            num_records = import_snapshot(self.vector_store, snapshot_dir=snapshot_dir)
+            self.corpus_version += 1
+            self.initiate_vector_retriever()
+            return num_records
+
+    def stitch_neighbouring_chunks(self, chunk:Document) -> Document:
+        """
+        Builds a parent context for a chunk by stitching it together with its neighbouring
+        chunks of the same paper (used when the parent is not in the document store).
+
+        Args:
+            chunk (Document): The chunk that matched the query.
+        """
+        chunk_index = chunk.metadata.get("chunk_index")
+        if chunk_index is None:
+            return chunk
+
+        neighbours = self.vector_store.get(
+                                        where={"$and": [
+                                                {"link": chunk.metadata["link"]},
+                                                {"chunk_index": {"$gte": chunk_index - self.parent_window}},
+                                                {"chunk_index": {"$lte": chunk_index + self.parent_window}}
+                                                ]},
+                                        include=["documents", "metadatas"]
+                                        )
+        ordered_chunks = sorted(zip(neighbours["metadatas"], neighbours["documents"]), key=lambda x: x[0]["chunk_index"])
+        if len(ordered_chunks) == 0:
+            return chunk
+
+        # Consecutive chunks overlap by whole sentences, only keep them once
+        sentences = []
+        for _, page_content in ordered_chunks:
+            chunk_sentences = self.text_splitter.split_sentences(page_content)
+            num_overlapping = 0
+            for n in range(min(len(sentences), len(chunk_sentences)), 0, -1):
+                if sentences[-n:] == chunk_sentences[:n]:
+                    num_overlapping = n
+                    break
+            sentences.extend(chunk_sentences[num_overlapping:])
+
+        metadata = {key: value for key, value in chunk.metadata.items() if key not in ("chunk_index", "num_tokens")}
+        return Document(page_content=" ".join(sentences), metadata=metadata)
 
-        # Index chunks into Chroma
-        self.vector_store.add_documents(documents=all_splits)
+    def get_parent_documents(self, chunks:List[Document]) -> List[Document]:
+        """
+        Replaces the matching chunks by one parent document per paper, keeping the order of the
+        first matching chunk of each paper.
+        - The parent is read from the document store, or stitched from neighbouring chunks if missing.
+
+        Args:
+            chunks (List[Document]): The chunks that matched the queries, in ranked order.
+        """
+        first_chunks = {}
+        for chunk in chunks:
+            link = chunk.metadata.get("link")
+            if link not in first_chunks:
+                first_chunks[link] = chunk
+
+        links = list(first_chunks.keys())
+        parents = self.document_store.mget(links)
 
-        # Update the vector retriever
-        self.initiate_vector_retriever() 
+        parent_docs = []
+        for link, parent in zip(links, parents):
+            if parent is None:
+                parent = self.stitch_neighbouring_chunks(first_chunks[link])
+            parent_docs.append(parent)
+        return parent_docs
 
     def convert_docs_to_dicts(self, docs:List[Document]) -> List[Dict[str, Any]]:
         """
@@ -122,28 +450,108 @@ class RetrievalEngine:
             doc_dicts.append(doc_dict)
         return doc_dicts
     
-    def retrieve(self, user_queries:List[str]) -> List[Dict[str, Any]]:
+    def get_corpus_version(self) -> Tuple[int, int]:
+        """
+        Returns the version of the corpus used to invalidate the retrieval cache.
+        - The local counter covers the changes made by this process, and the number of records in
+          the collection covers the documents added by other processes sharing the ChromaDB directory.
+        """
+        with self.store_lock.read():
+            return self.corpus_version, self.vector_store._collection.count()
+
+    def retrieve(self, user_queries:List[str], metadata_filter:Optional[Dict[str, Any]]=None) -> List[Dict[str, Any]]:
         """
         The main function for retrieving documents based on the user query.
+        - If the retrieval cache is enabled, the results of a similar earlier request are reused.
         
         Args:
             user_query (str): The user query to search for relevant documents.
+            metadata_filter (Optional[Dict[str, Any]]): A ChromaDB "where" filter applied inside the
+                                                        vector search (see `build_metadata_filter`).
+        """
+        if self.retrieval_cache is not None:
+            # Embed all queries in one request, the embeddings are used for both the cache and the search
+            query_embeddings = self.embeddings.embed_documents(user_queries)
+            cache_embedding = self.retrieval_cache.get_query_embedding(query_embeddings)
+            filter_key = json.dumps(metadata_filter, sort_keys=True)
+            corpus_version = self.get_corpus_version()
+
+            cached_docs = self.retrieval_cache.lookup(cache_embedding, filter_key=filter_key, corpus_version=corpus_version)
+            if cached_docs is not None:
+                logger.debug(f"Retrieval cache hit, cache statistics: {self.retrieval_cache.get_stats()}")
+                return cached_docs
+
+            retrieved_docs = self.search(user_queries, metadata_filter=metadata_filter, query_embeddings=query_embeddings)
+            if retrieved_docs:
+                self.retrieval_cache.insert(cache_embedding, filter_key=filter_key, corpus_version=corpus_version, results=retrieved_docs)
+            return retrieved_docs
+
+        return self.search(user_queries, metadata_filter=metadata_filter)
+
+    def search(
+            self,
+            user_queries:List[str],
+            metadata_filter:Optional[Dict[str, Any]]=None,
+            query_embeddings:Optional[List[List[float]]]=None
+            ) -> List[Dict[str, Any]]:
+        """
+        Searches the vector store for the documents relevant to the queries.
+        - Waits while a rebuild swaps the collection (see `rebuild_index`).
+
+        Args:
+            user_queries (List[str]): The queries to search for.
+            metadata_filter (Optional[Dict[str, Any]]): A ChromaDB "where" filter applied inside the vector search.
+            query_embeddings (Optional[List[List[float]]]): The precomputed embedding of each query.
+        """
+        with self.store_lock.read():
+            return self.search_vector_store(user_queries, metadata_filter=metadata_filter, query_embeddings=query_embeddings)
+
+    def search_vector_store(
+                            self,
+                            user_queries:List[str],
+                            metadata_filter:Optional[Dict[str, Any]]=None,
+                            query_embeddings:Optional[List[List[float]]]=None
+                            ) -> List[Dict[str, Any]]:
+        """
+        Searches the vector store for the documents relevant to the queries (see `search`).
+        - Must be called with the store lock held.
+
+        Args:
+            user_queries (List[str]): The queries to search for.
+            metadata_filter (Optional[Dict[str, Any]]): A ChromaDB "where" filter applied inside the vector search.
+            query_embeddings (Optional[List[List[float]]]): The precomputed embedding of each query.
         """
         # Check if we have any documents first:
         all_results = []
-        for user_query in user_queries:
-            results = self.vector_store.similarity_search_with_score(query=user_query, k=self.SEARCH_K) # Get top K results
+        for i, user_query in enumerate(user_queries):
+            if query_embeddings is None:
+                results = self.vector_store.similarity_search_with_score(
+                                                                        query=user_query,
+                                                                        k=self.SEARCH_K,
+                                                                        filter=metadata_filter
+                                                                        ) # Get top K results
+            else:
+                results = self.vector_store.similarity_search_by_vector_with_relevance_scores(
+                                                                                            embedding=query_embeddings[i],
+                                                                                            k=self.SEARCH_K,
+                                                                                            filter=metadata_filter
+                                                                                            )
             all_results.extend(results)
         print("Number of results: ", len(results))
 
+        # Parents are deduplicated per paper, so the results of every query can be used
+        if self.return_parent_documents:
+            results = all_results
+
         # No results found
         if len(results) == 0:
             return []
         
         # >=1 results found
 
-        # Sort documents by score:
-        results = sorted(results, key=lambda x: x[1], reverse=True) # Descending order
+        # Most similar documents first: the search by query returns distances (lower is more similar),
+        # the search by embedding returns relevance scores (higher is more similar)
+        results = sorted(results, key=lambda x: x[1], reverse=query_embeddings is not None)
 
         retrieved_docs = []
         for doc, score in results:
@@ -152,6 +560,9 @@ class RetrievalEngine:
             print(score)
             print("\n")
             retrieved_docs.append(doc)
+
+        if self.return_parent_documents:
+            retrieved_docs = self.get_parent_documents(retrieved_docs)
         
         retrieved_docs = self.convert_docs_to_dicts(retrieved_docs)
         return retrieved_docs
\ No newline at end of file
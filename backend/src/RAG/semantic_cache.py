@@ -0,0 +1,145 @@
+import copy
+import threading
+import numpy as np
+
+from typing import Dict, Any, List, Optional, Hashable
+
+class SemanticRetrievalCache:
+    """
+    A cache of retrieval results keyed on the embedding of the queries.
+
+    - A lookup returns the results of the most similar cached query if its cosine similarity
+      is above the threshold, so rephrased queries (e.g., "recent transformer advances" and
+      "new developments in transformers") reuse the same documents.
+    - Only entries with the same metadata filter can match.
+    - All entries are dropped when the corpus version changes (e.g., new documents were indexed by this process or another one).
+    - The least recently used entry is evicted when the cache is full.
+    - The cache holds at most a few thousand queries, so the nearest neighbour is found with a
+      single matrix-vector product over the normalised query embeddings.
+    """
+    def __init__(self, max_size:int=1024, similarity_threshold:float=0.95):
+        """
+        Initialises an empty cache.
+
+        Args:
+            max_size (int): The maximum number of cached queries.
+            similarity_threshold (float): The minimum cosine similarity for a cached query to match.
+        """
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+        self.max_size = max_size
+        self.similarity_threshold = similarity_threshold
+
+        self.lock = threading.Lock()
+        self.embeddings = None # [max_size, dim], allocated on the first insert
+        self.entries = [] # (filter_key, results) per row of the embeddings
+        self.last_used = np.zeros(max_size, dtype=np.int64)
+        self.clock = 0
+        self.corpus_version = None
+
+        self.stats = {"hits": 0, "misses": 0, "inserts": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def get_query_embedding(query_embeddings:List[List[float]]) -> np.ndarray:
+        """
+        Combines the embeddings of the queries of a request into a single normalised embedding.
+
+        Args:
+            query_embeddings (List[List[float]]): The embedding of each query.
+        """
+        embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+        embedding = embeddings.mean(axis=0)
+        return embedding / (np.linalg.norm(embedding) + 1e-12)
+
+    def check_corpus_version(self, corpus_version:Hashable) -> None:
+        """
+        Drops all entries if the corpus changed since they were cached.
+        - Must be called with the lock held.
+
+        Args:
+            corpus_version (Hashable): The current version of the corpus.
+        """
+        if self.corpus_version == corpus_version:
+            return
+        if self.entries:
+            self.stats["invalidations"] += 1
+        self.entries = []
+        self.embeddings = None
+        self.corpus_version = corpus_version
+
+    def lookup(self, embedding:np.ndarray, filter_key:str, corpus_version:Hashable) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns the cached results of the most similar query, or None on a miss.
+
+        Args:
+            embedding (np.ndarray): The normalised query embedding (see `get_query_embedding`).
+            filter_key (str): The serialised metadata filter of the request.
+            corpus_version (Hashable): The current version of the corpus.
+        """
+        with self.lock:
+            self.check_corpus_version(corpus_version)
+            self.clock += 1
+
+            if self.entries:
+                similarities = self.embeddings[:len(self.entries)] @ embedding
+                for row in np.argsort(-similarities):
+                    if similarities[row] < self.similarity_threshold:
+                        break
+                    cached_filter_key, results = self.entries[row]
+                    if cached_filter_key == filter_key:
+                        self.last_used[row] = self.clock
+                        self.stats["hits"] += 1
+                        return copy.deepcopy(results)
+
+            self.stats["misses"] += 1
+            return None
+
+    def insert(self, embedding:np.ndarray, filter_key:str, corpus_version:Hashable, results:List[Dict[str, Any]]) -> None:
+        """
+        Caches the results of a query, evicting the least recently used entry if the cache is full.
+
+        Args:
+            embedding (np.ndarray): The normalised query embedding (see `get_query_embedding`).
+            filter_key (str): The serialised metadata filter of the request.
+            corpus_version (Hashable): The version of the corpus the results were retrieved from.
+            results (List[Dict[str, Any]]): The retrieved documents.
+        """
+        with self.lock:
+            self.check_corpus_version(corpus_version)
+            self.clock += 1
+
+            if self.embeddings is None:
+                self.embeddings = np.zeros((self.max_size, len(embedding)), dtype=np.float32)
+
+            if len(self.entries) < self.max_size:
+                row = len(self.entries)
+                self.entries.append(None)
+            else:
+                row = int(np.argmin(self.last_used))
+                self.stats["evictions"] += 1
+
+            self.embeddings[row] = embedding
+            self.entries[row] = (filter_key, copy.deepcopy(results))
+            self.last_used[row] = self.clock
+            self.stats["inserts"] += 1
+
+    def clear(self) -> None:
+        """
+        Drops all cached entries.
+        """
+        with self.lock:
+            self.entries = []
+            self.embeddings = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns the cache metrics, including the hit rate.
+        """
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                    **self.stats,
+                    "size": len(self.entries),
+                    "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+                    }
@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+import argparse
+import datetime
+import numpy as np
+
+from typing import Dict, Any, List
+from langchain_chroma import Chroma
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy" # float32 matrix [num_records, embedding_dim], memory-mapped on import
+RECORDS_FILE = "records.json" # Columnar: {"ids": [...], "documents": [...], "metadatas": [...]}
+
+def compute_checksum(file_path:str, block_size:int=1 << 20) -> str:
+    """
+    Computes the SHA-256 checksum of a file.
+
+    Args:
+        file_path (str): The path of the file.
+        block_size (int): The number of bytes to read at a time.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def export_snapshot(vector_store:Chroma, output_dir:str, batch_size:int=5000) -> Dict[str, Any]:
+    """
+    Exports every record of a Chroma collection (ids, embeddings, documents and metadata)
+    into a snapshot directory so it can be imported into a fresh store without
+    calling the embedding API.
+
+    Args:
+        vector_store (Chroma): The vector store to export.
+        output_dir (str): The directory to write the snapshot to (must not contain a snapshot already).
+        batch_size (int): The number of records to read from the collection at a time.
+
+    Returns:
+        Dict[str, Any]: The manifest of the snapshot.
+    """
+    if os.path.exists(os.path.join(output_dir, MANIFEST_FILE)):
+        raise FileExistsError(f"A snapshot already exists in {output_dir}.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    collection = vector_store._collection
+    num_records = collection.count()
+
+    ids, documents, metadatas, embeddings = [], [], [], []
+    for offset in range(0, num_records, batch_size):
+        batch = collection.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        ids.extend(batch["ids"])
+        documents.extend(batch["documents"])
+        metadatas.extend(batch["metadatas"])
+        embeddings.append(np.asarray(batch["embeddings"], dtype=np.float32))
+
+    if len(embeddings) > 0:
+        embeddings = np.concatenate(embeddings, axis=0)
+    else:
+        embeddings = np.zeros((0, 0), dtype=np.float32)
+
+    embeddings_path = os.path.join(output_dir, EMBEDDINGS_FILE)
+    records_path = os.path.join(output_dir, RECORDS_FILE)
+    np.save(embeddings_path, embeddings)
+    with open(records_path, "w", encoding="utf-8") as f:
+        json.dump({"ids": ids, "documents": documents, "metadatas": metadatas}, f)
+
+    manifest = {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "collection_name": collection.name,
+                "num_records": len(ids),
+                "embedding_dim": int(embeddings.shape[1]),
+                "checksums": {
+                            EMBEDDINGS_FILE: compute_checksum(embeddings_path),
+                            RECORDS_FILE: compute_checksum(records_path)
+                            }
+                }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+def load_manifest(snapshot_dir:str, verify:bool=True) -> Dict[str, Any]:
+    """
+    Loads the manifest of a snapshot and checks its version and (optionally) the checksums of its files.
+
+    Args:
+        snapshot_dir (str): The directory containing the snapshot.
+        verify (bool): Whether to verify the checksums of the snapshot files.
+    """
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+                        f"Unsupported snapshot format version: {manifest.get('format_version')}, "
+                        f"expected: {SNAPSHOT_FORMAT_VERSION}"
+                        )
+    if verify:
+        for file_name, expected_checksum in manifest["checksums"].items():
+            if compute_checksum(os.path.join(snapshot_dir, file_name)) != expected_checksum:
+                raise ValueError(f"Checksum mismatch for {file_name}, the snapshot may be corrupted.")
+    return manifest
+
+def import_snapshot(vector_store:Chroma, snapshot_dir:str, batch_size:int=5000, verify:bool=True) -> int:
+    """
+    Bulk imports a snapshot into a Chroma collection using the stored embeddings
+    (the embedding API is never called).
+    - Records are upserted, so importing into a non-empty collection overwrites records with the same ids.
+
+    Args:
+        vector_store (Chroma): The vector store to import into.
+        snapshot_dir (str): The directory containing the snapshot.
+        batch_size (int): The number of records to write to the collection at a time.
+        verify (bool): Whether to verify the checksums of the snapshot files before importing.
+
+    Returns:
+        int: The number of imported records.
+    """
+    manifest = load_manifest(snapshot_dir, verify=verify)
+
+    embeddings = np.load(os.path.join(snapshot_dir, EMBEDDINGS_FILE), mmap_mode="r")
+    with open(os.path.join(snapshot_dir, RECORDS_FILE), "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    num_records = manifest["num_records"]
+    if len(records["ids"]) != num_records or embeddings.shape[0] != num_records:
+        raise ValueError("The number of records does not match the snapshot manifest.")
+
+    collection = vector_store._collection
+    batch_size = min(batch_size, collection._client.get_max_batch_size())
+    for start in range(0, num_records, batch_size):
+        end = start + batch_size
+        collection.upsert(
+                        ids=records["ids"][start:end],
+                        embeddings=np.asarray(embeddings[start:end]),
+                        documents=records["documents"][start:end],
+                        metadatas=records["metadatas"][start:end]
+                        )
+    return num_records
+
+def get_vector_store(persist_dir:str, collection_name:str) -> Chroma:
+    """
+    Opens a Chroma collection without an embedding function (only stored embeddings are used).
+
+    Args:
+        persist_dir (str): The directory of the ChromaDB.
+        collection_name (str): The name of the collection.
+    """
+    return Chroma(collection_name=collection_name, persist_directory=persist_dir)
+
+def main(args:List[str]=None) -> None:
+    """
+    Command line interface for exporting and importing snapshots, e.g.:
+        python -m backend.src.RAG.snapshot export --output snapshots/latest
+        python -m backend.src.RAG.snapshot import --input snapshots/latest
+    """
+    parser = argparse.ArgumentParser(description="Export/import snapshots of the vector store.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--persist_dir", default="chroma_db")
+    parser.add_argument("--collection_name", default="production_collection")
+    parser.add_argument("--output", help="The directory to export the snapshot to.")
+    parser.add_argument("--input", help="The snapshot directory to import.")
+    parser.add_argument("--batch_size", type=int, default=5000)
+    parser.add_argument("--skip_verify", action="store_true", help="Skip checksum verification on import.")
+    args = parser.parse_args(args)
+
+    vector_store = get_vector_store(persist_dir=args.persist_dir, collection_name=args.collection_name)
+    if args.command == "export":
+        output_dir = args.output or os.path.join(
+                                                "snapshots",
+                                                f"{args.collection_name}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}"
+                                                )
+        manifest = export_snapshot(vector_store, output_dir=output_dir, batch_size=args.batch_size)
+        print(f"Exported {manifest['num_records']} records to {output_dir}")
+    else:
+        if not args.input:
+            parser.error("--input is required for import")
+        num_records = import_snapshot(vector_store, snapshot_dir=args.input, batch_size=args.batch_size, verify=not args.skip_verify)
+        print(f"Imported {num_records} records into {args.collection_name}")
+
+if __name__ == "__main__":
+    main()
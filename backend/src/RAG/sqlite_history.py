@@ -0,0 +1,188 @@
+import json
+import time
+import sqlite3
+import threading
+
+from typing import Dict, Any, List, Optional
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+class SQLiteDatabase:
+    """
+    A single file SQLite database holding the chat histories and summaries of every collection.
+
+    - The database runs in WAL mode, so readers (e.g., other processes) are not blocked by a writer.
+    - A single connection is shared by the threads of the process, guarded by a lock.
+    """
+    def __init__(self, path:str):
+        """
+        Opens (or creates) the database.
+
+        Args:
+            path (str): The path of the database file (":memory:" for a temporary database).
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL") # Durable across application crashes, fsync on checkpoints only
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_session ON messages (collection, session_id, id);
+            CREATE TABLE IF NOT EXISTS summaries (
+                collection TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                last_summarized TEXT NOT NULL,
+                PRIMARY KEY (collection, session_id)
+            );
+            """
+        )
+
+    def execute(self, sql:str, parameters:tuple=()) -> List[tuple]:
+        """
+        Runs a statement and returns the fetched rows.
+
+        Args:
+            sql (str): The SQL statement.
+            parameters (tuple): The parameters of the statement.
+        """
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def executemany(self, sql:str, parameters:List[tuple]) -> None:
+        """
+        Runs a statement for every set of parameters in a single transaction.
+
+        Args:
+            sql (str): The SQL statement.
+            parameters (List[tuple]): The parameters of each statement.
+        """
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                self.connection.executemany(sql, parameters)
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+        with self.lock:
+            self.connection.close()
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """
+    A chat message history of a session stored in a SQLite database.
+    """
+    def __init__(self, database:SQLiteDatabase, collection_name:str, session_id:str, history_size:Optional[int]=None):
+        """
+        Args:
+            database (SQLiteDatabase): The shared database.
+            collection_name (str): The collection (chain) the messages belong to.
+            session_id (str): The session ID.
+            history_size (Optional[int]): The number of most recent messages to load (None for all).
+        """
+        self.database = database
+        self.collection_name = collection_name
+        self.session_id = session_id
+        self.history_size = history_size
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """
+        The (most recent) messages of the session, oldest first.
+        """
+        if self.history_size is None:
+            rows = self.database.execute(
+                                        "SELECT message FROM messages WHERE collection = ? AND session_id = ? ORDER BY id",
+                                        (self.collection_name, self.session_id)
+                                        )
+        elif self.history_size <= 0:
+            rows = []
+        else:
+            rows = self.database.execute(
+                                        "SELECT message FROM messages WHERE collection = ? AND session_id = ? ORDER BY id DESC LIMIT ?",
+                                        (self.collection_name, self.session_id, self.history_size)
+                                        )[::-1]
+        return messages_from_dict([json.loads(message) for (message,) in rows])
+
+    def add_messages(self, messages:List[BaseMessage]) -> None:
+        """
+        Appends messages to the session in a single transaction.
+
+        Args:
+            messages (List[BaseMessage]): The messages to append.
+        """
+        now = time.time()
+        self.database.executemany(
+                                "INSERT INTO messages (collection, session_id, message, created_at) VALUES (?, ?, ?, ?)",
+                                [(self.collection_name, self.session_id, json.dumps(message_to_dict(message)), now) for message in messages]
+                                )
+
+    def clear(self) -> None:
+        """
+        Deletes the messages of the session.
+        """
+        self.database.execute("DELETE FROM messages WHERE collection = ? AND session_id = ?", (self.collection_name, self.session_id))
+
+class SQLiteSummaryStore:
+    """
+    Stores the running summary of the older turns of each session in a SQLite database.
+    """
+    def __init__(self, database:SQLiteDatabase, collection_name:str):
+        """
+        Args:
+            database (SQLiteDatabase): The shared database.
+            collection_name (str): The collection (chain) the summaries belong to.
+        """
+        self.database = database
+        self.collection_name = collection_name
+
+    def get(self, session_id:str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the summary ("summary", "last_summarized") of the session, or None.
+
+        Args:
+            session_id (str): The session ID.
+        """
+        rows = self.database.execute(
+                                    "SELECT summary, last_summarized FROM summaries WHERE collection = ? AND session_id = ?",
+                                    (self.collection_name, session_id)
+                                    )
+        if not rows:
+            return None
+        return {"summary": rows[0][0], "last_summarized": rows[0][1]}
+
+    def set(self, session_id:str, summary:str, last_summarized:str) -> None:
+        """
+        Stores the summary of the session.
+
+        Args:
+            session_id (str): The session ID.
+            summary (str): The summary of the older turns.
+            last_summarized (str): The ID of the last message folded into the summary.
+        """
+        self.database.execute(
+                            "INSERT OR REPLACE INTO summaries (collection, session_id, summary, last_summarized) VALUES (?, ?, ?, ?)",
+                            (self.collection_name, session_id, summary, last_summarized)
+                            )
+
+    def delete(self, session_id:str) -> None:
+        """
+        Deletes the summary of the session.
+
+        Args:
+            session_id (str): The session ID.
+        """
+        self.database.execute("DELETE FROM summaries WHERE collection = ? AND session_id = ?", (self.collection_name, session_id))
@@ -0,0 +1,149 @@
+import re
+import tiktoken
+import numpy as np
+
+from typing import Dict, Any, List
+from langchain_core.documents import Document
+
+class TokenTextSplitter:
+    """
+    A class that splits documents into chunks measured in embedding-model tokens.
+
+    - Chunks are built from whole sentences so they do not stop mid-sentence.
+    - Sentences longer than the chunk size are split on token boundaries.
+    - Consecutive chunks of a document share up to `chunk_overlap` tokens of trailing sentences.
+    - All sentences of a batch of documents are tokenized in a single (multi-threaded) pass.
+    """
+    def __init__(self, model_name:str="text-embedding-3-large", chunk_size:int=256, chunk_overlap:int=32):
+        """
+        Initialises the splitter with the tokenizer of the embedding model.
+
+        Args:
+            model_name (str): The embedding model whose tokenizer is used to count tokens.
+            chunk_size (int): The maximum number of tokens per chunk.
+            chunk_overlap (int): The maximum number of tokens shared by consecutive chunks.
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+
+        self.encoding = tiktoken.encoding_for_model(model_name)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.sentence_pattern = re.compile(r"(?<=[.!?])\s+")
+        self.last_stats = {}
+
+    def split_sentences(self, text:str) -> List[str]:
+        """
+        Splits a text into sentences on sentence-ending punctuation.
+
+        Args:
+            text (str): The text to split.
+        """
+        return [sentence.strip() for sentence in self.sentence_pattern.split(text) if sentence.strip()]
+
+    def count_tokens(self, texts:List[str]) -> List[int]:
+        """
+        Counts the number of tokens in each text in a single batched call.
+
+        Args:
+            texts (List[str]): The texts to count the tokens of.
+        """
+        return [len(tokens) for tokens in self.encoding.encode_batch(texts)]
+
+    def pack_sentences(self, sentences:List[str], sentence_tokens:List[List[int]]) -> List[Dict[str, Any]]:
+        """
+        Greedily packs consecutive sentences into chunks of at most `chunk_size` tokens.
+
+        Args:
+            sentences (List[str]): The sentences of a single document.
+            sentence_tokens (List[List[int]]): The token ids of each sentence.
+
+        Returns:
+            List[Dict[str, Any]]: The chunks, each with its "text" and "num_tokens".
+        """
+        # Split sentences that do not fit into a single chunk on token boundaries
+        pieces = []
+        for sentence, tokens in zip(sentences, sentence_tokens):
+            if len(tokens) <= self.chunk_size:
+                pieces.append((sentence, len(tokens)))
+                continue
+            step = self.chunk_size - self.chunk_overlap
+            for start in range(0, len(tokens), step):
+                window = tokens[start:start + self.chunk_size]
+                pieces.append((self.encoding.decode(window), len(window)))
+                if start + self.chunk_size >= len(tokens):
+                    break
+
+        chunks = []
+        current, current_tokens = [], 0
+        for piece, num_tokens in pieces:
+            if current and current_tokens + num_tokens > self.chunk_size:
+                chunks.append({"text": " ".join(text for text, _ in current), "num_tokens": current_tokens})
+
+                # Carry over the trailing pieces that fit into the overlap
+                overlap, overlap_tokens = [], 0
+                for text, text_tokens in reversed(current):
+                    if overlap_tokens + text_tokens > self.chunk_overlap:
+                        break
+                    overlap.insert(0, (text, text_tokens))
+                    overlap_tokens += text_tokens
+                # Never let the overlap push the next chunk over the limit
+                while overlap and overlap_tokens + num_tokens > self.chunk_size:
+                    overlap_tokens -= overlap.pop(0)[1]
+                current, current_tokens = overlap, overlap_tokens
+
+            current.append((piece, num_tokens))
+            current_tokens += num_tokens
+
+        if current:
+            chunks.append({"text": " ".join(text for text, _ in current), "num_tokens": current_tokens})
+        return chunks
+
+    def split_documents(self, docs:List[Document]) -> List[Document]:
+        """
+        Splits the documents into token-bounded chunks, keeping the metadata of each document.
+        - Adds "chunk_index" and "num_tokens" to the metadata of each chunk.
+        - Records chunk size statistics in `last_stats`.
+
+        Args:
+            docs (List[Document]): The documents to split.
+        """
+        all_sentences = [self.split_sentences(doc.page_content) for doc in docs]
+
+        # Tokenize every sentence of every document in one pass
+        flat_sentences = [sentence for sentences in all_sentences for sentence in sentences]
+        flat_tokens = self.encoding.encode_batch(flat_sentences)
+
+        chunks = []
+        offset = 0
+        for doc, sentences in zip(docs, all_sentences):
+            sentence_tokens = flat_tokens[offset:offset + len(sentences)]
+            offset += len(sentences)
+            for chunk_index, chunk in enumerate(self.pack_sentences(sentences, sentence_tokens)):
+                metadata = {**doc.metadata, "chunk_index": chunk_index, "num_tokens": chunk["num_tokens"]}
+                chunks.append(Document(page_content=chunk["text"], metadata=metadata))
+
+        self.last_stats = self.get_chunk_stats(chunks, num_documents=len(docs))
+        return chunks
+
+    def get_chunk_stats(self, chunks:List[Document], num_documents:int) -> Dict[str, Any]:
+        """
+        Computes chunk size statistics (in tokens), used to tune chunking cost against recall.
+
+        Args:
+            chunks (List[Document]): The chunks produced by `split_documents`.
+            num_documents (int): The number of documents that were split.
+        """
+        num_tokens = np.array([chunk.metadata["num_tokens"] for chunk in chunks])
+        if len(num_tokens) == 0:
+            return {"num_documents": num_documents, "num_chunks": 0, "total_tokens": 0}
+        return {
+                "num_documents": num_documents,
+                "num_chunks": len(chunks),
+                "total_tokens": int(num_tokens.sum()),
+                "min_tokens": int(num_tokens.min()),
+                "mean_tokens": float(num_tokens.mean()),
+                "p50_tokens": float(np.percentile(num_tokens, 50)),
+                "p95_tokens": float(np.percentile(num_tokens, 95)),
+                "max_tokens": int(num_tokens.max())
+                }
@@ -1,5 +1,10 @@
+import threading
 import urllib.parse
 
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional, Iterator
+
 def clean_search_query(search_query:str) -> str:
     """
     Cleans the search query by replacing spaces with '+'.
@@ -7,4 +12,76 @@ def clean_search_query(search_query:str) -> str:
     Args:
         search_query (str): The search query to clean.
     """
-    return urllib.parse.quote_plus(search_query.strip())
\ No newline at end of file
+    return urllib.parse.quote_plus(search_query.strip())
+
+def parse_published_date(published:str) -> Optional[datetime]:
+    """
+    Parses the publication date of an entry into a UTC datetime.
+    - ArXiv uses ISO timestamps, e.g., "2021-01-01T00:00:00Z".
+    - Semantic Scholar only provides the year, e.g., "2021" (parsed as the 1st of January).
+    - Returns None if the date is missing or cannot be parsed.
+
+    Args:
+        published (str): The publication date string.
+    """
+    if not published:
+        return None
+    published = str(published).strip()
+
+    for date_format in ("%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d", "%Y"):
+        try:
+            return datetime.strptime(published, date_format).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    try:
+        parsed_date = datetime.fromisoformat(published.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed_date.tzinfo is None:
+        parsed_date = parsed_date.replace(tzinfo=timezone.utc)
+    return parsed_date.astimezone(timezone.utc)
+
+class ReadWriteLock:
+    """
+    A lock shared by any number of readers or held by a single writer.
+    - A waiting writer holds back new readers, so writers are not starved by a steady flow of reads.
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.num_readers = 0
+        self.is_writing = False
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """
+        Holds the lock shared with the other readers.
+        """
+        with self.condition:
+            while self.is_writing:
+                self.condition.wait()
+            self.num_readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.num_readers -= 1
+                if self.num_readers == 0:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """
+        Holds the lock exclusively, once the current readers are done.
+        """
+        with self.condition:
+            while self.is_writing:
+                self.condition.wait()
+            self.is_writing = True
+            while self.num_readers > 0:
+                self.condition.wait()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.is_writing = False
+                self.condition.notify_all()
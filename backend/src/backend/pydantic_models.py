@@ -1,12 +1,24 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class ResearchPaperQuery(BaseModel):
     user_query: str # E.g., "Are there any recent advancements in transformer models?"
     mode: str # i.e., "fast" or "specific"
+    # Optional metadata filters, applied inside the vector search
+    year_from: Optional[int] = None # E.g., 2023 for "papers since 2023"
+    year_to: Optional[int] = None
+    sources: Optional[list[str]] = None # i.e., "arxiv" and/or "semantic_scholar"
+    categories: Optional[list[str]] = None # arXiv categories, e.g., "cs.CL"
+    min_citations: Optional[int] = None
 
 class DataIngestionQuery(BaseModel):
     user_queries: list[str] # E.g., "Are there any recent advancements in transformer models?"
 
 class LLMInferenceQuery(BaseModel):
     user_query: str # E.g., "Are there any recent advancements in transformer models?"
-    responses: list # List of dictionaries containing retrieved documents
\ No newline at end of file
+    responses: list # List of dictionaries containing retrieved documents
+
+class LLMInferenceBatchQuery(BaseModel):
+    requests: list[LLMInferenceQuery] # The questions to answer, each with its retrieved documents
+    use_history: bool = False # Whether to use (and update) the chat history of the user, answers questions of the same user in order
+    timeout: Optional[float] = None # Max number of seconds per question
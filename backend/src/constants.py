@@ -14,6 +14,9 @@ ENDPOINT_URLS = {
         "base_url": "localhost:8001",
         "app_name": "app_data_ingestion",
         "path": "/data_ingestion",
+        "additional_paths": {
+            "stream": "/data_ingestion/stream", # NDJSON, one entry per line as soon as it is processed
+        }
     },
     "retrieval": {
         "base_url": "localhost:8002",
@@ -25,4 +28,140 @@ ENDPOINT_URLS = {
         "app_name": "app_llm_inference",
         "path": "/llm_inference",
     }
-}
\ No newline at end of file
+}
+
+# Vector index (ChromaDB HNSW) construction and search parameters.
+# - "space", "M" and "ef_construction" only take effect when the collection is created or rebuilt
+#   (see RetrievalEngine.rebuild_index).
+# - Use benchmarks/index_tuning.py to find settings for a target recall and latency on a sample of the corpus.
+VECTOR_INDEX_CONFIG = {
+    "space": "l2", # Distance function: "l2", "cosine" or "ip"
+    "M": 16, # Max number of neighbours per node in the graph
+    "ef_construction": 100, # Size of the candidate list when building the graph
+    "ef_search": 100, # Size of the candidate list when searching
+    "batch_size": 100, # Number of vectors buffered before they are added to the index
+    "sync_threshold": 1000, # Number of vectors added before the index is persisted to disk
+    "search_k": 5, # Number of documents to return per query
+    "fetch_k": 15, # Number of documents to fetch for MMR
+    "embedding_batch_size": 1000, # Number of chunks embedded per OpenAI request
+}
+
+# Background indexing of newly ingested documents (see indexing_queue.py).
+INDEXING_QUEUE_CONFIG = {
+    "wait_timeout": 30, # Max number of seconds a request waits for its documents to be indexed, then it serves what is already indexed
+}
+
+# Semantic retrieval cache, reuses the results of earlier queries with a similar embedding.
+RETRIEVAL_CACHE_CONFIG = {
+    "max_size": 1024, # Max number of cached queries
+    "similarity_threshold": 0.95, # Min cosine similarity between query embeddings for a cache hit
+}
+
+# Packing of the retrieved documents into the context of the LLM (see QueryResponder.format_documents).
+CONTEXT_PACKING_CONFIG = {
+    "max_context_tokens": 4000, # Max number of tokens of the retrieved documents in the prompt
+    "duplicate_threshold": 0.8, # Min Jaccard similarity (of word 3-grams) for two passages to be near-duplicates
+}
+
+# Local cache of LLM completions, keyed by the exact rendered prompt and the model parameters.
+COMPLETION_CACHE_CONFIG = {
+    "enabled": False, # Only reuses answers to identical prompts (same history, context and question)
+    "max_size": 256, # Max number of cached completions
+}
+
+# Rolling summarization of the chat history of each chain.
+# - The last "keep_last_turns" turns are sent verbatim, older turns are folded into a summary
+#   of at most "summary_token_budget" tokens in the background.
+# - A compaction runs once "compaction_threshold" messages older than the last turns are not
+#   summarized yet (they are sent verbatim until then).
+HISTORY_SUMMARY_CONFIG = {
+    "query_generator": {
+        "enabled": True,
+        "keep_last_turns": 3,
+        "summary_token_budget": 150,
+        "compaction_threshold": 4,
+    },
+    "query_responder": {
+        "enabled": True,
+        "keep_last_turns": 2, # Answers are long and citation-heavy
+        "summary_token_budget": 400,
+        "compaction_threshold": 4,
+    },
+}
+
+# Batch answer generation (see QueryResponder.generate_answers_batch).
+BATCH_INFERENCE_CONFIG = {
+    "max_concurrency": 8, # Max number of concurrent LLM calls
+    "timeout": 60, # Max number of seconds per question
+    "max_batch_size": 100, # Max number of questions per request to the batch endpoint
+}
+
+# Connection pool of the MongoDB client shared by all chat histories of a process.
+MONGO_CLIENT_CONFIG = {
+    "maxPoolSize": 50, # Max number of connections per server
+    "minPoolSize": 2, # Connections kept open, so requests do not wait for a new connection
+    "maxIdleTimeMS": 300000, # Idle connections are closed after 5 minutes
+    "serverSelectionTimeoutMS": 5000, # Fail fast if MongoDB is unreachable
+    "connectTimeoutMS": 5000,
+    "retryWrites": True,
+}
+
+# In-process cache of the chat histories, messages are written to MongoDB in the background.
+HISTORY_CACHE_CONFIG = {
+    "enabled": True,
+    "max_sessions": 1000, # Max number of cached sessions
+    "max_messages_per_session": 100, # Max number of cached messages of a session, longer histories are read from MongoDB
+    "ttl": 600, # Idle sessions are dropped after 10 minutes
+    "flush_interval": 0.5, # Max number of seconds before new messages are written
+    "version_check_interval": 2.0, # Max number of seconds before a cached session is checked for messages written by other replicas
+}
+
+# Bounds of the in-memory chat history store (see memory.get_by_session_id), used for local and offline deployments.
+IN_MEMORY_HISTORY_CONFIG = {
+    "max_sessions": 1000, # Least recently used sessions are dropped first
+    "max_messages_per_session": 100, # Older messages of a session are dropped
+    "ttl": 3600, # Idle sessions are dropped after 1 hour
+    "max_total_size": 50_000_000, # Max total length (in characters) of all messages
+}
+
+# Chat history collections in MongoDB (see mongo_history.py, run `python -m backend.src.RAG.mongo_history` to migrate existing deployments)
+HISTORY_STORE_CONFIG = {
+    "database_name": "chat-history",
+    "collections": ["test_user_history_generator", "test_user_history_responder"],
+    "ttl": 90 * 24 * 3600, # Messages are deleted after 90 days (None to keep them forever)
+}
+
+# Storage of the chat histories (see memory.HistoryBackend), overridden by the HISTORY_BACKEND environment variable.
+# - "mongodb": deployments, requires MONGODB_URI
+# - "sqlite": offline runs and single-node deployments, one file in WAL mode
+# - "memory": tests and benchmarks, lost when the process stops
+HISTORY_BACKEND_CONFIG = {
+    "backend": "mongodb",
+    "sqlite_path": "chat_history.db",
+}
+
+# Fetching of the data sources (see DataPipeline.run), the queries and sources are fetched concurrently.
+# The rate and concurrency limits of each source are declared by the source (see sources.py)
+DATA_INGESTION_CONFIG = {
+    "source_weights": { # Share of the final entries expected from each source, only these sources are fetched
+        "arxiv": 0.5,
+        "semantic_scholar": 0.5,
+    },
+    "overfetch_factor": 1.2, # Fetch 20% more entries than needed to cover duplicates
+    "ss_candidates_factor": 2, # Semantic Scholar picks its entries (open access and most cited) from 2x as many papers
+    "max_top_ups": 2, # Max number of extra fetches when removing duplicates leaves too few entries
+    "selection_seed": None, # Seed of the order in which the queries and sources are picked from (None for a fixed order)
+}
+
+# Persistent cache of the arXiv and Semantic Scholar API responses (see response_cache.py), enabled by the data ingestion app.
+RESPONSE_CACHE_CONFIG = {
+    "path": "response_cache.db",
+    "ttls": { # Number of seconds a response is fresh, per source
+        "arxiv": 24 * 3600, # New papers are announced daily
+        "semantic_scholar": 6 * 3600, # Citation counts change more often
+    },
+    "default_ttl": 6 * 3600,
+    "stale_ttl": 24 * 3600, # Expired responses are still returned for 1 day while they are refreshed in the background
+    "max_size_bytes": 200_000_000, # Max total size of the compressed responses, least recently used are evicted first
+    "max_revalidation_workers": 2,
+}
@@ -5,16 +5,16 @@ class ArXivDataIngestionPipeline:
     """
     The data ingestion pipeline for fetching papers using the arXiv API.
     """
-    def fetch_entries(self, topic:str, max_results:int=4) -> List[Dict[str, Any]]:
+    def fetch_entries(self, topic:str, max_results:int=4, start:int=0) -> List[Dict[str, Any]]:
         """
         Fetches papers from the arXiv API for a given topic.
 
         Args:
             topic (str): The topic to fetch papers for.
             max_results (int): The maximum number of results to return.
+            start (int): The index of the first result to return (e.g., to fetch the next page).
         """
         search_query = f"all:{topic}"
-        start = 0
         xml_papers = fetch_arxiv_papers(search_query, start, max_results)
         entries = parse_papers(xml_papers)
         return entries
\ No newline at end of file
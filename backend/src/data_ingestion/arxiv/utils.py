@@ -7,6 +7,9 @@ import pdfplumber
 from io import BytesIO
 from typing import List, Dict, Any
 
+from backend.src.data_ingestion.response_cache import get_response_cache
+from backend.src.data_ingestion.scheduler import get_source_scheduler
+
 def fetch_arxiv_papers(search_query:str, start:int, max_results:int) -> str:
     """
     Fetches papers from the arXiv API, returning the XML result as a string.
@@ -16,10 +19,18 @@ def fetch_arxiv_papers(search_query:str, start:int, max_results:int) -> str:
         start (int): The index of the first result to return.
         max_results (int): The maximum number of results to return.
     """
-    url = f'http://export.arxiv.org/api/query?search_query={search_query}&start={start}&max_results={max_results}&sortBy=relevance&sortOrder=descending'
-    data = urllib.request.urlopen(url)
-    result = data.read().decode("utf-8")
-    return result
+    def fetch() -> str:
+        url = f'http://export.arxiv.org/api/query?search_query={search_query}&start={start}&max_results={max_results}&sortBy=relevance&sortOrder=descending'
+        # Within the rate limit of arXiv, shared by all ingestions (see sources.py)
+        with get_source_scheduler().request("arxiv"):
+            data = urllib.request.urlopen(url)
+            return data.read().decode("utf-8")
+
+    # Identical queries are served from the response cache if enabled (see response_cache.py)
+    cache = get_response_cache()
+    if cache is None:
+        return fetch()
+    return cache.fetch("arxiv", search_query, offset=start, limit=max_results, fetch_fn=fetch)
 
 def fetch_and_extract_pdf_content(pdf_url:str):
     """
@@ -93,7 +104,9 @@ def parse_papers(papers_string: str) -> List[Dict[str, Any]]:
                 "summary": entry["summary"].strip(),
                 "authors": [author["name"] for author in entry["author"]],
                 "published": entry["published"],
-                "pdf_link": entry["id"]
+                "pdf_link": entry["id"],
+                "source": "arxiv",
+                "primary_category": (entry.get("arxiv:primary_category") or {}).get("@term")
             }
             entries.append(paper_data)
     except Exception as e:
@@ -1,11 +1,17 @@
-from typing import List, Dict, Any
+import math
+import logging
+
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from backend.src.data_processing.pipeline import DataProcessingPipeline
-from backend.src.data_ingestion.semantic_scholar.ss_pipeline import SSDataIngestionPipeline
-from backend.src.data_ingestion.arxiv.arxiv_pipeline import ArXivDataIngestionPipeline
+from backend.src.data_ingestion.sources import get_source
 from backend.src.RAG.utils import clean_search_query
+from backend.src.constants import DATA_INGESTION_CONFIG
 
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
 class DataPipeline:
     """
     The main data pipeline class that orchestrates the data ingestion and processing pipelines.
@@ -22,14 +28,33 @@ class DataPipeline:
         """
         self.data_processing_pipeline = DataProcessingPipeline()
 
-        self.arxiv_data_ingestion_pipeline = ArXivDataIngestionPipeline()
-        self.ss_data_ingestion_pipeline = SSDataIngestionPipeline()
+        # The sources with a share of the final entries, see sources.py for the registered sources
+        self.source_weights = DATA_INGESTION_CONFIG["source_weights"]
+        self.sources = {name: get_source(name) for name in self.source_weights}
 
         self.text_preprocessor = self.data_processing_pipeline.entry_processor.text_preprocessor
 
         self.max_total_entries = max_total_entries
         self.min_entries_per_query = min_entries_per_query
 
+        # One thread pool per source, the shared scheduler still enforces the limits of each
+        # source across all the pipelines of the process (see scheduler.py)
+        self.source_executors = {
+                                name: ThreadPoolExecutor(max_workers=source.max_concurrency, thread_name_prefix=f"fetch-{name}")
+                                for name, source in self.sources.items()
+                                }
+
+        self.overfetch_factor = DATA_INGESTION_CONFIG["overfetch_factor"]
+        self.max_top_ups = DATA_INGESTION_CONFIG["max_top_ups"]
+        self.selection_seed = DATA_INGESTION_CONFIG["selection_seed"]
+
+    def close(self) -> None:
+        """
+        Stops the thread pools of the sources (e.g., when the app shuts down), cancelling the fetches not started yet.
+        """
+        for executor in self.source_executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def process_query(self, user_query:str) -> str:
         """
         Processes the user query by removing non-alphanumeric characters, stopwords
@@ -69,108 +94,333 @@ class DataPipeline:
 
     def select_entries(
                         self, 
-                        all_arxiv_entries:List[List[Dict[str, Any]]], 
-                        all_ss_entries:List[List[Dict[str, Any]]], 
+                        entries_by_source:Dict[str, List[List[Dict[str, Any]]]], 
                         num_user_queries
                         ) -> List[Dict[str, Any]]:
         """
         Selects entries from the fetched entries for each user query from all of the data sources.
         
-        For each entry for the final list:
-        - Choose whether to use the ArXiv or Semantic Scholar entries
-        - Choose which entries to use for the corresponding query and data source
+        The entries are picked round-robin without replacement:
+        - Every round takes the next unseen entry (by title) of each query and data source, so the
+          queries and sources are interleaved and the best ranked entries of each are kept.
+        - Each source contributes at most its share of the entries (see `source_weights`) while
+          the other sources still have entries, then the remaining slots are filled from any source.
+        - `max_total_entries` entries are returned whenever there are enough unique entries.
+        - The result only depends on the inputs and `selection_seed` (None visits the queries in
+          order and the sources in the order of `entries_by_source`, a seed shuffles the order of the visits).
+        - Every entry is looked at most once.
         
         Args:
-            all_arxiv_entries (List[List[Dict[str, Any]]]): The list of entries fetched from ArXiv for each user query.
-            all_ss_entries (List[List[Dict[str, Any]]]): The list of entries fetched from Semantic Scholar for each user query.
+            entries_by_source (Dict[str, List[List[Dict[str, Any]]]]): The list of entries fetched from each source for each user query.
             num_user_queries (int): The number of user queries.
         """
-        
-        # Total entries should be NUM_QUERIES * NUM_ENTRIES_PER_QUERY at most.
+        candidates = [
+                    (source, entries_by_source[source][query_idx])
+                    for query_idx in range(num_user_queries)
+                    for source in entries_by_source
+                    ]
+        visit_order = list(range(len(candidates)))
+        if self.selection_seed is not None:
+            visit_order = np.random.default_rng(self.selection_seed).permutation(len(candidates)).tolist()
+
+        source_quotas = {source: math.ceil(self.max_total_entries * weight) for source, weight in self.source_weights.items()}
+        num_selected_per_source = {source: 0 for source in entries_by_source}
+        positions = [0] * len(candidates) # The next entry to look at in each list
+        known_titles = set()
         all_entries = []
-        for i in range(self.max_total_entries):
 
-            # Choose whether to use the ArXiv or Semantic Scholar entries
-            use_arxiv = np.random.choice([True, False])
+        for use_quotas in (True, False):
+            active = visit_order
+            while active and len(all_entries) < self.max_total_entries:
+                next_active = []
+                for candidate_idx in active:
+                    source, entries = candidates[candidate_idx]
+                    if use_quotas and num_selected_per_source[source] >= source_quotas.get(source, 0):
+                        continue
 
-            # Choose which query to use
-            query_idx = np.random.choice(num_user_queries)
+                    # Skip the entries already selected from another query or source
+                    position = positions[candidate_idx]
+                    while position < len(entries) and entries[position]["title"] in known_titles:
+                        position += 1
+                    if position == len(entries):
+                        positions[candidate_idx] = position
+                        continue
 
-            print(i, use_arxiv, query_idx)
+                    entry = entries[position]
+                    positions[candidate_idx] = position + 1
+                    known_titles.add(entry["title"])
+                    all_entries.append(entry)
+                    num_selected_per_source[source] += 1
+                    if len(all_entries) == self.max_total_entries:
+                        break
+                    next_active.append(candidate_idx)
+                active = next_active
+        return all_entries
+    
+    def plan_quotas(self, num_user_queries:int) -> Dict[str, int]:
+        """
+        Works out the number of entries to fetch per query from each source, so that all
+        fetches together cover the final number of entries (`max_total_entries`).
+        - The budget is split between the sources by their weight and evenly between the queries.
+        - A small margin (`overfetch_factor`) covers the entries removed as duplicates.
+        - Every query gets at least `min_entries_per_query` entries across the sources.
 
-            idx = i # Set the i-th entry to fetch
+        Args:
+            num_user_queries (int): The number of user queries.
+        """
+        num_user_queries = max(num_user_queries, 1)
+        return {
+                source: max(
+                            math.ceil(self.max_total_entries * self.overfetch_factor * weight / num_user_queries),
+                            math.ceil(self.min_entries_per_query * weight),
+                            1
+                            )
+                for source, weight in self.source_weights.items()
+                }
 
-            if use_arxiv:
-                arxiv_entries = all_arxiv_entries[query_idx]
-                num_arxiv_entries = len(arxiv_entries)
-                # Choose a random entry from the list of entries fetched for the chosen query if the index is out of bounds
-                if idx >= num_arxiv_entries:
-                    idx = np.random.choice(num_arxiv_entries) 
+    def get_num_records(self, source:str, num_entries:int) -> int:
+        """
+        Returns the number of records requested from a source to return a number of entries.
+        - E.g., Semantic Scholar picks its entries from a larger set of candidates.
 
-                entry = all_arxiv_entries[query_idx][idx] # The i-th entry from the list of entries fetched for the chosen query
-            else:
-                ss_entries = all_ss_entries[query_idx]
-                num_ss_entries = len(ss_entries)
-                if idx >= num_ss_entries:
-                    idx = np.random.choice(num_ss_entries) 
+        Args:
+            source (str): The data source.
+            num_entries (int): The number of entries to return.
+        """
+        return self.sources[source].get_num_records(num_entries)
 
-                entry = all_ss_entries[query_idx][idx]
-                
-            all_entries.append(entry)
-        return all_entries
-    
-    def retrieve_documents(self, user_query:str) -> List[Dict[str, Any]]:
+    def retrieve_documents(
+                        self,
+                        user_query:str,
+                        quotas:Optional[Dict[str, int]]=None,
+                        starts:Optional[Dict[str, int]]=None
+                        ) -> Dict[str, List[Dict[str, Any]]]:
         """
         Retrieves documents from all the data sources for the given user query.
+        - The sources are fetched concurrently, each within its own rate and concurrency
+          limits (see sources.py).
+    
+        Args:
+            user_query (str): The user query to fetch data for.
+            quotas (Optional[Dict[str, int]]): The number of entries to fetch from each source (defaults
+                                               to `max_total_entries` from every source). Sources not
+                                               included are not fetched.
+            starts (Optional[Dict[str, int]]): The index of the first record to fetch from each source (defaults to 0).
+        """
+        pages = self.retrieve_pages(user_query, quotas=quotas, starts=starts)
+        return {source: entries for source, (entries, _) in pages.items()}
+
+    def retrieve_pages(
+                    self,
+                    user_query:str,
+                    quotas:Optional[Dict[str, int]]=None,
+                    starts:Optional[Dict[str, int]]=None
+                    ) -> Dict[str, Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Same as `retrieve_documents`, but also returns whether each source may have more results
+        (see DataSource.fetch_page).
     
         Args:
             user_query (str): The user query to fetch data for.
+            quotas (Optional[Dict[str, int]]): The number of entries to fetch from each source.
+            starts (Optional[Dict[str, int]]): The index of the first record to fetch from each source.
         """
-        # ArXiv fetching
-        arxiv_entries = self.arxiv_data_ingestion_pipeline.fetch_entries(
-                                                                        topic=user_query, 
-                                                                        max_results=self.max_total_entries
-                                                                        )
-        # Semantic Scholar fetching
-        ss_entries = self.ss_data_ingestion_pipeline.get_entries(
-                                                                topic=user_query, 
-                                                                max_results=self.max_total_entries,
-                                                                desired_total=self.max_total_entries
-                                                                )   
-        return arxiv_entries, ss_entries  
+        if quotas is None:
+            quotas = {source: self.max_total_entries for source in self.sources}
+        starts = starts or {}
 
+        futures = {
+                    source: self.source_executors[source].submit(
+                                                                self.sources[source].fetch_page,
+                                                                topic=user_query,
+                                                                num_entries=num_entries,
+                                                                start=starts.get(source, 0)
+                                                                )
+                    for source, num_entries in quotas.items()
+                    }
+        return {source: future.result() for source, future in futures.items()}
 
-    def run(self, user_queries:List[str]) -> List[Dict[str, Any]]:
+
+    def collect_entries(self, user_queries:List[str]) -> List[Dict[str, Any]]:
         """
-        Fetches data from various sources using the user queries and processes
-        the data to standardise the structure of the entries.
+        Fetches data from various sources using the user queries and selects the
+        unique entries to process.
 
         Args:
             user_queries (List[str]): The list of user queries to fetch data for.
         """
-        all_arxiv_entries = []
-        all_ss_entries = []
+        processed_queries = [self.process_query(query) for query in user_queries]
+        num_queries = len(processed_queries)
 
-        # Fetch entries from all data ingestion pipelines for each user query
-        for query in user_queries:
-            processed_query = self.process_query(query)
+        # Fetched entries, the next record to fetch and whether the source has no more results, per source and query
+        all_entries = {source: [[] for _ in range(num_queries)] for source in self.sources}
+        starts = {source: [0] * num_queries for source in all_entries}
+        exhausted = {source: [False] * num_queries for source in all_entries}
 
-            arxiv_entries, ss_entries = self.retrieve_documents(processed_query)
+        # Only fetch as many entries as the final selection needs, then top up on a shortfall
+        quotas = self.plan_quotas(num_queries)
+        requests = [(query_idx, quotas) for query_idx in range(num_queries)]
+        for top_up in range(self.max_top_ups + 1):
+            # Fetch entries from all data ingestion pipelines for all user queries at once, so the
+            # ingestion takes about as long as the slowest fetch (the per-source limits still apply)
+            with ThreadPoolExecutor(max_workers=max(len(requests), 1), thread_name_prefix="fetch-query") as executor:
+                results = list(executor.map(
+                                            lambda request: self.retrieve_pages(
+                                                                                    processed_queries[request[0]],
+                                                                                    quotas=request[1],
+                                                                                    starts={source: starts[source][request[0]] for source in request[1]}
+                                                                                    ),
+                                            requests
+                                            ))
 
-            print("Num fetched from ArXiv:", len(arxiv_entries))
-            print("Num fetched from Semantic Scholar:", len(ss_entries))
-
-            all_arxiv_entries.append(arxiv_entries)
-            all_ss_entries.append(ss_entries)
+            for (query_idx, request_quotas), pages in zip(requests, results):
+                for source, (entries, has_more) in pages.items():
+                    print(f"Num fetched from {source}:", len(entries))
+                    all_entries[source][query_idx].extend(entries)
+                    starts[source][query_idx] += self.get_num_records(source, request_quotas[source])
+                    exhausted[source][query_idx] = not has_more
         
-        selected_entries = self.select_entries(
-                                                all_arxiv_entries=all_arxiv_entries, 
-                                                all_ss_entries=all_ss_entries, 
-                                                num_user_queries=len(user_queries)
-                                                )
+            selected_entries = self.select_entries(entries_by_source=all_entries, num_user_queries=num_queries)
+
+            unique_entries = self.remove_duplicate_entries(selected_entries)
 
-        unique_entries = self.remove_duplicate_entries(selected_entries)
+            shortfall = self.max_total_entries - len(unique_entries)
+            open_sources = [
+                            (source, query_idx)
+                            for source in all_entries
+                            for query_idx in range(num_queries)
+                            if not exhausted[source][query_idx]
+                            ]
+            if shortfall <= 0 or not open_sources or top_up == self.max_top_ups:
+                break
+
+            # Fetch the next page of the sources that may have more results
+            top_up_size = math.ceil(shortfall * self.overfetch_factor / len(open_sources))
+            print(f"Short of {shortfall} entries after removing duplicates, fetching {top_up_size} more per source and query")
+            top_up_quotas = {}
+            for source, query_idx in open_sources:
+                top_up_quotas.setdefault(query_idx, {})[source] = top_up_size
+            requests = list(top_up_quotas.items())
+        return unique_entries
+
+    def run(self, user_queries:List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetches data from various sources using the user queries and processes
+        the data to standardise the structure of the entries.
+
+        Args:
+            user_queries (List[str]): The list of user queries to fetch data for.
+        """
+        unique_entries = self.collect_entries(user_queries)
         
         # Process all entries
         unique_entries = self.data_processing_pipeline.process(unique_entries)
-        return unique_entries
\ No newline at end of file
+        return unique_entries
+
+    def stream_entries(self, user_queries:List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Fetches data from various sources using the user queries and yields the unique entries
+        to process as soon as the fetch of each source and query completes.
+        - Unlike `collect_entries`, the entries are taken in the order the fetches complete (not
+          round-robin), each source contributing at most its share (see `source_weights`) while
+          the fetches of the other sources are running. The entries held back are used once no
+          fetch is running.
+        - Duplicates (by title) are dropped as the entries arrive.
+        - Sources that may have more results are topped up on a shortfall, as in `collect_entries`.
+        - The fetches still running are cancelled when the stream is closed.
+
+        Args:
+            user_queries (List[str]): The list of user queries to fetch data for.
+        """
+        processed_queries = [self.process_query(query) for query in user_queries]
+        num_queries = len(processed_queries)
+
+        # The next record to fetch and whether the source has no more results, per source and query
+        starts = {source: [0] * num_queries for source in self.sources}
+        exhausted = {source: [False] * num_queries for source in self.sources}
+
+        source_quotas = {source: math.ceil(self.max_total_entries * weight) for source, weight in self.source_weights.items()}
+        num_selected_per_source = {source: 0 for source in self.sources}
+        known_titles = set()
+        held_back = []
+        num_selected = 0
+
+        def submit(source:str, query_idx:int, num_entries:int):
+            future = self.source_executors[source].submit(
+                                                        self.sources[source].fetch_page,
+                                                        topic=processed_queries[query_idx],
+                                                        num_entries=num_entries,
+                                                        start=starts[source][query_idx]
+                                                        )
+            starts[source][query_idx] += self.get_num_records(source, num_entries)
+            return future
+
+        quotas = self.plan_quotas(num_queries)
+        pending = {
+                    submit(source, query_idx, num_entries): (source, query_idx)
+                    for query_idx in range(num_queries)
+                    for source, num_entries in quotas.items()
+                    }
+        try:
+            for top_up in range(self.max_top_ups + 1):
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        source, query_idx = pending.pop(future)
+                        entries, has_more = future.result()
+                        logger.debug("Num fetched from %s: %d", source, len(entries))
+                        exhausted[source][query_idx] = not has_more
+                        other_sources_running = any(other != source for other, _ in pending.values())
+
+                        for entry in entries:
+                            if entry["title"] in known_titles:
+                                continue
+                            if other_sources_running and num_selected_per_source[source] >= source_quotas.get(source, 0):
+                                held_back.append(entry)
+                                continue
+                            known_titles.add(entry["title"])
+                            num_selected_per_source[source] += 1
+                            num_selected += 1
+                            yield entry
+                            if num_selected == self.max_total_entries:
+                                return
+
+                # No fetch is running, fill the remaining slots from the entries held back
+                for entry in held_back:
+                    if entry["title"] in known_titles:
+                        continue
+                    known_titles.add(entry["title"])
+                    num_selected += 1
+                    yield entry
+                    if num_selected == self.max_total_entries:
+                        return
+                held_back = []
+
+                shortfall = self.max_total_entries - num_selected
+                open_sources = [
+                                (source, query_idx)
+                                for source in self.sources
+                                for query_idx in range(num_queries)
+                                if not exhausted[source][query_idx]
+                                ]
+                if not open_sources or top_up == self.max_top_ups:
+                    return
+
+                # Fetch the next page of the sources that may have more results
+                top_up_size = math.ceil(shortfall * self.overfetch_factor / len(open_sources))
+                logger.info("Short of %d entries after removing duplicates, fetching %d more per source and query", shortfall, top_up_size)
+                pending = {submit(source, query_idx, top_up_size): (source, query_idx) for source, query_idx in open_sources}
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def run_stream(self, user_queries:List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Same as `run`, but yields each entry as soon as it is processed.
+        - The entries flow into the processing as each fetch completes (see `stream_entries`),
+          so the first entries are processed while the other sources are still being fetched.
+
+        Args:
+            user_queries (List[str]): The list of user queries to fetch data for.
+        """
+        yield from self.data_processing_pipeline.process_stream(self.stream_entries(user_queries))
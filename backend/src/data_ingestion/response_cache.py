@@ -0,0 +1,281 @@
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+import urllib.parse
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BOOLEAN_OPERATORS = {"AND", "OR", "ANDNOT"} # Case-sensitive in arXiv queries
+
+def normalize_query(query:str) -> str:
+    """
+    Normalizes a search query so that equivalent queries share a cache entry.
+    - URL-decodes the query, collapses whitespace and lowercases the terms (boolean operators are kept).
+
+    Args:
+        query (str): The search query.
+    """
+    terms = re.split(r"\s+", urllib.parse.unquote_plus(query).strip())
+    return " ".join(term if term in BOOLEAN_OPERATORS else term.lower() for term in terms)
+
+class ResponseCache:
+    """
+    A persistent cache of API responses of the data sources, stored in a single SQLite file.
+
+    - Responses are keyed by the source, the normalized query, the offset and the limit.
+    - A response is fresh for the TTL of its source. An expired response is still returned for
+      `stale_ttl` more seconds while it is refreshed in the background (stale-while-revalidate),
+      after that it is fetched again before returning.
+    - Concurrent misses of the same key are coalesced: one fetch runs and the other requests wait for its response.
+    - Bodies are compressed with zlib.
+    - When the compressed bodies exceed `max_size_bytes`, the least recently used responses are evicted.
+    - Failed fetches are never cached.
+    """
+    def __init__(
+                self,
+                path:str="response_cache.db",
+                ttls:Optional[Dict[str, float]]=None,
+                default_ttl:float=86400,
+                stale_ttl:float=86400,
+                max_size_bytes:int=200_000_000,
+                max_revalidation_workers:int=2
+                ):
+        """
+        Opens (or creates) the cache.
+
+        Args:
+            path (str): The path of the cache file.
+            ttls (Optional[Dict[str, float]]): The number of seconds responses are fresh, per source.
+            default_ttl (float): The number of seconds responses of other sources are fresh.
+            stale_ttl (float): The number of seconds an expired response is still returned while it is refreshed.
+            max_size_bytes (int): The maximum total size of the compressed responses.
+            max_revalidation_workers (int): The number of threads refreshing expired responses.
+        """
+        self.path = path
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_size_bytes = max_size_bytes
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+            """
+        )
+        self.total_size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        self.executor = ThreadPoolExecutor(max_workers=max_revalidation_workers, thread_name_prefix="response-cache-revalidate")
+        self.revalidating = set()
+        self.in_flight: Dict[str, Future] = {} # key -> response of the running fetch of a miss
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "revalidations": 0, "failed_revalidations": 0, "evictions": 0}
+
+    @staticmethod
+    def get_key(source:str, query:str, offset:int, limit:int) -> str:
+        """
+        Returns the cache key of a request.
+
+        Args:
+            source (str): The data source (e.g., "arxiv").
+            query (str): The search query.
+            offset (int): The index of the first result.
+            limit (int): The number of results.
+        """
+        return hashlib.sha256(f"{source}\n{normalize_query(query)}\n{offset}\n{limit}".encode("utf-8")).hexdigest()
+
+    def get(self, key:str) -> Optional[Tuple[str, float]]:
+        """
+        Returns the cached body of a key and its age in seconds, or None.
+
+        Args:
+            key (str): The cache key.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT body, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self.connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return zlib.decompress(row[0]).decode("utf-8"), now - row[1]
+
+    def set(self, key:str, source:str, body:str) -> None:
+        """
+        Stores a body, evicting the least recently used responses if the cache is full.
+
+        Args:
+            key (str): The cache key.
+            source (str): The data source.
+            body (str): The response body.
+        """
+        compressed = zlib.compress(body.encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.connection.execute(
+                                    "INSERT OR REPLACE INTO responses (key, source, body, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                                    (key, source, compressed, len(compressed), now, now)
+                                    )
+            self.total_size += len(compressed) - (row[0] if row else 0)
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Deletes the least recently used responses until the cache fits into `max_size_bytes`.
+        - Must be called with the lock held.
+        """
+        while self.total_size > self.max_size_bytes:
+            row = self.connection.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.total_size -= row[1]
+            self.stats["evictions"] += 1
+
+    def revalidate(self, key:str, source:str, fetch_fn:Callable[[], str]) -> None:
+        """
+        Fetches a response again and stores it, keeping the stale response if the fetch fails.
+
+        Args:
+            key (str): The cache key.
+            source (str): The data source.
+            fetch_fn (Callable[[], str]): Fetches the response body.
+        """
+        try:
+            self.set(key, source, fetch_fn())
+            with self.lock:
+                self.stats["revalidations"] += 1
+        except Exception as e:
+            logger.warning("Failed to refresh a cached %s response: %s", source, e)
+            with self.lock:
+                self.stats["failed_revalidations"] += 1
+        finally:
+            with self.lock:
+                self.revalidating.discard(key)
+
+    def fetch(self, source:str, query:str, offset:int, limit:int, fetch_fn:Callable[[], str]) -> str:
+        """
+        Returns the response of a request from the cache, fetching it on a miss.
+
+        Args:
+            source (str): The data source (e.g., "arxiv").
+            query (str): The search query.
+            offset (int): The index of the first result.
+            limit (int): The number of results.
+            fetch_fn (Callable[[], str]): Fetches the response body.
+        """
+        key = self.get_key(source, query, offset, limit)
+        ttl = self.ttls.get(source, self.default_ttl)
+        cached = self.get(key)
+
+        if cached is not None:
+            body, age = cached
+            if age <= ttl:
+                with self.lock:
+                    self.stats["hits"] += 1
+                return body
+            if age <= ttl + self.stale_ttl:
+                with self.lock:
+                    self.stats["stale_hits"] += 1
+                    schedule = key not in self.revalidating
+                    self.revalidating.add(key)
+                if schedule:
+                    self.executor.submit(self.revalidate, key, source, fetch_fn)
+                return body
+
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is None:
+                self.stats["misses"] += 1
+                future = self.in_flight[key] = Future()
+                is_owner = True
+            else:
+                self.stats["coalesced"] += 1
+                is_owner = False
+        if not is_owner:
+            return future.result()
+
+        try:
+            body = fetch_fn()
+            self.set(key, source, body)
+            future.set_result(body)
+            return body
+        except BaseException as e:
+            future.set_exception(e) # The waiting requests fail as well, failed fetches are not cached
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Deletes all cached responses.
+        """
+        with self.lock:
+            self.connection.execute("DELETE FROM responses")
+            self.total_size = 0
+
+    def close(self) -> None:
+        """
+        Waits for the running refreshes and closes the cache file.
+        """
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            self.connection.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns the cache metrics, including the hit rate (stale hits included).
+        """
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+            return {
+                    **self.stats,
+                    "size_bytes": self.total_size,
+                    "hit_rate": (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else 0.0
+                    }
+
+response_cache = None # Shared by the ingestion clients, see enable_response_cache
+
+def enable_response_cache(**config:Any) -> ResponseCache:
+    """
+    Routes the requests of the ingestion clients through a persistent response cache.
+
+    Args:
+        **config: The arguments of ResponseCache (see RESPONSE_CACHE_CONFIG).
+    """
+    global response_cache
+    if response_cache is None:
+        response_cache = ResponseCache(**config)
+    return response_cache
+
+def disable_response_cache() -> None:
+    """
+    Stops caching the requests of the ingestion clients and closes the cache.
+    """
+    global response_cache
+    if response_cache is not None:
+        response_cache.close()
+        response_cache = None
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Returns the response cache of the ingestion clients, or None if caching is disabled.
+    """
+    return response_cache
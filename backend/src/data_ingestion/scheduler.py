@@ -0,0 +1,177 @@
+import time
+import threading
+
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+class TokenBucket:
+    """
+    A thread-safe token bucket: tokens are added at a steady rate up to a capacity, and every
+    request takes its cost in tokens.
+
+    - A request that finds too few tokens reserves them anyway (the balance goes negative) and
+      waits until they have been refilled, so waiting requests are served in arrival order.
+    """
+    def __init__(self, rate:float, capacity:float):
+        """
+        Args:
+            rate (float): The number of tokens added per second.
+            capacity (float): The maximum number of tokens (the largest burst of requests).
+        """
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("The rate and the capacity of a token bucket must be positive.")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self, now:float) -> None:
+        """
+        Adds the tokens accumulated since the last update.
+        - Must be called with the lock held.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, cost:float=1.0) -> float:
+        """
+        Takes `cost` tokens and returns the number of seconds to wait before they are available.
+
+        Args:
+            cost (float): The number of tokens of the request.
+        """
+        if cost > self.capacity:
+            raise ValueError(f"The cost of a request ({cost}) exceeds the capacity of the token bucket ({self.capacity}).")
+        with self.lock:
+            self.refill(time.monotonic())
+            self.tokens -= cost
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, cost:float=1.0) -> float:
+        """
+        Takes `cost` tokens, waiting until they are available, and returns the number of seconds waited.
+
+        Args:
+            cost (float): The number of tokens of the request.
+        """
+        wait_time = self.reserve(cost)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+    def pause(self, seconds:float) -> None:
+        """
+        Holds back the requests that have not reserved their tokens yet for at least `seconds`.
+
+        Args:
+            seconds (float): The number of seconds to wait before the next request.
+        """
+        with self.lock:
+            self.refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+class SourceLimiter:
+    """
+    The limits of a data source: a token bucket for the rate of requests and a semaphore for
+    the number of requests in flight.
+    """
+    def __init__(self, rate_limit:float, burst:float, max_concurrency:int, cost:float):
+        """
+        Args:
+            rate_limit (float): The number of tokens added per second.
+            burst (float): The maximum number of tokens.
+            max_concurrency (int): The maximum number of requests in flight.
+            cost (float): The default number of tokens of a request.
+        """
+        self.bucket = TokenBucket(rate=rate_limit, capacity=burst)
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.cost = cost
+        self.stats = {"requests": 0, "wait_seconds": 0.0, "back_offs": 0, "in_flight": 0}
+
+class SourceScheduler:
+    """
+    Enforces the rate limit and the concurrency of each data source across all the ingestions
+    running in the process (see sources.py, where each source declares its limits).
+
+    - Requests wait for their tokens before taking a slot: the semaphore only bounds the requests in flight.
+    - Requests of a source without limits are not held back.
+    - `back_off` holds back every request of a source, e.g., when the API answers with HTTP 429.
+    """
+    def __init__(self):
+        self.limiters: Dict[str, SourceLimiter] = {}
+        self.lock = threading.Lock()
+
+    def set_limits(self, source:str, rate_limit:float, burst:float, max_concurrency:int, cost:float=1.0) -> None:
+        """
+        Sets (or replaces) the limits of a source.
+
+        Args:
+            source (str): The data source (e.g., "arxiv").
+            rate_limit (float): The number of tokens added per second.
+            burst (float): The maximum number of tokens.
+            max_concurrency (int): The maximum number of requests in flight.
+            cost (float): The default number of tokens of a request.
+        """
+        with self.lock:
+            self.limiters[source] = SourceLimiter(rate_limit, burst, max_concurrency, cost)
+
+    @contextmanager
+    def request(self, source:str, cost:Optional[float]=None) -> Iterator[None]:
+        """
+        Waits for enough tokens of a source, then for a free slot, and holds the slot until the request is done.
+        - A request waiting for its tokens does not hold a slot, so the slots are only taken by requests in flight.
+
+        Args:
+            source (str): The data source.
+            cost (Optional[float]): The number of tokens of the request (defaults to the cost of the source).
+        """
+        limiter = self.limiters.get(source)
+        if limiter is None:
+            yield
+            return
+
+        wait_time = limiter.bucket.acquire(limiter.cost if cost is None else cost)
+        with limiter.semaphore:
+            with self.lock:
+                limiter.stats["requests"] += 1
+                limiter.stats["wait_seconds"] += wait_time
+                limiter.stats["in_flight"] += 1
+            try:
+                yield
+            finally:
+                with self.lock:
+                    limiter.stats["in_flight"] -= 1
+
+    def back_off(self, source:str, seconds:float) -> None:
+        """
+        Holds back the next requests of a source for at least `seconds`.
+
+        Args:
+            source (str): The data source.
+            seconds (float): The number of seconds to wait.
+        """
+        limiter = self.limiters.get(source)
+        if limiter is None:
+            time.sleep(seconds)
+            return
+        limiter.bucket.pause(seconds)
+        with self.lock:
+            limiter.stats["back_offs"] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the number of requests, the total waiting time, the number of back-offs and the
+        number of requests in flight of each source.
+        """
+        with self.lock:
+            return {source: dict(limiter.stats) for source, limiter in self.limiters.items()}
+
+source_scheduler = SourceScheduler() # Shared by all the data pipelines of the process
+
+def get_source_scheduler() -> SourceScheduler:
+    """
+    Returns the scheduler shared by the ingestion clients.
+    """
+    return source_scheduler
@@ -1,5 +1,5 @@
 from backend.src.data_ingestion.semantic_scholar.utils_ss import fetch_all_semantic_scholar_papers, parse_semantic_scholar_papers
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from dotenv import load_dotenv
 import os
 
@@ -7,7 +7,7 @@ class SSDataIngestionPipeline:
     """
     The data ingestion pipeline for fetching papers using the Semantic Scholar API.
     """
-    def get_entries(self, topic: str, max_results: int = 100, desired_total: int = 20) -> List[Dict[str, Any]]:
+    def get_entries(self, topic: str, max_results: int = 100, desired_total: int = 20, start: int = 0) -> List[Dict[str, Any]]:
         """
         Fetches papers from the Semantic Scholar API for a given topic.
         
@@ -15,10 +15,29 @@ class SSDataIngestionPipeline:
             topic (str): The topic to fetch papers for.
             max_results (int): The maximum total number of papers to fetch via pagination.
             desired_total (int): The final number of papers to return.
+            start (int): The index of the first paper to fetch (e.g., to fetch the next page).
             
         Returns:
             List[Dict[str, Any]]: A list of paper dictionaries.
         """
+        entries, _ = self.get_entries_page(topic, max_results=max_results, desired_total=desired_total, start=start)
+        return entries
+
+    def get_entries_page(self, topic: str, max_results: int = 100, desired_total: int = 20, start: int = 0) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Same as `get_entries`, but also returns whether Semantic Scholar may have more papers after this page.
+        - The papers are filtered after fetching, so fewer entries than `desired_total` does not mean
+          that there are no more papers: only a page with fewer papers than `max_results` does.
+        
+        Args:
+            topic (str): The topic to fetch papers for.
+            max_results (int): The maximum total number of papers to fetch via pagination.
+            desired_total (int): The final number of papers to return.
+            start (int): The index of the first paper to fetch (e.g., to fetch the next page).
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], bool]: A list of paper dictionaries and whether there may be more papers.
+        """
         # Load environment variables from the .env file.
         load_dotenv()
         api_key = os.environ.get("SEMANTIC_SCHOLAR_API_KEY")
@@ -27,10 +46,11 @@ class SSDataIngestionPipeline:
 
         # Use the topic as the search query; adjust as needed.
         search_query = topic
-        # Set the page size for each API call.
-        limit = 50
+        # Set the page size for each API call (no larger than needed).
+        limit = min(50, max_results)
         # Fetch papers using pagination.
-        semantic_json = fetch_all_semantic_scholar_papers(search_query, limit, max_results, api_key=api_key)
+        semantic_json = fetch_all_semantic_scholar_papers(search_query, limit, max_results, api_key=api_key, start=start)
         # Parse and filter the fetched data.
         entries = parse_semantic_scholar_papers(semantic_json, desired_total)
-        return entries
+        has_more = len(semantic_json.get("data", [])) >= max_results
+        return entries, has_more
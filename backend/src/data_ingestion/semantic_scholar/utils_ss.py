@@ -1,12 +1,33 @@
+import json
 import urllib
+import logging
 import requests
-import time
 from typing import List, Dict, Any
 
+from backend.src.data_ingestion.response_cache import get_response_cache
+from backend.src.data_ingestion.scheduler import get_source_scheduler
+
+logger = logging.getLogger(__name__)
+
+def get_retry_after(response, default:float) -> float:
+    """
+    Returns the number of seconds to wait given by the Retry-After header of a response, or the default.
+
+    Args:
+        response: The HTTP response.
+        default (float): The number of seconds to wait if the header is missing or is not a number.
+    """
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, TypeError, ValueError):
+        return default
+
 def fetch_semantic_scholar_papers(search_query: str, offset: int, limit: int, api_key: str = None) -> dict:
     """
     Fetches papers from the Semantic Scholar API with search query, offset, and limit.
-    Implements exponential backoff in case of gateway timeout (HTTP 504).
+    Requests are sent within the rate limit of Semantic Scholar, shared by all ingestions (see sources.py).
+    Implements exponential backoff in case of rate limiting (HTTP 429) or gateway timeout (HTTP 504),
+    holding back all the requests to Semantic Scholar, not just the failed one.
     Omits the citation fields (citations.paperId and citations.title).
 
     Args:
@@ -30,20 +51,34 @@ def fetch_semantic_scholar_papers(search_query: str, offset: int, limit: int, ap
     if api_key:
         headers["x-api-key"] = api_key
 
-    max_retries = 5
-    for attempt in range(max_retries):
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code in (429, 504):
-            wait_time = 2 ** attempt
-            print(f"Received status code {response.status_code}. Waiting for {wait_time} seconds (attempt {attempt+1}/{max_retries})...")
-            time.sleep(wait_time)
-        else:
-            raise Exception(f"Error fetching Semantic Scholar papers: {response.status_code}")
-    raise Exception("Max retries exceeded. Please try again later.")
-
-def fetch_all_semantic_scholar_papers(search_query: str, limit: int, max_results: int, api_key: str = None) -> dict:
+    def fetch() -> dict:
+        scheduler = get_source_scheduler()
+        max_retries = 5
+        for attempt in range(max_retries):
+            with scheduler.request("semantic_scholar"):
+                response = requests.get(url, headers=headers)
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code in (429, 504):
+                wait_time = get_retry_after(response, default=2 ** attempt)
+                logger.warning(
+                            "Received status code %d from Semantic Scholar. Waiting for %s seconds (attempt %d/%d)...",
+                            response.status_code, wait_time, attempt + 1, max_retries
+                            )
+                # The next attempt waits in the scheduler, without holding a request slot
+                scheduler.back_off("semantic_scholar", wait_time)
+            else:
+                raise Exception(f"Error fetching Semantic Scholar papers: {response.status_code}")
+        raise Exception("Max retries exceeded. Please try again later.")
+
+    # Identical queries are served from the response cache if enabled (see response_cache.py)
+    cache = get_response_cache()
+    if cache is None:
+        return fetch()
+    body = cache.fetch("semantic_scholar", search_query, offset=offset, limit=limit, fetch_fn=lambda: json.dumps(fetch()))
+    return json.loads(body)
+
+def fetch_all_semantic_scholar_papers(search_query: str, limit: int, max_results: int, api_key: str = None, start: int = 0) -> dict:
     """
     Fetches papers from the Semantic Scholar API using pagination. It repeatedly calls
     fetch_semantic_scholar_papers until max_results is reached or no more results are returned.
@@ -53,13 +88,14 @@ def fetch_all_semantic_scholar_papers(search_query: str, limit: int, max_results
         limit (int): The number of results per API call (page size).
         max_results (int): The maximum total number of results to fetch.
         api_key (str, optional): Your Semantic Scholar API key.
+        start (int, optional): The index of the first result to fetch.
 
     Returns:
         dict: A dictionary with a "data" key containing a list of all fetched papers.
     """
-    offset = 0
+    offset = start
     results = []
-    while offset < max_results:
+    while offset < start + max_results:
         response = fetch_semantic_scholar_papers(search_query, offset, limit, api_key=api_key)
         data = response.get("data", [])
         if not data:
@@ -83,6 +119,7 @@ def parse_semantic_scholar_papers(semantic_json: dict, desired_total: int) -> Li
       - "paper_link"
       - "citationCount"
       - "influentialCitationCount"
+      - "source"
     
     Args:
         semantic_json (dict): The JSON result from the Semantic Scholar API.
@@ -141,7 +178,8 @@ def parse_semantic_scholar_papers(semantic_json: dict, desired_total: int) -> Li
             "published": str(paper.get("year", "")),
             "paper_link": scholar_link,
             "citationCount": paper.get("citationCount", 0),
-            "influentialCitationCount": paper.get("influentialCitationCount", 0)
+            "influentialCitationCount": paper.get("influentialCitationCount", 0),
+            "source": "semantic_scholar"
         }
         parsed_papers.append(paper_data)
     
@@ -0,0 +1,151 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Type, Tuple
+
+from backend.src.data_ingestion.semantic_scholar.ss_pipeline import SSDataIngestionPipeline
+from backend.src.data_ingestion.arxiv.arxiv_pipeline import ArXivDataIngestionPipeline
+from backend.src.data_ingestion.scheduler import get_source_scheduler
+from backend.src.constants import DATA_INGESTION_CONFIG
+
+class DataSource(ABC):
+    """
+    A source of papers used by the data pipeline (see `register_source`).
+
+    Each source declares the limits of its API, enforced for every request by the shared
+    scheduler (see scheduler.py) across all the ingestions running in the process:
+    - `rate_limit`: The number of tokens added per second.
+    - `burst`: The maximum number of tokens (the largest burst of requests).
+    - `max_concurrency`: The maximum number of requests in flight.
+    - `cost`: The number of tokens of a request.
+    """
+    name: str
+    rate_limit: float
+    burst: float
+    max_concurrency: int
+    cost: float = 1.0
+
+    @abstractmethod
+    def fetch_entries(self, topic:str, num_entries:int, start:int=0) -> List[Dict[str, Any]]:
+        """
+        Fetches entries from the source for a given topic.
+
+        Args:
+            topic (str): The topic to fetch entries for.
+            num_entries (int): The number of entries to return.
+            start (int): The index of the first record to fetch (e.g., to fetch the next page).
+        """
+
+    def fetch_page(self, topic:str, num_entries:int, start:int=0) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Fetches entries from the source for a given topic, and whether the source may have more
+        results after them (i.e., whether the next page is worth fetching).
+        - By default, a source may have more results if it returned all the entries requested.
+
+        Args:
+            topic (str): The topic to fetch entries for.
+            num_entries (int): The number of entries to return.
+            start (int): The index of the first record to fetch.
+        """
+        entries = self.fetch_entries(topic, num_entries, start=start)
+        return entries, len(entries) >= num_entries
+
+    def get_num_records(self, num_entries:int) -> int:
+        """
+        Returns the number of records requested from the source to return a number of entries.
+
+        Args:
+            num_entries (int): The number of entries to return.
+        """
+        return num_entries
+
+class ArXivSource(DataSource):
+    name = "arxiv"
+    rate_limit = 1 / 3 # arXiv asks for at most one request every 3 seconds
+    burst = 1
+    max_concurrency = 1 # arXiv asks for a single connection at a time
+
+    def __init__(self):
+        self.pipeline = ArXivDataIngestionPipeline()
+
+    def fetch_entries(self, topic:str, num_entries:int, start:int=0) -> List[Dict[str, Any]]:
+        return self.pipeline.fetch_entries(topic=topic, max_results=num_entries, start=start)
+
+class SemanticScholarSource(DataSource):
+    name = "semantic_scholar"
+    rate_limit = 1.0 # Rate limit of an API key (1 request per second)
+    burst = 1
+    max_concurrency = 2
+
+    def __init__(self):
+        self.pipeline = SSDataIngestionPipeline()
+        self.candidates_factor = DATA_INGESTION_CONFIG["ss_candidates_factor"]
+
+    def fetch_entries(self, topic:str, num_entries:int, start:int=0) -> List[Dict[str, Any]]:
+        return self.pipeline.get_entries(
+                                        topic=topic,
+                                        max_results=self.get_num_records(num_entries),
+                                        desired_total=num_entries,
+                                        start=start
+                                        )
+
+    def fetch_page(self, topic:str, num_entries:int, start:int=0) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Fetches entries for a given topic, and whether Semantic Scholar may have more results.
+        - The entries are filtered from the candidates, so the source has more results if the page
+          of candidates was full, however few entries were kept.
+
+        Args:
+            topic (str): The topic to fetch entries for.
+            num_entries (int): The number of entries to return.
+            start (int): The index of the first record to fetch.
+        """
+        return self.pipeline.get_entries_page(
+                                            topic=topic,
+                                            max_results=self.get_num_records(num_entries),
+                                            desired_total=num_entries,
+                                            start=start
+                                            )
+
+    def get_num_records(self, num_entries:int) -> int:
+        """
+        Returns the number of records requested to return a number of entries.
+        - Semantic Scholar picks its entries (half open access, half most cited) from a
+          larger set of candidates.
+
+        Args:
+            num_entries (int): The number of entries to return.
+        """
+        return num_entries * self.candidates_factor
+
+DATA_SOURCES: Dict[str, Type[DataSource]] = {}
+
+def register_source(source_class:Type[DataSource]) -> Type[DataSource]:
+    """
+    Registers a data source under its name and sets its limits in the shared scheduler.
+    - Can be used as a class decorator.
+
+    Args:
+        source_class (Type[DataSource]): The class of the data source.
+    """
+    DATA_SOURCES[source_class.name] = source_class
+    get_source_scheduler().set_limits(
+                                    source_class.name,
+                                    rate_limit=source_class.rate_limit,
+                                    burst=source_class.burst,
+                                    max_concurrency=source_class.max_concurrency,
+                                    cost=source_class.cost
+                                    )
+    return source_class
+
+def get_source(name:str) -> DataSource:
+    """
+    Creates a registered data source.
+
+    Args:
+        name (str): The name of the source (e.g., "arxiv" or "semantic_scholar").
+    """
+    if name not in DATA_SOURCES:
+        raise ValueError(f"Unknown data source: '{name}', expected one of {list(DATA_SOURCES.keys())}")
+    return DATA_SOURCES[name]()
+
+register_source(ArXivSource)
+register_source(SemanticScholarSource)
@@ -1,5 +1,5 @@
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Iterable, Iterator
 
 from backend.src.data_processing.entry_processor import EntryProcessor
 
@@ -13,31 +13,36 @@ class DataProcessingPipeline:
         
     def process(self, entries:Dict[str, Any]) -> Dict[str, Any]:
         """
-        Processes the text content of the entries.
+        Processes the text content of the entries (see `process_stream`).
 
         Args:
             entries (Dict[str, Any]): The structured paper entries to process.
         """
-        time_takens = []
+        return list(self.process_stream(entries))
+
+    def process_stream(self, entries:Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Processes the text content of the entries one at a time, yielding each entry as soon as it is processed.
+        - An entry that fails to process is yielded unchanged.
+
+        Args:
+            entries (Iterable[Dict[str, Any]]): The structured paper entries to process.
+        """
+        total_time_taken = 0
+        num_entries = 0
         for i, entry in enumerate(entries):
+            num_entries += 1
+            start_time = time.perf_counter()
             try:
-                start_time = time.perf_counter()
                 print(f"Paper: {i+1}")
-
-                # Process the entry (in-place)
-                entries[i] = self.entry_processor(entry)
-                
-                print("\n")
-                end_time = time.perf_counter()
-                time_takens.append(end_time-start_time)
+                entry = self.entry_processor(entry)
             except Exception as e:
                 print(f"Error processing paper {i+1}: {e}")
-                time_takens.append(0)
-        
-        for i in range(len(entries)):
-            print(f"Time taken for paper {i+1}: {time_takens[i]:.2f} seconds")
-    
-        if len(entries) > 1:
-            print(f"Average time taken per paper: {sum(time_takens)/len(entries):.2f} seconds")
-        print(f"Total time taken: {sum(time_takens):.2f} seconds")
-        return entries
\ No newline at end of file
+            time_taken = time.perf_counter() - start_time
+            total_time_taken += time_taken
+            print(f"Time taken for paper {i+1}: {time_taken:.2f} seconds")
+            yield entry
+
+        if num_entries > 1:
+            print(f"Average time taken per paper: {total_time_taken/num_entries:.2f} seconds")
+        print(f"Total time taken: {total_time_taken:.2f} seconds")
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+Per-turn overhead benchmark of the chat history backends (see memory.HistoryBackend).
+
+Simulates conversations where every turn reads the recent history of the session (as the
+chains do before calling the LLM) and appends the user and assistant messages, and measures
+for every backend:
+- Read, write and total latency per turn (p50 / p99)
+- Turns per second
+
+MongoDB is only benchmarked when a connection string is given.
+
+Example:
+    python benchmarks/history_benchmark.py --backends memory sqlite --num_sessions 50 --num_turns 20 --output report.json
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import numpy as np
+
+from typing import Dict, Any, List, Optional
+from langchain_core.messages import HumanMessage, AIMessage
+
+from backend.src.RAG.memory import HistoryBackend, MongoHistoryBackend, SQLiteHistoryBackend, InMemoryHistoryBackend, close_mongo_clients
+
+BACKENDS = ["memory", "sqlite", "mongodb"]
+COLLECTION_NAME = "benchmark_history"
+
+def create_backend(name:str, sqlite_path:str, mongodb_uri:Optional[str]=None) -> HistoryBackend:
+    """
+    Creates a history backend to benchmark.
+
+    Args:
+        name (str): The name of the backend.
+        sqlite_path (str): The database file of the SQLite backend.
+        mongodb_uri (Optional[str]): The MongoDB connection string of the MongoDB backend.
+    """
+    if name == "memory":
+        return InMemoryHistoryBackend()
+    if name == "sqlite":
+        return SQLiteHistoryBackend(path=sqlite_path)
+    if name == "mongodb":
+        return MongoHistoryBackend(uri=mongodb_uri)
+    raise ValueError(f"Unknown history backend: '{name}', expected one of {BACKENDS}")
+
+def percentile_ms(latencies:List[float], q:float) -> float:
+    return float(np.percentile(latencies, q) * 1000) if latencies else 0.0
+
+def run_benchmark(
+                backend:HistoryBackend,
+                num_sessions:int=20,
+                num_turns:int=10,
+                history_size:int=10,
+                message_length:int=500,
+                seed:int=0
+                ) -> Dict[str, Any]:
+    """
+    Runs the simulated conversations against a backend, interleaving the sessions at random.
+
+    Args:
+        backend (HistoryBackend): The backend to benchmark.
+        num_sessions (int): The number of sessions.
+        num_turns (int): The number of turns per session.
+        history_size (int): The number of most recent messages read every turn.
+        message_length (int): The number of characters of every message.
+        seed (int): The random seed of the order of the turns.
+    """
+    run_id = f"{time.time_ns()}"
+    turns = [session for session in range(num_sessions) for _ in range(num_turns)]
+    random.Random(seed).shuffle(turns)
+    content = "x" * message_length
+
+    read_latencies, write_latencies, turn_latencies = [], [], []
+    start = time.perf_counter()
+    for session in turns:
+        turn_start = time.perf_counter()
+        history = backend.create_history(f"{run_id}-{session}", COLLECTION_NAME, history_size=history_size)
+        history.messages
+        read_end = time.perf_counter()
+        history.add_messages([HumanMessage(content=content), AIMessage(content=content)])
+        turn_end = time.perf_counter()
+
+        read_latencies.append(read_end - turn_start)
+        write_latencies.append(turn_end - read_end)
+        turn_latencies.append(turn_end - turn_start)
+    elapsed = time.perf_counter() - start
+
+    for session in range(num_sessions):
+        backend.create_history(f"{run_id}-{session}", COLLECTION_NAME, history_size=None).clear()
+
+    return {
+        "num_sessions": num_sessions,
+        "num_turns": len(turns),
+        "read_p50_ms": percentile_ms(read_latencies, 50),
+        "read_p99_ms": percentile_ms(read_latencies, 99),
+        "write_p50_ms": percentile_ms(write_latencies, 50),
+        "write_p99_ms": percentile_ms(write_latencies, 99),
+        "turn_p50_ms": percentile_ms(turn_latencies, 50),
+        "turn_p99_ms": percentile_ms(turn_latencies, 99),
+        "turns_per_second": len(turns) / elapsed if elapsed > 0 else 0.0
+    }
+
+def main(args:List[str]=None) -> List[Dict[str, Any]]:
+    """
+    Runs the benchmark for every backend and writes a JSON report.
+    """
+    parser = argparse.ArgumentParser(description="Chat history backend benchmark (per-turn read and write overhead).")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["memory", "sqlite"])
+    parser.add_argument("--num_sessions", type=int, default=50)
+    parser.add_argument("--num_turns", type=int, default=20)
+    parser.add_argument("--history_size", type=int, default=10)
+    parser.add_argument("--message_length", type=int, default=500)
+    parser.add_argument("--mongodb_uri", default=os.getenv("MONGODB_URI"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="history_benchmark.json")
+    args = parser.parse_args(args)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in args.backends:
+            if name == "mongodb" and not args.mongodb_uri:
+                print("Skipping mongodb: no connection string (pass --mongodb_uri or set MONGODB_URI)")
+                continue
+            print(f"Running benchmark: backend={name}")
+            backend = create_backend(name, sqlite_path=os.path.join(tmp_dir, "chat_history.db"), mongodb_uri=args.mongodb_uri)
+            result = {
+                "backend": name,
+                **run_benchmark(
+                                backend=backend,
+                                num_sessions=args.num_sessions,
+                                num_turns=args.num_turns,
+                                history_size=args.history_size,
+                                message_length=args.message_length,
+                                seed=args.seed
+                                )
+                }
+            print(json.dumps(result, indent=4))
+            results.append(result)
+        close_mongo_clients() # Writes the cached messages and closes the databases before the files are removed
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Recommends vector index (HNSW) parameters for a target recall and latency.
+
+Sweeps M, ef_construction and ef_search on a sample of the embeddings stored in the
+production ChromaDB collection (or on synthetic embeddings if the collection is empty),
+using held-out chunks of the sample as queries. The fastest setting meeting the
+targets is printed as a VECTOR_INDEX_CONFIG update (see backend/src/constants.py).
+
+Example:
+    python benchmarks/index_tuning.py --sample_size 20000 --target_recall 0.95 --target_p99_ms 20
+"""
+
+import os
+import sys
+import json
+import argparse
+import itertools
+import numpy as np
+import chromadb
+
+from typing import Dict, Any, List, Optional
+
+# Adjust Python path to find the local modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from benchmarks.retrieval_benchmark import run_benchmark, generate_corpus
+from backend.src.constants import VECTOR_INDEX_CONFIG
+
+def load_corpus_sample(persist_dir:str, collection_name:str, sample_size:int, seed:int=0) -> Optional[np.ndarray]:
+    """
+    Loads a random sample of the stored embeddings of a ChromaDB collection.
+    - Returns None if the collection does not exist or is empty.
+
+    Args:
+        persist_dir (str): The directory of the ChromaDB.
+        collection_name (str): The name of the collection.
+        sample_size (int): The maximum number of embeddings to load.
+        seed (int): The random seed used to pick the sample.
+    """
+    if not os.path.exists(persist_dir):
+        return None
+    client = chromadb.PersistentClient(path=persist_dir)
+    try:
+        collection = client.get_collection(collection_name)
+    except Exception:
+        return None
+
+    num_records = collection.count()
+    if num_records == 0:
+        return None
+
+    all_ids = collection.get(include=[])["ids"]
+    rng = np.random.default_rng(seed)
+    sample_ids = rng.choice(all_ids, size=min(sample_size, num_records), replace=False).tolist()
+
+    embeddings = []
+    batch_size = client.get_max_batch_size()
+    for start in range(0, len(sample_ids), batch_size):
+        batch = collection.get(ids=sample_ids[start:start + batch_size], include=["embeddings"])
+        embeddings.append(np.asarray(batch["embeddings"], dtype=np.float32))
+    return np.concatenate(embeddings, axis=0)
+
+def recommend(
+            results:List[Dict[str, Any]],
+            k:int,
+            target_recall:float,
+            target_p99_ms:Optional[float]=None
+            ) -> Dict[str, Any]:
+    """
+    Picks the setting with the lowest p99 latency among those meeting the targets.
+    - Falls back to the setting with the highest recall if none meet them.
+
+    Args:
+        results (List[Dict[str, Any]]): The benchmark result of every setting.
+        k (int): The number of results per query used in the benchmark.
+        target_recall (float): The minimum recall@k.
+        target_p99_ms (Optional[float]): The maximum p99 query latency in milliseconds.
+    """
+    recall_key = f"recall_at_{k}"
+    candidates = [
+                result for result in results
+                if result[recall_key] >= target_recall
+                and (target_p99_ms is None or result["query_p99_ms"] <= target_p99_ms)
+                ]
+    if candidates:
+        best = min(candidates, key=lambda result: (result["query_p99_ms"], -result[recall_key]))
+        meets_targets = True
+    else:
+        best = max(results, key=lambda result: (result[recall_key], -result["query_p99_ms"]))
+        meets_targets = False
+
+    index_params = best["index_params"]
+    return {
+            "meets_targets": meets_targets,
+            "result": best,
+            "index_config": {
+                        "space": index_params["hnsw:space"],
+                        "M": index_params["hnsw:M"],
+                        "ef_construction": index_params["hnsw:construction_ef"],
+                        "ef_search": index_params["hnsw:search_ef"],
+                        }
+            }
+
+def sweep(
+        corpus:np.ndarray,
+        queries:np.ndarray,
+        k:int,
+        space:str,
+        M_values:List[int],
+        ef_construction_values:List[int],
+        ef_search_values:List[int]
+        ) -> List[Dict[str, Any]]:
+    """
+    Benchmarks every combination of the index parameters.
+
+    Args:
+        corpus (np.ndarray): The corpus embeddings.
+        queries (np.ndarray): The query embeddings.
+        k (int): The number of results per query.
+        space (str): The distance function.
+        M_values (List[int]): The values of M to try.
+        ef_construction_values (List[int]): The values of ef_construction to try.
+        ef_search_values (List[int]): The values of ef_search to try.
+    """
+    results = []
+    for M, ef_construction, ef_search in itertools.product(M_values, ef_construction_values, ef_search_values):
+        index_params = {
+                        "hnsw:space": space,
+                        "hnsw:M": M,
+                        "hnsw:construction_ef": ef_construction,
+                        "hnsw:search_ef": ef_search
+                        }
+        result = run_benchmark(corpus_size=len(corpus), backend="persistent", k=k, index_params=index_params, corpus=corpus, queries=queries)
+        print(f"M={M}, ef_construction={ef_construction}, ef_search={ef_search}: "
+              f"recall@{k}={result[f'recall_at_{k}']:.3f}, p50={result['query_p50_ms']:.2f}ms, p99={result['query_p99_ms']:.2f}ms")
+        results.append(result)
+    return results
+
+def main(args:List[str]=None) -> Dict[str, Any]:
+    """
+    Runs the parameter sweep and prints the recommended index configuration.
+    """
+    parser = argparse.ArgumentParser(description="Recommend HNSW parameters for a target recall and latency.")
+    parser.add_argument("--persist_dir", default="chroma_db")
+    parser.add_argument("--collection_name", default="production_collection")
+    parser.add_argument("--sample_size", type=int, default=20000)
+    parser.add_argument("--num_queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=VECTOR_INDEX_CONFIG["search_k"])
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], default=VECTOR_INDEX_CONFIG["space"])
+    parser.add_argument("--M", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ef_construction", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--ef_search", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--target_recall", type=float, default=0.95)
+    parser.add_argument("--target_p99_ms", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="index_tuning.json")
+    args = parser.parse_args(args)
+
+    sample = load_corpus_sample(args.persist_dir, args.collection_name, args.sample_size + args.num_queries, seed=args.seed)
+    if sample is None or len(sample) <= args.num_queries:
+        print("No stored embeddings found, sweeping on synthetic embeddings instead.")
+        sample = np.concatenate([embeddings for _, embeddings in generate_corpus(args.sample_size + args.num_queries, dim=256, seed=args.seed)])
+
+    # Held-out chunks are used as queries
+    queries, corpus = sample[:args.num_queries], sample[args.num_queries:]
+
+    results = sweep(
+                    corpus=corpus,
+                    queries=queries,
+                    k=args.k,
+                    space=args.space,
+                    M_values=args.M,
+                    ef_construction_values=args.ef_construction,
+                    ef_search_values=args.ef_search
+                    )
+    recommendation = recommend(results, k=args.k, target_recall=args.target_recall, target_p99_ms=args.target_p99_ms)
+
+    if not recommendation["meets_targets"]:
+        print("No setting meets the targets, recommending the setting with the highest recall.")
+    print(f"Recommended VECTOR_INDEX_CONFIG update: {json.dumps(recommendation['index_config'])}")
+
+    report = {"corpus_size": len(corpus), "num_queries": len(queries), "results": results, "recommendation": recommendation}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Saved report to {args.output}")
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Scaling benchmark for the vector store used by the RetrievalEngine.
+
+Generates synthetic corpora with deterministic fake embeddings (clustered Gaussians, so that
+nearest neighbours are meaningful) and measures, for every corpus size and storage backend:
+- Insert throughput (chunks per second)
+- Query latency (p50 / p99)
+- Recall@k of the ANN index against exact (brute force) search
+- Memory footprint (RSS growth) and on-disk size
+
+Example:
+    python benchmarks/retrieval_benchmark.py --sizes 10000 100000 --backends persistent ephemeral --output report.json
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import datetime
+import resource
+import numpy as np
+import chromadb
+
+from typing import Dict, Any, List, Iterator, Tuple
+
+BACKENDS = ["persistent", "ephemeral"]
+GENERATION_BLOCK_SIZE = 1024
+
+def generate_corpus(
+                    num_chunks:int,
+                    dim:int,
+                    num_clusters:int=100,
+                    seed:int=0,
+                    batch_size:int=10000
+                    ) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Generates a synthetic corpus of chunk embeddings in batches.
+    - The same arguments always produce the same embeddings.
+
+    Args:
+        num_chunks (int): The number of chunks in the corpus.
+        dim (int): The dimension of the embeddings.
+        num_clusters (int): The number of topics (clusters) the chunks are drawn around.
+        seed (int): The random seed.
+        batch_size (int): The number of chunks per batch.
+    """
+    centroids = np.random.default_rng(seed).standard_normal((num_clusters, dim)).astype(np.float32)
+
+    def generate_block(block_idx:int) -> np.ndarray:
+        # Each fixed-size block has its own seed so the embeddings do not depend on the batch size
+        rng = np.random.default_rng([seed, block_idx])
+        cluster_ids = rng.integers(0, num_clusters, size=GENERATION_BLOCK_SIZE)
+        noise = 0.5 * rng.standard_normal((GENERATION_BLOCK_SIZE, dim)).astype(np.float32)
+        return centroids[cluster_ids] + noise
+
+    for start in range(0, num_chunks, batch_size):
+        end = min(start + batch_size, num_chunks)
+        first_block, last_block = start // GENERATION_BLOCK_SIZE, (end - 1) // GENERATION_BLOCK_SIZE
+        blocks = np.concatenate([generate_block(block_idx) for block_idx in range(first_block, last_block + 1)])
+        offset = start - first_block * GENERATION_BLOCK_SIZE
+        embeddings = blocks[offset:offset + (end - start)]
+        ids = [f"chunk-{i}" for i in range(start, end)]
+        yield ids, embeddings
+
+def generate_queries(num_queries:int, dim:int, num_clusters:int=100, seed:int=0) -> np.ndarray:
+    """
+    Generates query embeddings drawn around the same topics as the corpus.
+
+    Args:
+        num_queries (int): The number of queries.
+        dim (int): The dimension of the embeddings.
+        num_clusters (int): The number of topics (must match the corpus).
+        seed (int): The random seed (must match the corpus).
+    """
+    centroids = np.random.default_rng(seed).standard_normal((num_clusters, dim)).astype(np.float32) # Same centroids as the corpus
+    query_rng = np.random.default_rng(seed + 1)
+    cluster_ids = query_rng.integers(0, num_clusters, size=num_queries)
+    return centroids[cluster_ids] + 0.5 * query_rng.standard_normal((num_queries, dim)).astype(np.float32)
+
+def exact_search(corpus:np.ndarray, queries:np.ndarray, k:int, space:str="l2") -> np.ndarray:
+    """
+    Finds the exact top-k neighbours of each query by brute force.
+
+    Args:
+        corpus (np.ndarray): The corpus embeddings [num_chunks, dim].
+        queries (np.ndarray): The query embeddings [num_queries, dim].
+        k (int): The number of neighbours.
+        space (str): The distance function ("l2", "cosine" or "ip"), as used by the index.
+
+    Returns:
+        np.ndarray: The indices of the neighbours [num_queries, k].
+    """
+    if space == "cosine":
+        corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+    neighbours = []
+    for query in queries:
+        if space == "l2":
+            distances = np.sum((corpus - query) ** 2, axis=1)
+        else:
+            distances = -(corpus @ query)
+        top_k = np.argpartition(distances, k)[:k]
+        neighbours.append(top_k[np.argsort(distances[top_k])])
+    return np.array(neighbours)
+
+def get_rss_mb() -> float:
+    """
+    Returns the current resident memory of the process in MB.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3 # Peak RSS (KB on Linux) as a fallback
+
+def get_directory_size_mb(path:str) -> float:
+    """
+    Returns the total size of the files in a directory in MB.
+
+    Args:
+        path (str): The directory.
+    """
+    total_size = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            total_size += os.path.getsize(os.path.join(root, file_name))
+    return total_size / 1e6
+
+def run_benchmark(
+                corpus_size:int,
+                backend:str="persistent",
+                dim:int=256,
+                k:int=5,
+                num_queries:int=200,
+                index_params:Dict[str, Any]=None,
+                insert_batch_size:int=5000,
+                seed:int=0,
+                corpus:np.ndarray=None,
+                queries:np.ndarray=None
+                ) -> Dict[str, Any]:
+    """
+    Runs the benchmark for a single corpus size, storage backend and set of index parameters.
+    - Uses synthetic embeddings unless a (real) corpus and queries are given.
+
+    Args:
+        corpus_size (int): The number of chunks in the corpus.
+        backend (str): "persistent" (on-disk ChromaDB, as used in production) or "ephemeral" (in-memory).
+        dim (int): The dimension of the embeddings.
+        k (int): The number of results per query (SEARCH_K).
+        num_queries (int): The number of queries used for latency and recall.
+        index_params (Dict[str, Any]): The collection metadata used to build the index, e.g. {"hnsw:M": 16}.
+        insert_batch_size (int): The number of chunks inserted per call.
+        seed (int): The random seed.
+        corpus (np.ndarray): Optional corpus embeddings [num_chunks, dim] (overrides corpus_size and dim).
+        queries (np.ndarray): Optional query embeddings [num_queries, dim] (overrides num_queries).
+    """
+    if corpus is not None:
+        corpus_size, dim = corpus.shape
+    if queries is not None:
+        num_queries = len(queries)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}, expected one of: {BACKENDS}")
+    index_params = dict(index_params or {})
+    space = index_params.get("hnsw:space", "l2")
+
+    persist_dir = tempfile.mkdtemp(prefix="retrieval_benchmark_")
+    if backend == "persistent":
+        client = chromadb.PersistentClient(path=persist_dir)
+    else:
+        client = chromadb.EphemeralClient()
+
+    collection_name = f"benchmark-{corpus_size}-{int(time.time() * 1000)}"
+    collection = client.create_collection(collection_name, metadata=index_params or None)
+    insert_batch_size = min(insert_batch_size, client.get_max_batch_size())
+
+    try:
+        # Insert throughput
+        all_embeddings = []
+        rss_before = get_rss_mb()
+        insert_time = 0.0
+        if corpus is None:
+            corpus_batches = generate_corpus(corpus_size, dim, seed=seed, batch_size=insert_batch_size)
+        else:
+            corpus_batches = (
+                            ([f"chunk-{i}" for i in range(start, min(start + insert_batch_size, corpus_size))],
+                             corpus[start:start + insert_batch_size])
+                            for start in range(0, corpus_size, insert_batch_size)
+                            )
+        for ids, embeddings in corpus_batches:
+            all_embeddings.append(embeddings)
+            start_time = time.perf_counter()
+            collection.add(ids=ids, embeddings=embeddings)
+            insert_time += time.perf_counter() - start_time
+        corpus = np.concatenate(all_embeddings, axis=0)
+        # The corpus copy kept for exact search is excluded from the footprint of the store
+        memory_mb = get_rss_mb() - rss_before - corpus.nbytes / 1e6
+
+        # Query latency
+        if queries is None:
+            queries = generate_queries(num_queries, dim, seed=seed)
+        latencies = []
+        ann_results = []
+        for query in queries:
+            start_time = time.perf_counter()
+            result = collection.query(query_embeddings=[query], n_results=k, include=[])
+            latencies.append(time.perf_counter() - start_time)
+            ann_results.append([int(chunk_id.split("-")[1]) for chunk_id in result["ids"][0]])
+
+        # Recall@k against exact search
+        exact_results = exact_search(corpus, queries, k=k, space=space)
+        recalls = [
+                len(set(ann) & set(exact.tolist())) / k
+                for ann, exact in zip(ann_results, exact_results)
+                ]
+
+        latencies_ms = np.array(latencies) * 1000
+        return {
+                "corpus_size": corpus_size,
+                "backend": backend,
+                "dim": dim,
+                "k": k,
+                "num_queries": num_queries,
+                "index_params": index_params,
+                "insert_seconds": insert_time,
+                "insert_throughput": corpus_size / insert_time if insert_time > 0 else None,
+                "query_p50_ms": float(np.percentile(latencies_ms, 50)),
+                "query_p99_ms": float(np.percentile(latencies_ms, 99)),
+                "query_mean_ms": float(latencies_ms.mean()),
+                f"recall_at_{k}": float(np.mean(recalls)),
+                "memory_mb": max(memory_mb, 0.0),
+                "disk_mb": get_directory_size_mb(persist_dir) if backend == "persistent" else 0.0
+                }
+    finally:
+        client.delete_collection(collection_name)
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+def main(args:List[str]=None) -> Dict[str, Any]:
+    """
+    Runs the benchmark for every combination of corpus size and backend and writes a JSON report.
+    """
+    parser = argparse.ArgumentParser(description="Retrieval scaling benchmark (latency and recall versus corpus size).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["persistent"])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--num_queries", type=int, default=200)
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], default="l2")
+    parser.add_argument("--M", type=int, default=None, help="HNSW max neighbours per node.")
+    parser.add_argument("--ef_construction", type=int, default=None)
+    parser.add_argument("--ef_search", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="retrieval_benchmark.json")
+    args = parser.parse_args(args)
+
+    index_params = {"hnsw:space": args.space}
+    if args.M is not None:
+        index_params["hnsw:M"] = args.M
+    if args.ef_construction is not None:
+        index_params["hnsw:construction_ef"] = args.ef_construction
+    if args.ef_search is not None:
+        index_params["hnsw:search_ef"] = args.ef_search
+
+    results = []
+    for corpus_size in args.sizes:
+        for backend in args.backends:
+            print(f"Running benchmark: corpus_size={corpus_size}, backend={backend}")
+            result = run_benchmark(
+                                corpus_size=corpus_size,
+                                backend=backend,
+                                dim=args.dim,
+                                k=args.k,
+                                num_queries=args.num_queries,
+                                index_params=index_params,
+                                seed=args.seed
+                                )
+            print(json.dumps(result, indent=4))
+            results.append(result)
+
+    report = {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpu_count": os.cpu_count()},
+            "chromadb_version": chromadb.__version__,
+            "results": results
+            }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Saved report to {args.output}")
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from backend.src.RAG.completion_cache import CompletionCache
+
+def make_generation(input_tokens:int, cache_read:int) -> ChatGeneration:
+    """Creates a generation with prompt token usage."""
+    message = AIMessage(
+                content="answer",
+                usage_metadata={"input_tokens": input_tokens, "output_tokens": 1, "total_tokens": input_tokens + 1, "input_token_details": {"cache_read": cache_read}}
+                )
+    return ChatGeneration(message=message)
+
+def test_identical_prompt_hits():
+    """Test that the chat model reuses the completion of an identical prompt."""
+    cache = CompletionCache(max_size=2)
+    llm = FakeListChatModel(responses=["first answer", "second answer"], cache=cache)
+
+    assert llm.invoke("What is AI?").content == "first answer"
+    assert llm.invoke("What is AI?").content == "first answer"
+    assert llm.invoke("What is ML?").content == "second answer"
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["api_calls"] == 2
+
+def test_least_recently_used_is_evicted():
+    """Test that the least recently used completion is evicted when the cache is full."""
+    cache = CompletionCache(max_size=2)
+    cache.update("prompt A", "llm", [make_generation(10, 0)])
+    cache.update("prompt B", "llm", [make_generation(10, 0)])
+    cache.lookup("prompt A", "llm")
+    cache.update("prompt C", "llm", [make_generation(10, 0)])
+
+    assert cache.lookup("prompt B", "llm") is None
+    assert cache.lookup("prompt A", "llm") is not None
+    assert cache.lookup("prompt A", "other model parameters") is None
+
+def test_prefix_reuse_metrics():
+    """Test that the share of prompt tokens read from the provider's prompt cache is reported."""
+    cache = CompletionCache(store_completions=False)
+    cache.update("prompt A", "llm", [make_generation(1000, 0)])
+    cache.update("prompt B", "llm", [make_generation(1000, 768)])
+
+    stats = cache.get_stats()
+    assert cache.lookup("prompt A", "llm") is None
+    assert stats["size"] == 0
+    assert stats["prompt_tokens"] == 2000
+    assert stats["prefix_reuse_rate"] == 768 / 2000
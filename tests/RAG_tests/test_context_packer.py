@@ -0,0 +1,80 @@
+import pytest
+
+from backend.src.RAG.context_packer import ContextPacker
+
+@pytest.fixture
+def context_packer():
+    """Fixture to create a ContextPacker with a small token budget."""
+    return ContextPacker(model_name="gpt-4", max_context_tokens=60, duplicate_threshold=0.8)
+
+def make_doc(link:str, content:str) -> dict:
+    """Creates a retrieved document."""
+    return {"metadata": {"link": link}, "page_content": content}
+
+def test_pack_within_budget(context_packer):
+    """Test that documents within the budget are formatted unchanged and in order."""
+    docs = [make_doc("https://paperA.com", "Content A."), make_doc("https://paperB.com", "Content B.")]
+
+    context, stats = context_packer.pack(docs)
+
+    assert context == "Source: https://paperA.com\nContent: Content A.\n\nSource: https://paperB.com\nContent: Content B."
+    assert stats["tokens_saved"] == 0
+    assert stats["packed_tokens"] >= len(context_packer.encoding.encode(context)) # Tokens may merge across documents
+
+def test_pack_removes_near_duplicates(context_packer):
+    """Test that near-duplicate passages are only included once."""
+    content = "Transformers are neural networks built on self attention layers for sequence modelling."
+    docs = [
+        make_doc("https://paperA.com", content),
+        make_doc("https://paperA.com", content.replace("modelling.", "modelling tasks.")),
+        make_doc("https://paperB.com", "Graph neural networks operate on nodes and edges.")
+    ]
+
+    context, stats = context_packer.pack(docs)
+
+    assert stats["num_duplicates"] == 1
+    assert stats["num_packed"] == 2
+    assert stats["tokens_saved"] > 0
+    assert context.count("https://paperA.com") == 1
+
+def test_pack_keeps_retrieval_order_within_budget(context_packer):
+    """Test that the retrieval order is kept when every document fits, whatever the query."""
+    docs = [make_doc("https://paperA.com", "Graph networks."), make_doc("https://paperB.com", "Transformers for translation.")]
+
+    context, _ = context_packer.pack(docs, user_query="transformers translation")
+
+    assert context.startswith("Source: https://paperA.com")
+
+def test_pack_keeps_relevant_documents_over_budget(context_packer):
+    """Test that documents matching more query terms are kept when the budget is exceeded, in the retrieval order."""
+    filler = " ".join(f"Graph networks pass message {i}." for i in range(10))
+    docs = [
+        make_doc("https://paperA.com", "Attention for translation."),
+        make_doc("https://paperB.com", filler),
+        make_doc("https://paperC.com", "Transformers for translation.")
+    ]
+
+    context, stats = context_packer.pack(docs, user_query="transformers translation")
+
+    assert context.index("https://paperA.com") < context.index("https://paperC.com")
+    assert stats["num_truncated"] == 1 # The least relevant document
+    assert len(context_packer.encoding.encode(context)) <= context_packer.max_context_tokens
+
+def test_pack_truncates_at_sentence_boundary(context_packer):
+    """Test that the context fits the budget and the last document is cut at a sentence boundary."""
+    sentences = " ".join(f"Sentence {i} describes the method." for i in range(20))
+    docs = [make_doc("https://paperA.com", "Short abstract."), make_doc("https://paperB.com", sentences)]
+
+    context, stats = context_packer.pack(docs)
+
+    assert len(context_packer.encoding.encode(context)) <= context_packer.max_context_tokens
+    assert stats["num_truncated"] == 1
+    assert context.endswith("describes the method.")
+    assert stats["tokens_saved"] == stats["input_tokens"] - stats["packed_tokens"]
+
+def test_pack_empty(context_packer):
+    """Test that no documents produce an empty context."""
+    context, stats = context_packer.pack([])
+
+    assert context == ""
+    assert stats["tokens_saved"] == 0
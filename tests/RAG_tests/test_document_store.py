@@ -0,0 +1,37 @@
+import pytest
+from langchain_core.documents import Document
+
+from backend.src.RAG.document_store import ParentDocumentStore
+
+@pytest.fixture
+def document_store():
+    """Fixture to create a non-persistent ParentDocumentStore."""
+    store = ParentDocumentStore(path=":memory:")
+    yield store
+    store.close()
+
+def test_mset_and_mget(document_store):
+    """Test that stored documents are returned in the order of the keys."""
+    doc1 = Document(page_content="Abstract A", metadata={"title": "Paper A", "link": "https://paperA.com"})
+    doc2 = Document(page_content="Abstract B", metadata={"title": "Paper B", "link": "https://paperB.com"})
+    document_store.mset([("https://paperA.com", doc1), ("https://paperB.com", doc2)])
+
+    docs = document_store.mget(["https://paperB.com", "https://missing.com", "https://paperA.com"])
+
+    assert docs[0].page_content == "Abstract B"
+    assert docs[1] is None
+    assert docs[2].metadata == {"title": "Paper A", "link": "https://paperA.com"}
+
+def test_mset_replaces_existing(document_store):
+    """Test that storing a document with an existing key replaces it."""
+    document_store.mset([("key", Document(page_content="Old", metadata={}))])
+    document_store.mset([("key", Document(page_content="New", metadata={}))])
+
+    assert document_store.mget(["key"])[0].page_content == "New"
+
+def test_mdelete(document_store):
+    """Test that deleted documents are no longer returned."""
+    document_store.mset([("key", Document(page_content="Abstract", metadata={}))])
+    document_store.mdelete(["key"])
+
+    assert document_store.mget(["key"]) == [None]
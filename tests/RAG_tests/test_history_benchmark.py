@@ -0,0 +1,25 @@
+from benchmarks.history_benchmark import run_benchmark, main
+from backend.src.RAG.memory import InMemoryHistoryBackend
+
+def test_run_benchmark_report():
+    """Test that a small benchmark run reports the per-turn latencies and leaves no messages behind."""
+    backend = InMemoryHistoryBackend()
+    result = run_benchmark(backend=backend, num_sessions=3, num_turns=4, history_size=4, message_length=10)
+
+    assert result["num_turns"] == 12
+    assert result["turn_p50_ms"] <= result["turn_p99_ms"]
+    assert result["turns_per_second"] > 0
+    assert all(len(history.messages) == 0 for store in backend.stores.values() for history in store.sessions.values())
+
+def test_main_compares_backends(tmp_path):
+    """Test that the benchmark runs every local backend and skips MongoDB without a connection string."""
+    results = main([
+        "--backends", "memory", "sqlite", "mongodb",
+        "--num_sessions", "2",
+        "--num_turns", "2",
+        "--mongodb_uri", "",
+        "--output", str(tmp_path / "report.json")
+    ])
+
+    assert [result["backend"] for result in results] == ["memory", "sqlite"]
+    assert (tmp_path / "report.json").exists()
@@ -0,0 +1,169 @@
+import json
+import pytest
+from pymongo.errors import BulkWriteError
+from langchain_core.messages import HumanMessage, AIMessage, messages_from_dict, message_to_dict
+
+from backend.src.RAG.history_cache import HistoryCache, CachedChatMessageHistory
+from backend.src.RAG.mongo_history import get_timestamps, TIMESTAMP_KEY
+
+class FakeCollection:
+    """MongoDB collection keeping the documents in a list."""
+    def __init__(self):
+        self.docs = []
+        self.num_inserts = 0
+        self.fail = False
+        self.fail_after = None # Number of documents inserted before a bulk write error
+
+    def insert_many(self, docs, ordered=True):
+        if self.fail:
+            raise ConnectionError("MongoDB is unreachable")
+        self.num_inserts += 1
+        if self.fail_after is not None:
+            self.docs.extend(docs[:self.fail_after])
+            raise BulkWriteError({"nInserted": self.fail_after, "writeErrors": [{"index": self.fail_after, "code": 11000}]})
+        self.docs.extend(docs)
+
+    def find(self, query):
+        return [doc for doc in self.docs if all(doc[key] == value for key, value in query.items())]
+
+class FakeMongoHistory:
+    """IndexedChatMessageHistory reading and writing a FakeCollection."""
+    def __init__(self, collection, session_id, collection_name="history", history_size=None):
+        self.collection = collection
+        self.session_id = session_id
+        self.collection_name = collection_name
+        self.history_size = history_size
+        self.num_reads = 0
+
+    def get_messages(self, limit):
+        self.num_reads += 1
+        docs = self.collection.find({"SessionId": self.session_id})
+        if limit is not None:
+            docs = docs[-limit:] if limit > 0 else []
+        return messages_from_dict([json.loads(doc["History"]) for doc in docs])
+
+    def get_last_timestamp(self):
+        docs = self.collection.find({"SessionId": self.session_id})
+        return docs[-1][TIMESTAMP_KEY] if docs else None
+
+    @property
+    def messages(self):
+        return self.get_messages(self.history_size)
+
+    def clear(self):
+        self.collection.docs = [doc for doc in self.collection.docs if doc["SessionId"] != self.session_id]
+
+    def to_documents(self, messages):
+        return [
+                {"SessionId": self.session_id, "History": json.dumps(message_to_dict(message)), TIMESTAMP_KEY: timestamp}
+                for message, timestamp in zip(messages, get_timestamps(len(messages)))
+                ]
+
+def get_contents(collection, session_id):
+    return [json.loads(doc["History"])["data"]["content"] for doc in collection.find({"SessionId": session_id})]
+
+@pytest.fixture
+def cache():
+    """Fixture to create a history cache that is only flushed explicitly."""
+    cache = HistoryCache(max_sessions=2, flush_interval=3600, version_check_interval=3600)
+    yield cache
+    cache.close()
+
+def test_reads_hit_memory_and_writes_are_batched(cache):
+    """Test that reads are served from memory and the messages of several sessions are written in one insert."""
+    collection = FakeCollection()
+    alice = CachedChatMessageHistory(cache, FakeMongoHistory(collection, "alice"), history_size=2)
+    bob = CachedChatMessageHistory(cache, FakeMongoHistory(collection, "bob"))
+
+    alice.add_messages([HumanMessage(content="Q1"), AIMessage(content="A1"), HumanMessage(content="Q2")])
+    bob.add_messages([HumanMessage(content="Hi")])
+
+    assert [message.content for message in alice.messages] == ["A1", "Q2"]
+    assert alice.history.num_reads == 1
+    assert collection.docs == []
+
+    assert cache.flush() == 4
+    assert collection.num_inserts == 1
+    assert get_contents(collection, "alice") == ["Q1", "A1", "Q2"]
+
+def test_failed_flush_is_retried(cache):
+    """Test that messages are kept and written later when MongoDB is unreachable."""
+    collection = FakeCollection()
+    history = CachedChatMessageHistory(cache, FakeMongoHistory(collection, "alice"))
+    history.add_messages([HumanMessage(content="Q1")])
+
+    collection.fail = True
+    assert cache.flush() == 0
+    collection.fail = False
+    assert cache.flush() == 1
+    assert cache.get_stats()["failed_flushes"] == 1
+
+def test_partially_failed_flush_retries_only_the_remaining_messages(cache):
+    """Test that the messages stored before a bulk write error are not written twice."""
+    collection = FakeCollection()
+    alice = CachedChatMessageHistory(cache, FakeMongoHistory(collection, "alice"))
+    bob = CachedChatMessageHistory(cache, FakeMongoHistory(collection, "bob"))
+    alice.add_messages([HumanMessage(content="Q1"), AIMessage(content="A1")])
+    bob.add_messages([HumanMessage(content="Hi"), AIMessage(content="Hello")])
+
+    collection.fail_after = 3
+    assert cache.flush() == 3
+    collection.fail_after = None
+    assert cache.flush() == 1
+
+    assert get_contents(collection, "alice") == ["Q1", "A1"]
+    assert get_contents(collection, "bob") == ["Hi", "Hello"]
+
+def test_cached_messages_are_bounded():
+    """Test that only the last messages of a session are cached and longer histories are read from MongoDB."""
+    cache = HistoryCache(max_messages_per_session=3, flush_interval=3600, version_check_interval=3600)
+    collection = FakeCollection()
+    history = CachedChatMessageHistory(cache, FakeMongoHistory(collection, "alice"), history_size=2)
+    for i in range(3):
+        history.add_messages([HumanMessage(content=f"Q{i}"), AIMessage(content=f"A{i}")])
+
+    # Unwritten messages are kept even above the bound
+    assert len(cache.sessions[("history", "alice")].messages) == 6
+    cache.flush()
+    history.add_messages([HumanMessage(content="Q3")])
+    assert [message.content for message in cache.sessions[("history", "alice")].messages] == ["Q2", "A2", "Q3"]
+    assert [message.content for message in history.messages] == ["A2", "Q3"]
+
+    # An unbounded history writes the pending messages and reads all of them from MongoDB
+    full_history = CachedChatMessageHistory(cache, FakeMongoHistory(collection, "alice"), history_size=None)
+    assert [message.content for message in full_history.messages] == ["Q0", "A0", "Q1", "A1", "Q2", "A2", "Q3"]
+    assert collection.num_inserts == 2
+    cache.close()
+
+def test_version_change_reloads(cache):
+    """Test that messages written by another replica are picked up by the version check."""
+    collection = FakeCollection()
+    history = CachedChatMessageHistory(cache, FakeMongoHistory(collection, "alice"), history_size=10)
+    history.add_messages([HumanMessage(content="Q1")])
+    cache.flush()
+
+    # Our own write does not look like a change
+    cache.version_check_interval = 0
+    assert [message.content for message in history.messages] == ["Q1"]
+    assert cache.get_stats()["reloads"] == 0
+
+    # Another replica writes a message
+    other_cache = HistoryCache(flush_interval=3600)
+    CachedChatMessageHistory(other_cache, FakeMongoHistory(collection, "alice")).add_messages([AIMessage(content="A1")])
+    other_cache.close()
+
+    assert [message.content for message in history.messages] == ["Q1", "A1"]
+    assert cache.get_stats()["reloads"] == 1
+
+def test_close_flushes_and_evicts_only_written_sessions():
+    """Test that unwritten sessions are not evicted and everything is written on close."""
+    cache = HistoryCache(max_sessions=1, flush_interval=3600)
+    collection = FakeCollection()
+    for session_id in ["alice", "bob", "carol"]:
+        CachedChatMessageHistory(cache, FakeMongoHistory(collection, session_id)).add_messages([HumanMessage(content=session_id)])
+
+    assert cache.get_stats()["sessions"] == 3
+
+    cache.close()
+
+    assert len(collection.docs) == 3
@@ -0,0 +1,57 @@
+import pytest
+
+from benchmarks.index_tuning import recommend, sweep
+from benchmarks.retrieval_benchmark import generate_corpus
+from backend.src.RAG.retrieval_engine import get_collection_metadata
+from backend.src.constants import VECTOR_INDEX_CONFIG
+
+def make_result(M:int, ef_search:int, recall:float, p99:float) -> dict:
+    """Creates a benchmark result for a setting."""
+    return {
+        "index_params": {"hnsw:space": "l2", "hnsw:M": M, "hnsw:construction_ef": 100, "hnsw:search_ef": ef_search},
+        "recall_at_5": recall,
+        "query_p99_ms": p99
+    }
+
+def test_recommend_fastest_setting_meeting_targets():
+    """Test that the fastest setting meeting the recall target is recommended."""
+    results = [
+        make_result(M=8, ef_search=10, recall=0.80, p99=1.0),
+        make_result(M=16, ef_search=50, recall=0.96, p99=3.0),
+        make_result(M=32, ef_search=200, recall=0.99, p99=9.0)
+    ]
+
+    recommendation = recommend(results, k=5, target_recall=0.95)
+
+    assert recommendation["meets_targets"]
+    assert recommendation["index_config"] == {"space": "l2", "M": 16, "ef_construction": 100, "ef_search": 50}
+
+def test_recommend_falls_back_to_highest_recall():
+    """Test that the highest recall setting is recommended when no setting meets the targets."""
+    results = [
+        make_result(M=16, ef_search=50, recall=0.96, p99=3.0),
+        make_result(M=32, ef_search=200, recall=0.99, p99=9.0)
+    ]
+
+    recommendation = recommend(results, k=5, target_recall=0.95, target_p99_ms=2.0)
+
+    assert not recommendation["meets_targets"]
+    assert recommendation["index_config"]["M"] == 32
+
+def test_get_collection_metadata():
+    """Test that the index configuration is mapped to ChromaDB HNSW metadata."""
+    metadata = get_collection_metadata({**VECTOR_INDEX_CONFIG, "M": 32, "ef_search": 64})
+
+    assert metadata["hnsw:M"] == 32
+    assert metadata["hnsw:search_ef"] == 64
+    assert metadata["hnsw:space"] == VECTOR_INDEX_CONFIG["space"]
+
+@pytest.mark.slow
+def test_sweep_covers_grid():
+    """Test that every combination of the grid is benchmarked on the given embeddings."""
+    embeddings = next(generate_corpus(320, dim=8, seed=0, batch_size=320))[1]
+
+    results = sweep(corpus=embeddings[20:], queries=embeddings[:20], k=5, space="l2", M_values=[8, 16], ef_construction_values=[50], ef_search_values=[10])
+
+    assert len(results) == 2
+    assert all(result["corpus_size"] == 300 for result in results)
@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import MagicMock
+from langchain_core.documents import Document
+
+from backend.src.RAG.indexing_queue import IndexingQueue
+
+@pytest.fixture
+def indexing_queue():
+    """Fixture to create an IndexingQueue with a mocked RetrievalEngine."""
+    retrieval_engine = MagicMock()
+    queue = IndexingQueue(retrieval_engine=retrieval_engine, max_batch_size=10, max_wait_time=0.05)
+    yield queue
+    queue.close(timeout=5)
+
+def test_submit_and_wait(indexing_queue):
+    """Test that waiting on a ticket returns once the documents have been committed."""
+    doc = Document(page_content="Some AI research", metadata={"title": "AI Paper", "link": "https://ai.com"})
+
+    ticket = indexing_queue.submit([doc])
+
+    assert ticket.wait(timeout=5)
+    indexing_queue.retrieval_engine.split_and_add_documents.assert_called_once_with(docs=[doc])
+
+def test_submit_empty_docs(indexing_queue):
+    """Test that submitting no documents resolves immediately without writing."""
+    ticket = indexing_queue.submit([])
+
+    assert ticket.done()
+    indexing_queue.retrieval_engine.split_and_add_documents.assert_not_called()
+
+def test_coalesce_duplicates(indexing_queue):
+    """Test that documents with the same link are only written once per batch."""
+    doc1 = Document(page_content="Content A", metadata={"title": "Paper A", "link": "https://paperA.com"})
+    doc2 = Document(page_content="Content B", metadata={"title": "Paper B", "link": "https://paperB.com"})
+    duplicate_doc = Document(page_content="Content A", metadata={"title": "Paper A", "link": "https://paperA.com"})
+
+    docs = indexing_queue.coalesce([([doc1, doc2], None), ([duplicate_doc], None)])
+
+    assert docs == [doc1, doc2]
+
+def test_batches_multiple_submissions(indexing_queue):
+    """Test that concurrent submissions are committed together in a single write."""
+    indexing_queue.max_wait_time = 1
+    doc1 = Document(page_content="Content A", metadata={"title": "Paper A", "link": "https://paperA.com"})
+    doc2 = Document(page_content="Content B", metadata={"title": "Paper B", "link": "https://paperB.com"})
+
+    ticket1 = indexing_queue.submit([doc1] * 5)
+    ticket2 = indexing_queue.submit([doc2] * 5) # Fills the batch (10 documents)
+
+    assert ticket1.wait(timeout=5)
+    assert ticket2.wait(timeout=5)
+    indexing_queue.retrieval_engine.split_and_add_documents.assert_called_once_with(docs=[doc1, doc2])
+    assert indexing_queue.get_stats()["coalesced_docs"] == 8
+
+def test_failed_batch_raises_on_wait(indexing_queue):
+    """Test that errors from the vector store are surfaced to waiting requests."""
+    indexing_queue.retrieval_engine.split_and_add_documents.side_effect = Exception("Chroma error")
+    doc = Document(page_content="Content A", metadata={"title": "Paper A", "link": "https://paperA.com"})
+
+    ticket = indexing_queue.submit([doc])
+
+    with pytest.raises(Exception, match="Chroma error"):
+        ticket.wait(timeout=5)
+    assert indexing_queue.get_stats()["failed_batches"] == 1
+
+def test_close_flushes_pending_documents():
+    """Test that closing the queue commits everything that was still queued."""
+    retrieval_engine = MagicMock()
+    queue = IndexingQueue(retrieval_engine=retrieval_engine, max_wait_time=10)
+    doc = Document(page_content="Content A", metadata={"title": "Paper A", "link": "https://paperA.com"})
+
+    ticket = queue.submit([doc])
+    queue.close(timeout=5)
+
+    assert ticket.done()
+    retrieval_engine.split_and_add_documents.assert_called_once_with(docs=[doc])
+    with pytest.raises(RuntimeError):
+        queue.submit([doc])
+
+def test_submissions_racing_close_are_resolved():
+    """Test that every submission accepted while the queue is closing is either committed or rejected."""
+    import threading
+    retrieval_engine = MagicMock()
+    queue = IndexingQueue(retrieval_engine=retrieval_engine, max_wait_time=0.01)
+    doc = Document(page_content="Content A", metadata={"title": "Paper A", "link": "https://paperA.com"})
+    tickets = []
+
+    def submit():
+        for _ in range(50):
+            try:
+                tickets.append(queue.submit([doc]))
+            except RuntimeError:
+                return
+
+    threads = [threading.Thread(target=submit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    queue.close(timeout=5)
+    for thread in threads:
+        thread.join()
+
+    assert all(ticket.done() for ticket in tickets)
+
+def test_tickets_left_in_queue_fail_when_worker_stops():
+    """Test that submissions still queued when the worker stops fail instead of waiting forever."""
+    from backend.src.RAG.indexing_queue import IndexingTicket
+    retrieval_engine = MagicMock()
+    queue = IndexingQueue(retrieval_engine=retrieval_engine, max_wait_time=0.01)
+    doc = Document(page_content="Content A", metadata={"title": "Paper A", "link": "https://paperA.com"})
+    ticket = IndexingTicket(num_docs=1)
+
+    queue.pending.put(None) # Stops the worker
+    queue.pending.put(([doc], ticket)) # Queued after the sentinel
+    queue.worker.join(timeout=5)
+
+    with pytest.raises(RuntimeError, match="closed"):
+        ticket.wait(timeout=5)
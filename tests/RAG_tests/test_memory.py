@@ -0,0 +1,282 @@
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import HumanMessage, AIMessage
+
+from backend.src.RAG.memory import InMemoryHistory, HistorySummarizer, SummarizedHistory, BoundedSessionStore
+
+class DictSummaryStore:
+    """Summary store keeping the summaries in a dictionary."""
+    def __init__(self):
+        self.summaries = {}
+
+    def get(self, session_id):
+        return self.summaries.get(session_id)
+
+    def set(self, session_id, summary, last_summarized):
+        self.summaries[session_id] = {"summary": summary, "last_summarized": last_summarized}
+
+    def delete(self, session_id):
+        self.summaries.pop(session_id, None)
+
+def make_turn(i:int) -> list:
+    """Creates a user and assistant message pair."""
+    return [HumanMessage(content=f"Question {i}", id=f"q{i}"), AIMessage(content=f"Answer {i}", id=f"a{i}")]
+
+class RecordingSummarizer(HistorySummarizer):
+    """Summarizer recording the messages folded into each summary."""
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def summarize(self, previous_summary, messages, token_budget):
+        self.calls.append([message.content for message in messages])
+        return f"Summary up to {messages[-1].content}"
+
+@pytest.fixture
+def summarized_history():
+    """Fixture to create a summarized history keeping the last 2 turns verbatim."""
+    history = InMemoryHistory()
+    summarizer = HistorySummarizer(llm=FakeListChatModel(responses=["Summary of turns 0-1", "Summary of turns 0-2"]))
+    return SummarizedHistory(
+        session_id="alice",
+        history=history,
+        full_history=history,
+        summary_store=DictSummaryStore(),
+        summarizer=summarizer,
+        keep_last_turns=2,
+        token_budget=100
+    )
+
+def test_short_history_is_not_summarized(summarized_history):
+    """Test that the history is returned verbatim while it fits in the last turns."""
+    summarized_history.add_messages(make_turn(0) + make_turn(1))
+    assert summarized_history.summarizer.flush(timeout=5)
+
+    assert [message.content for message in summarized_history.messages] == ["Question 0", "Answer 0", "Question 1", "Answer 1"]
+    assert summarized_history.summary_store.get("alice") is None
+
+def test_older_turns_are_summarized(summarized_history):
+    """Test that turns older than the last turns are replaced by a summary."""
+    for i in range(4):
+        summarized_history.add_messages(make_turn(i))
+        assert summarized_history.summarizer.flush(timeout=5)
+
+    messages = summarized_history.messages
+
+    assert messages[0].type == "system"
+    assert "Summary of turns 0-2" in messages[0].content
+    assert [message.content for message in messages[1:]] == ["Question 2", "Answer 2", "Question 3", "Answer 3"]
+    assert summarized_history.summary_store.get("alice")["last_summarized"] == "a1"
+
+def test_summary_extends_only_new_messages():
+    """Test that compaction only sends the messages not yet in the summary."""
+    history = InMemoryHistory(messages=make_turn(0) + make_turn(1) + make_turn(2))
+    llm = FakeListChatModel(responses=["Summary"])
+    summarizer = HistorySummarizer(llm=llm)
+    summary_store = DictSummaryStore()
+    summary_store.set("alice", summary="Summary of turn 0", last_summarized="a0")
+
+    assert summarizer.compact("alice", full_history=history, summary_store=summary_store, keep_last_turns=1, token_budget=100)
+    assert summary_store.get("alice") == {"summary": "Summary", "last_summarized": "a1"}
+    assert not summarizer.compact("alice", full_history=history, summary_store=summary_store, keep_last_turns=1, token_budget=100)
+
+def test_compaction_waits_for_the_threshold():
+    """Test that older turns are sent verbatim until enough of them are unsummarized, then folded in one compaction."""
+    summarizer = RecordingSummarizer()
+    history = SummarizedHistory(
+        session_id="alice",
+        history=InMemoryHistory(),
+        full_history=InMemoryHistory(),
+        summary_store=DictSummaryStore(),
+        summarizer=summarizer,
+        keep_last_turns=1,
+        token_budget=100,
+        compaction_threshold=4
+    )
+    history.full_history = history.history
+
+    for i in range(2):
+        history.add_messages(make_turn(i))
+        assert summarizer.flush(timeout=5)
+    assert summarizer.calls == []
+    assert [message.content for message in history.messages] == ["Question 0", "Answer 0", "Question 1", "Answer 1"]
+
+    history.add_messages(make_turn(2))
+    assert summarizer.flush(timeout=5)
+    assert summarizer.calls == [["Question 0", "Answer 0", "Question 1", "Answer 1"]]
+    assert [message.content for message in history.messages] == ["Summary of the earlier conversation:\nSummary up to Answer 1", "Question 2", "Answer 2"]
+
+def test_memories_share_one_summarizer():
+    """Test that the histories of the process share one summarizer, which is shut down with the clients."""
+    from backend.src.RAG.memory import Memory, InMemoryHistoryBackend, get_history_summarizer, close_mongo_clients
+
+    summary_config = {"enabled": True, "keep_last_turns": 1, "summary_token_budget": 100, "compaction_threshold": 1}
+    first = Memory(backend=InMemoryHistoryBackend()).get_session_history("alice", "generator", summary_config=summary_config)
+    second = Memory(backend=InMemoryHistoryBackend()).get_session_history("bob", "generator", summary_config=summary_config)
+    summarizer = get_history_summarizer()
+    assert first.summarizer is summarizer and second.summarizer is summarizer
+
+    close_mongo_clients()
+    assert summarizer.closed
+    assert summarizer.schedule("alice", lambda: True) is None
+    assert get_history_summarizer() is not summarizer
+    close_mongo_clients()
+
+def test_in_memory_summary_store_is_bounded():
+    """Test that the in-memory summary store drops the least recently used summaries."""
+    from backend.src.RAG.memory import InMemorySummaryStore
+
+    summary_store = InMemorySummaryStore(max_sessions=2)
+    summary_store.set("alice", summary="Summary", last_summarized="a0")
+    summary_store.set("bob", summary="Summary", last_summarized="a0")
+    summary_store.get("alice")
+    summary_store.set("carol", summary="Summary", last_summarized="a0")
+
+    assert len(summary_store) == 2
+    assert summary_store.get("bob") is None and summary_store.get("alice") is not None
+
+def test_clear_deletes_summary(summarized_history):
+    """Test that clearing the history also deletes the summary."""
+    summarized_history.summary_store.set("alice", summary="Summary", last_summarized="a0")
+
+    summarized_history.clear()
+
+    assert summarized_history.messages == []
+
+def test_summary_keeps_up_past_the_message_cap(monkeypatch):
+    """Test that the summary keeps folding new turns after the session drops its oldest messages."""
+    import backend.src.RAG.memory as memory_module
+    from backend.src.RAG.memory import Memory, InMemoryHistoryBackend
+
+    monkeypatch.setitem(memory_module.IN_MEMORY_HISTORY_CONFIG, "max_messages_per_session", 6)
+    memory = Memory(backend=InMemoryHistoryBackend())
+    memory.summarizer = RecordingSummarizer()
+    summary_config = {"enabled": True, "keep_last_turns": 1, "summary_token_budget": 100, "compaction_threshold": 1}
+
+    for i in range(10):
+        history = memory.get_session_history("alice", "generator", summary_config=summary_config)
+        history.add_messages(make_turn(i))
+        assert memory.summarizer.flush(timeout=5)
+
+    messages = history.messages
+    assert messages[0].content.endswith("Summary up to Answer 8")
+    assert [message.content for message in messages[1:]] == ["Question 9", "Answer 9"]
+    folded = [content for call in memory.summarizer.calls for content in call]
+    assert folded == [content for i in range(9) for content in (f"Question {i}", f"Answer {i}")]
+
+def test_evicted_session_drops_its_summary(monkeypatch):
+    """Test that a session dropped by the in-memory store comes back without its old summary."""
+    import backend.src.RAG.memory as memory_module
+    from backend.src.RAG.memory import Memory, InMemoryHistoryBackend
+
+    monkeypatch.setitem(memory_module.IN_MEMORY_HISTORY_CONFIG, "max_sessions", 1)
+    memory = Memory(backend=InMemoryHistoryBackend())
+    memory.summarizer = RecordingSummarizer()
+    summary_config = {"enabled": True, "keep_last_turns": 1, "summary_token_budget": 100, "compaction_threshold": 1}
+
+    for i in range(3):
+        memory.get_session_history("alice", "generator", summary_config=summary_config).add_messages(make_turn(i))
+        assert memory.summarizer.flush(timeout=5)
+    assert memory.backend.get_summary_store("generator").get("alice") is not None
+
+    memory.get_session_history("bob", "generator", summary_config=summary_config).add_messages(make_turn(0))
+    assert memory.backend.get_summary_store("generator").get("alice") is None
+    history = memory.get_session_history("alice", "generator", summary_config=summary_config)
+    history.add_messages(make_turn(3))
+    assert [message.content for message in history.messages] == ["Question 3", "Answer 3"]
+
+def test_histories_share_one_mongo_client(monkeypatch):
+    """Test that every history of the process reuses the same client and the index is only created once."""
+    from unittest.mock import patch
+    from backend.src.RAG.memory import Memory, get_mongo_client, close_mongo_clients
+
+    monkeypatch.setenv("MONGODB_URI", "mongodb://localhost:27017")
+    memory = Memory()
+    with patch("backend.src.RAG.memory.ensure_history_indexes", return_value={}) as mock_create_index:
+        first = memory.create_history("alice", "test_user_history_generator", history_size=10)
+        second = memory.create_history("bob", "test_user_history_generator", history_size=10)
+
+    # With the history cache enabled, the MongoDB history is wrapped
+    first, second = getattr(first, "history", first), getattr(second, "history", second)
+    assert first.client is second.client
+    assert first.client is get_mongo_client("mongodb://localhost:27017")
+    assert mock_create_index.call_count == 1
+    close_mongo_clients()
+
+def test_session_store_caps_messages_per_session():
+    """Test that a session only keeps its most recent messages."""
+    store = BoundedSessionStore(max_sessions=10, max_messages_per_session=4, ttl=3600, max_total_size=10_000)
+    history = store.get("alice")
+    for i in range(5):
+        history.add_messages(make_turn(i))
+
+    assert [message.content for message in store.get("alice").messages] == ["Question 3", "Answer 3", "Question 4", "Answer 4"]
+    assert store.get_stats()["total_size"] == sum(len(message.content) for message in history.messages)
+
+def test_session_store_evicts_least_recently_used():
+    """Test that the least recently used sessions are dropped above the session and size limits."""
+    store = BoundedSessionStore(max_sessions=2, max_messages_per_session=100, ttl=3600, max_total_size=40)
+    store.get("alice").add_messages(make_turn(0))
+    store.get("bob").add_messages(make_turn(0))
+    store.get("alice")
+    store.get("carol")
+
+    assert "bob" not in store and "alice" in store
+    assert store.get_stats()["evicted_max_sessions"] == 1
+
+    store.get("carol").add_messages([HumanMessage(content="x" * 25)]) # Over the total size
+    assert "alice" not in store and "carol" in store
+    assert store.get_stats()["evicted_max_size"] == 1
+
+def test_session_store_evicts_idle_sessions(monkeypatch):
+    """Test that sessions idle for longer than the TTL are dropped."""
+    import backend.src.RAG.memory as memory
+    now = [1000.0]
+    monkeypatch.setattr(memory.time, "monotonic", lambda: now[0])
+
+    store = BoundedSessionStore(max_sessions=10, max_messages_per_session=100, ttl=60, max_total_size=10_000)
+    store.get("alice").add_messages(make_turn(0))
+    now[0] += 30
+    store.get("bob")
+    now[0] += 45
+    store.get("bob")
+
+    assert "alice" not in store and "bob" in store
+    assert store.get_stats() == {"evicted_idle": 1, "evicted_max_sessions": 0, "evicted_max_size": 0, "sessions": 1, "total_size": 0}
+
+@pytest.mark.parametrize("backend_name", ["sqlite", "memory"])
+def test_local_history_backends(backend_name, tmp_path, monkeypatch):
+    """Test that the local backends store the messages and summaries of each collection separately."""
+    from backend.src.RAG.memory import Memory, SQLiteHistoryBackend, InMemoryHistoryBackend, close_mongo_clients
+
+    monkeypatch.delenv("MONGODB_URI", raising=False)
+    backend = SQLiteHistoryBackend(path=str(tmp_path / "history.db")) if backend_name == "sqlite" else InMemoryHistoryBackend()
+    memory = Memory(backend=backend)
+
+    history = memory.create_history("alice", "generator", history_size=3)
+    for i in range(3):
+        history.add_messages(make_turn(i))
+    memory.create_history("alice", "responder", history_size=None).add_messages(make_turn(9))
+
+    assert [message.content for message in history.messages] == ["Answer 1", "Question 2", "Answer 2"]
+    assert len(memory.create_history("alice", "generator", history_size=None).messages) == 6
+    assert [message.content for message in memory.create_history("alice", "responder", history_size=None).messages] == ["Question 9", "Answer 9"]
+
+    summary_store = backend.get_summary_store("generator")
+    summary_store.set("alice", summary="Summary", last_summarized="a0")
+    assert summary_store.get("alice") == {"summary": "Summary", "last_summarized": "a0"}
+    assert backend.get_summary_store("responder").get("alice") is None
+
+    history.clear()
+    assert memory.create_history("alice", "generator", history_size=None).messages == []
+    close_mongo_clients()
+
+def test_history_backend_is_selected_by_environment(monkeypatch):
+    """Test that the backend is chosen by the HISTORY_BACKEND environment variable."""
+    from backend.src.RAG.memory import Memory, InMemoryHistoryBackend, get_history_backend
+
+    monkeypatch.setenv("HISTORY_BACKEND", "memory")
+    monkeypatch.delenv("MONGODB_URI", raising=False)
+    assert isinstance(Memory().backend, InMemoryHistoryBackend)
+    with pytest.raises(ValueError):
+        get_history_backend("redis")
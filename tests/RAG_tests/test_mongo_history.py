@@ -0,0 +1,103 @@
+import pytest
+from datetime import timezone
+from unittest.mock import MagicMock
+from langchain_core.messages import HumanMessage, AIMessage
+
+from backend.src.RAG.mongo_history import IndexedChatMessageHistory, ensure_history_indexes, SESSION_INDEX_NAME, TTL_INDEX_NAME
+
+class FakeCursor:
+    """MongoDB cursor supporting sort and limit."""
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+class FakeCollection:
+    """MongoDB collection keeping the documents in a list and recording the queries."""
+    def __init__(self):
+        self.docs = []
+        self.projections = []
+
+    def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+    def find(self, query, projection):
+        self.projections.append(projection)
+        docs = [doc for doc in self.docs if all(doc[key] == value for key, value in query.items())]
+        return FakeCursor(docs)
+
+    def find_one(self, query, projection, sort):
+        (key, direction), = sort
+        docs = list(self.find(query, projection).sort(key, direction).limit(1))
+        return {field: docs[0][field] for field in projection if projection[field] and field in docs[0]} if docs else None
+
+@pytest.fixture
+def collection():
+    return FakeCollection()
+
+def make_history(collection, session_id, history_size=None):
+    """Creates a history reading and writing the fake collection."""
+    history = IndexedChatMessageHistory(
+                                        connection_string=None,
+                                        session_id=session_id,
+                                        client=MagicMock(),
+                                        create_index=False,
+                                        history_size=history_size
+                                        )
+    history.collection = collection
+    return history
+
+def test_reads_return_the_last_messages_in_order(collection):
+    """Test that a limited read returns the most recent messages, oldest first, with a projection."""
+    writer = make_history(collection, "alice")
+    for i in range(3):
+        writer.add_messages([HumanMessage(content=f"Question {i}"), AIMessage(content=f"Answer {i}")])
+    make_history(collection, "bob").add_messages([HumanMessage(content="Other")])
+
+    recent = make_history(collection, "alice", history_size=3).messages
+    assert [message.content for message in recent] == ["Answer 1", "Question 2", "Answer 2"]
+    assert len(make_history(collection, "alice").messages) == 6
+    assert make_history(collection, "alice", history_size=0).messages == []
+    assert collection.projections[0] == {"_id": 0, "History": 1}
+
+def test_messages_of_a_batch_have_increasing_timestamps(collection):
+    """Test that the messages written together keep their order."""
+    docs = make_history(collection, "alice").to_documents([HumanMessage(content="a"), AIMessage(content="b")])
+    assert docs[0]["CreatedAt"] < docs[1]["CreatedAt"]
+
+def test_last_timestamp_is_the_newest_message(collection):
+    """Test that the version of a session is the timestamp of its newest message, as an aware UTC datetime."""
+    history = make_history(collection, "alice")
+    assert history.get_last_timestamp() is None
+
+    history.add_messages([HumanMessage(content="a"), AIMessage(content="b")])
+    for doc in collection.docs:
+        doc["CreatedAt"] = doc["CreatedAt"].replace(tzinfo=None) # As returned by a client that is not tz_aware
+    assert history.get_last_timestamp() == max(doc["CreatedAt"] for doc in collection.docs).replace(tzinfo=timezone.utc)
+
+def test_indexes_are_created_once():
+    """Test that missing indexes are created and existing ones are only checked."""
+    collection = MagicMock()
+    collection.index_information.return_value = {"_id_": {"key": [("_id", 1)]}}
+    assert ensure_history_indexes(collection, ttl=60) == {SESSION_INDEX_NAME: "created", TTL_INDEX_NAME: "created"}
+    collection.create_index.assert_any_call([("CreatedAt", 1)], name=TTL_INDEX_NAME, expireAfterSeconds=60)
+
+    collection = MagicMock()
+    collection.index_information.return_value = {
+        SESSION_INDEX_NAME: {"key": [("SessionId", 1), ("CreatedAt", 1)]},
+        TTL_INDEX_NAME: {"key": [("CreatedAt", 1)], "expireAfterSeconds": 60}
+    }
+    assert ensure_history_indexes(collection, ttl=60) == {SESSION_INDEX_NAME: "ok", TTL_INDEX_NAME: "ok"}
+    collection.create_index.assert_not_called()
+
+    assert ensure_history_indexes(collection, ttl=120)[TTL_INDEX_NAME] == "updated"
+    collection.database.command.assert_called_once()
@@ -1,5 +1,6 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, AsyncMock, patch
 from backend.src.RAG.query_generator import ResearchQueryGenerator  
 
 @pytest.fixture
@@ -46,3 +47,33 @@ def test_generate_query_with_history(mock_query_generator):
     response = mock_query_generator.generate("What about ethics in AI?")
     assert response == ["AI ethics", "Fairness in AI"]
 
+
+def test_generate_uses_session_id_per_call(mock_query_generator):
+    """Test if the session ID of each call selects the chat history without changing the shared instance."""
+    mock_query_generator.query_chain.invoke.return_value.content = '["AI research"]'
+
+    mock_query_generator.generate("Tell me about AI research", session_id="alice")
+    assert mock_query_generator.query_chain.invoke.call_args.kwargs["config"] == {"configurable": {"session_id": "alice"}}
+
+    mock_query_generator.generate("Tell me about AI research")
+    assert mock_query_generator.query_chain.invoke.call_args.kwargs["config"] == {"configurable": {"session_id": "1234"}}
+    assert mock_query_generator.session_id == "1234"
+
+def test_generate_requires_session_id():
+    """Test if generate fails without a session ID instead of sharing a history."""
+    with patch("backend.src.RAG.query_generator.ChatOpenAI"), \
+         patch("backend.src.RAG.query_generator.RunnableWithMessageHistory"), \
+         patch("backend.src.RAG.query_generator.Memory"):
+        generator = ResearchQueryGenerator(openai_api_key="fake_key")
+
+    with pytest.raises(ValueError):
+        generator.generate("Tell me about AI research")
+
+def test_agenerate_valid_query(mock_query_generator):
+    """Test if agenerate awaits the chain and parses the query variations."""
+    mock_query_generator.query_chain.ainvoke = AsyncMock(return_value=MagicMock(content='["AI research", "Machine Learning trends"]'))
+
+    response = asyncio.run(mock_query_generator.agenerate("Tell me about AI research", session_id="alice"))
+
+    assert response == ["AI research", "Machine Learning trends"]
+    assert mock_query_generator.query_chain.ainvoke.call_args.kwargs["config"] == {"configurable": {"session_id": "alice"}}
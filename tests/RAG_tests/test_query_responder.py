@@ -1,5 +1,6 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, AsyncMock, patch
 from backend.src.RAG.query_responder import QueryResponder  
 
 @pytest.fixture
@@ -60,3 +61,86 @@ def test_generate_answer_with_docs(mock_query_responder):
     response = mock_query_responder.generate_answer(docs, "What is AI?")
     assert "AI is the study of intelligence." in response
     assert "[Source: http://example.com]" in response
+
+def test_generate_answer_uses_session_id_per_call(mock_query_responder):
+    """Test if the session ID of each call selects the chat history without changing the shared instance."""
+    mock_query_responder.qa_chain.invoke.return_value.content = "AI is artificial intelligence."
+
+    mock_query_responder.generate_answer([], "What is AI?", session_id="alice")
+
+    assert mock_query_responder.qa_chain.invoke.call_args.kwargs["config"] == {"configurable": {"session_id": "alice"}}
+    assert mock_query_responder.session_id == "1234"
+
+def test_agenerate_answer(mock_query_responder):
+    """Test if agenerate_answer awaits the chain with the formatted context."""
+    mock_query_responder.qa_chain.ainvoke = AsyncMock(return_value=MagicMock(content="AI is artificial intelligence."))
+    docs = [{"metadata": {"link": "https://example.com"}, "page_content": "AI is artificial intelligence."}]
+
+    response = asyncio.run(mock_query_responder.agenerate_answer(docs, "What is AI?", session_id="alice"))
+
+    assert response == "AI is artificial intelligence."
+    prompt = mock_query_responder.qa_chain.ainvoke.call_args.args[0]
+    assert prompt == {"context": "Source: https://example.com\nContent: AI is artificial intelligence.", "question": "What is AI?"}
+
+def test_prompt_has_stable_prefix(mock_query_responder):
+    """Test if the instructions come first and do not change with the context and question."""
+    first = mock_query_responder.prompt_template.format_messages(history=[], context="Context A", question="What is AI?")
+    second = mock_query_responder.prompt_template.format_messages(history=[], context="Context B", question="What is ML?")
+
+    assert first[0].type == "system"
+    assert first[0].content == second[0].content
+    assert "Context A" in first[-1].content and "What is AI?" in first[-1].content
+
+def test_generate_answers_batch_partial_failure(mock_query_responder):
+    """Test if a failed or timed out question does not fail the rest of the batch."""
+    async def fake_answer(prompt):
+        if prompt["question"] == "fail":
+            raise RuntimeError("LLM error")
+        if prompt["question"] == "slow":
+            await asyncio.sleep(1)
+        return MagicMock(content=f"Answer to {prompt['question']}")
+
+    mock_query_responder.answer_chain = MagicMock()
+    mock_query_responder.answer_chain.ainvoke = AsyncMock(side_effect=fake_answer)
+    requests = [{"user_query": question, "retrieved_docs": []} for question in ["What is AI?", "fail", "slow"]]
+
+    results = mock_query_responder.generate_answers_batch(requests, max_concurrency=2, timeout=0.1)
+
+    assert results[0] == {"answer": "Answer to What is AI?", "error": None}
+    assert results[1] == {"answer": None, "error": "LLM error"}
+    assert results[2]["answer"] is None and "Timed out" in results[2]["error"]
+
+def test_generate_answers_batch_timeout_covers_the_wait(mock_query_responder):
+    """Test if the timeout of a question includes the time spent waiting behind the earlier questions of its session."""
+    async def fake_answer(prompt, config=None):
+        if prompt["question"] == "slow":
+            await asyncio.sleep(1)
+        return MagicMock(content=f"Answer to {prompt['question']}")
+
+    mock_query_responder.qa_chain.ainvoke = AsyncMock(side_effect=fake_answer)
+    requests = [{"user_query": question, "retrieved_docs": [], "session_id": "user-1"} for question in ["slow", "What is AI?"]]
+
+    results = mock_query_responder.generate_answers_batch(requests, timeout=0.1)
+
+    assert all(result["answer"] is None and "Timed out" in result["error"] for result in results)
+
+def test_generate_answers_batch_respects_concurrency(mock_query_responder):
+    """Test if no more than max_concurrency questions are answered at once and sessions use their history."""
+    in_flight, max_in_flight = 0, 0
+
+    async def fake_answer(prompt, config=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MagicMock(content="Answer")
+
+    mock_query_responder.qa_chain.ainvoke = AsyncMock(side_effect=fake_answer)
+    requests = [{"user_query": f"Question {i}", "retrieved_docs": [], "session_id": f"user-{i}"} for i in range(6)]
+
+    results = mock_query_responder.generate_answers_batch(requests, max_concurrency=2)
+
+    assert all(result["error"] is None for result in results)
+    assert max_in_flight == 2
+    assert mock_query_responder.qa_chain.ainvoke.call_count == 6
@@ -13,7 +13,7 @@ def mock_retrieval_engine():
     engine.vector_store.similarity_search = MagicMock(return_value=[])
     engine.vector_store.similarity_search_with_score = MagicMock(return_value=[])
     engine.vector_store.add_documents = MagicMock()
-    engine.vector_store.get = MagicMock(return_value=[])
+    engine.vector_store.get = MagicMock(return_value={"ids": [], "metadatas": []})
     
     return engine
 
@@ -35,23 +35,16 @@ def test_no_duplicate_documents(mock_retrieval_engine):
     
     doc1 = Document(page_content="Unique content", metadata={"title": "Paper A", "link": "https://paperA.com"})
     
-    # Mock similarity search to return empty (meaning document doesn't exist)
-    mock_retrieval_engine.vector_store.similarity_search = MagicMock(return_value=[])
-    
-    # Add the document
+    # Add the document (no stored chunks have its link)
     mock_retrieval_engine.split_and_add_documents([doc1])
 
-    # Mock similarity search to simulate that the document now exists
-    mock_retrieval_engine.vector_store.similarity_search = MagicMock(return_value=[doc1])
+    # Mock the lookup to simulate that the document now exists
+    mock_retrieval_engine.vector_store.get = MagicMock(return_value={"ids": ["1"], "metadatas": [{"link": "https://paperA.com"}]})
 
     # Try adding the same document again
     mock_retrieval_engine.split_and_add_documents([doc1])
     
-    # Retrieve stored documents (mocked)
-    mock_retrieval_engine.vector_store.get = MagicMock(return_value=[doc1])
-    all_docs = mock_retrieval_engine.vector_store.get()
-    
-    assert len(all_docs) == 1, "Duplicate document was added, but it should have been ignored"
+    assert mock_retrieval_engine.vector_store.add_documents.call_count == 1, "Duplicate document was added, but it should have been ignored"
 
 def test_retrieval_of_existing_documents(mock_retrieval_engine):
     """Test retrieval when relevant documents exist in ChromaDB."""
@@ -83,17 +76,14 @@ def test_adding_multiple_documents_with_one_duplicate(mock_retrieval_engine):
     doc2 = Document(page_content="Content B", metadata={"title": "Paper B", "link": "https://paperB.com"})
     duplicate_doc = Document(page_content="Content A", metadata={"title": "Paper A", "link": "https://paperA.com"})
     
-    # Mock similarity search (first two don't exist, third does)
-    mock_retrieval_engine.vector_store.similarity_search = MagicMock(side_effect=[[], [], [doc1]])
-    
-    # Add all documents
+    # Add all documents, the stored links are checked once for the whole batch
     mock_retrieval_engine.split_and_add_documents([doc1, doc2, duplicate_doc])
     
-    # Retrieve stored documents (mocked)
-    mock_retrieval_engine.vector_store.get = MagicMock(return_value=[doc1, doc2])
-    all_docs = mock_retrieval_engine.vector_store.get()
-    
-    assert len(all_docs) == 2, "Duplicate document was added incorrectly"
+    mock_retrieval_engine.vector_store.get.assert_called_once()
+    mock_retrieval_engine.vector_store.similarity_search.assert_not_called()
+    added_chunks = mock_retrieval_engine.vector_store.add_documents.call_args.kwargs["documents"]
+    assert {chunk.metadata["link"] for chunk in added_chunks} == {"https://paperA.com", "https://paperB.com"}
+    assert len(added_chunks) == 2, "Duplicate document was added incorrectly"
 
 def test_retrieval_after_multiple_document_additions(mock_retrieval_engine):
     """Test retrieval after adding multiple documents."""
@@ -103,8 +93,8 @@ def test_retrieval_after_multiple_document_additions(mock_retrieval_engine):
     
     mock_retrieval_engine.split_and_add_documents([doc1, doc2])
 
-    # Mock similarity search results
-    mock_retrieval_engine.vector_store.similarity_search_with_score = MagicMock(return_value=[(doc1, 0.9), (doc2, 0.85)])
+    # Mock similarity search results (distances, lower is more similar)
+    mock_retrieval_engine.vector_store.similarity_search_with_score = MagicMock(return_value=[(doc2, 0.3), (doc1, 0.1)])
 
     retrieved_docs = mock_retrieval_engine.retrieve(["Neural Networks"])
     
@@ -146,3 +136,221 @@ def test_convert_entries_to_docs(mock_retrieval_engine):
     assert docs[1].metadata["title"] == "ML Paper 2", "Title mismatch"
     assert docs[1].metadata["link"] == "https://ml2.com", "Link mismatch"
     assert docs[1].page_content == "This is a summary of ML Paper 2", "Summary mismatch"
+
+@pytest.fixture
+def mock_parent_retrieval_engine(mock_retrieval_engine):
+    """Fixture to create a mocked RetrievalEngine returning parent documents."""
+    from backend.src.RAG.document_store import ParentDocumentStore
+
+    mock_retrieval_engine.return_parent_documents = True
+    mock_retrieval_engine.document_store = ParentDocumentStore(path=":memory:")
+    return mock_retrieval_engine
+
+def test_retrieval_returns_one_parent_per_paper(mock_parent_retrieval_engine):
+    """Test that several matching chunks of the same paper are replaced by its full abstract."""
+    parent = Document(page_content="Full abstract. With many sentences.", metadata={"title": "Paper A", "link": "https://paperA.com"})
+    mock_parent_retrieval_engine.split_and_add_documents([parent])
+
+    chunk1 = Document(page_content="Full abstract.", metadata={"title": "Paper A", "link": "https://paperA.com", "chunk_index": 0})
+    chunk2 = Document(page_content="With many sentences.", metadata={"title": "Paper A", "link": "https://paperA.com", "chunk_index": 1})
+    mock_parent_retrieval_engine.vector_store.similarity_search_with_score = MagicMock(return_value=[(chunk1, 0.9), (chunk2, 0.8)])
+
+    retrieved_docs = mock_parent_retrieval_engine.retrieve(["AI", "ML"])
+
+    assert len(retrieved_docs) == 1, "Expected one parent document for both chunks"
+    assert retrieved_docs[0]["page_content"] == "Full abstract. With many sentences."
+    assert retrieved_docs[0]["metadata"] == {"title": "Paper A", "link": "https://paperA.com"}
+
+def test_retrieval_stitches_missing_parent(mock_parent_retrieval_engine):
+    """Test that neighbouring chunks are stitched together when the parent is not in the document store."""
+    chunk = Document(page_content="Second sentence. Third sentence.", metadata={"link": "https://paperB.com", "chunk_index": 1, "num_tokens": 6})
+    mock_parent_retrieval_engine.vector_store.similarity_search_with_score = MagicMock(return_value=[(chunk, 0.9)])
+    mock_parent_retrieval_engine.vector_store.get = MagicMock(return_value={
+        "documents": ["Second sentence. Third sentence.", "First sentence. Second sentence."],
+        "metadatas": [{"link": "https://paperB.com", "chunk_index": 1}, {"link": "https://paperB.com", "chunk_index": 0}]
+    })
+
+    retrieved_docs = mock_parent_retrieval_engine.retrieve(["AI"])
+
+    assert len(retrieved_docs) == 1
+    assert retrieved_docs[0]["page_content"] == "First sentence. Second sentence. Third sentence."
+    assert retrieved_docs[0]["metadata"] == {"link": "https://paperB.com"}
+
+def test_convert_entries_to_docs_normalises_metadata(mock_retrieval_engine):
+    """Test that entries get typed metadata fields that can be filtered on in the vector search."""
+    entries = [
+        {
+            "title": "ArXiv Paper",
+            "summary": "Summary",
+            "published": "2023-05-01T12:00:00Z",
+            "pdf_link": "http://arxiv.org/abs/1234.5678v1",
+            "source": "arxiv",
+            "primary_category": "cs.CL"
+        },
+        {
+            "title": "Semantic Scholar Paper",
+            "summary": "Summary",
+            "published": "2021",
+            "paper_link": "https://www.semanticscholar.org/paper/1",
+            "citationCount": 10,
+            "influentialCitationCount": 2
+        },
+        {
+            "title": "Undated Paper",
+            "summary": "Summary",
+            "published": "",
+            "paper_link": "https://www.semanticscholar.org/paper/2"
+        }
+    ]
+
+    docs = mock_retrieval_engine.convert_entries_to_docs(entries)
+
+    assert docs[0].metadata["year"] == 2023
+    assert docs[0].metadata["published_timestamp"] == 1682942400
+    assert docs[0].metadata["source"] == "arxiv"
+    assert docs[0].metadata["category"] == "cs.CL"
+    assert docs[1].metadata["year"] == 2021
+    assert docs[1].metadata["source"] == "semantic_scholar"
+    assert docs[1].metadata["citation_count"] == 10
+    assert docs[1].metadata["influential_citation_count"] == 2
+    assert "year" not in docs[2].metadata, "Unknown dates should be left out of the metadata"
+    assert None not in docs[2].metadata.values()
+
+def test_build_metadata_filter(mock_retrieval_engine):
+    """Test that query filters are converted into a ChromaDB where filter."""
+    assert mock_retrieval_engine.build_metadata_filter() is None
+    assert mock_retrieval_engine.build_metadata_filter(year_from=2023) == {"year": {"$gte": 2023}}
+    assert mock_retrieval_engine.build_metadata_filter(year_from=2020, sources=["arxiv"], min_citations=5) == {
+        "$and": [
+            {"year": {"$gte": 2020}},
+            {"source": {"$in": ["arxiv"]}},
+            {"citation_count": {"$gte": 5}}
+        ]
+    }
+
+def test_retrieval_passes_metadata_filter(mock_retrieval_engine):
+    """Test that the metadata filter is applied inside the vector search."""
+    metadata_filter = {"year": {"$gte": 2023}}
+
+    mock_retrieval_engine.retrieve(["AI"], metadata_filter=metadata_filter)
+
+    mock_retrieval_engine.vector_store.similarity_search_with_score.assert_called_once_with(query="AI", k=mock_retrieval_engine.SEARCH_K, filter=metadata_filter)
+
+def test_retrieval_cache_reuses_results(mock_retrieval_engine):
+    """Test that a repeated request is served from the retrieval cache until new documents are added."""
+    from backend.src.RAG.semantic_cache import SemanticRetrievalCache
+
+    mock_retrieval_engine.retrieval_cache = SemanticRetrievalCache()
+    mock_retrieval_engine.embeddings = MagicMock()
+    mock_retrieval_engine.embeddings.embed_documents.return_value = [[1.0, 0.0], [0.9, 0.1]]
+    doc = Document(page_content="Chunk about AI.", metadata={"link": "https://paperA.com"})
+    mock_retrieval_engine.vector_store.similarity_search_by_vector_with_relevance_scores = MagicMock(return_value=[(doc, 0.5)])
+
+    first = mock_retrieval_engine.retrieve(["AI", "artificial intelligence"])
+    second = mock_retrieval_engine.retrieve(["AI", "artificial intelligence"])
+
+    assert first == second
+    assert mock_retrieval_engine.vector_store.similarity_search_by_vector_with_relevance_scores.call_count == 2, "Expected one search per query of the first request"
+
+    mock_retrieval_engine.split_and_add_documents([Document(page_content="New abstract.", metadata={"link": "https://paperB.com"})])
+    mock_retrieval_engine.retrieve(["AI", "artificial intelligence"])
+
+    assert mock_retrieval_engine.vector_store.similarity_search_by_vector_with_relevance_scores.call_count == 4
+
+def test_retrieval_orders_documents_by_relevance_score(mock_retrieval_engine):
+    """Test that the search by embedding returns the documents with the highest relevance score first."""
+    doc1 = Document(page_content="Deep Learning research", metadata={"title": "DL Paper", "link": "https://dl.com"})
+    doc2 = Document(page_content="Neural Networks explained", metadata={"title": "NN Paper", "link": "https://nn.com"})
+    mock_retrieval_engine.vector_store.similarity_search_by_vector_with_relevance_scores = MagicMock(return_value=[(doc2, 0.4), (doc1, 0.8)])
+
+    retrieved_docs = mock_retrieval_engine.search(["Deep Learning"], query_embeddings=[[1.0, 0.0]])
+
+    assert [doc["metadata"]["title"] for doc in retrieved_docs] == ["DL Paper", "NN Paper"]
+
+def test_retrieval_cache_invalidated_by_other_processes(populated_retrieval_engine):
+    """Test that records added to the collection by another process invalidate the retrieval cache."""
+    from backend.src.RAG.semantic_cache import SemanticRetrievalCache
+
+    engine = populated_retrieval_engine
+    engine.retrieval_cache = SemanticRetrievalCache()
+    engine.embeddings = MagicMock()
+    engine.embeddings.embed_documents.return_value = [[0.1, 0.2, 0.3]]
+    engine.search = MagicMock(return_value=[{"page_content": "Content A", "metadata": {}}])
+
+    engine.retrieve(["AI"])
+    engine.retrieve(["AI"])
+    assert engine.search.call_count == 1
+
+    # Written through the collection, so the local counter of the engine does not change
+    engine.vector_store._collection.add(ids=["3"], embeddings=[[0.7, 0.8, 0.9]], documents=["Content C"], metadatas=[{"link": "https://c.com"}])
+    engine.retrieve(["AI"])
+    assert engine.search.call_count == 2
+
+@pytest.fixture
+def populated_retrieval_engine(tmp_path, monkeypatch):
+    """Fixture to create a RetrievalEngine (in a temporary directory) whose collection holds records with known embeddings."""
+    from backend.src.RAG.retrieval_engine import RetrievalEngine
+
+    from chromadb.api.client import SharedSystemClient
+
+    monkeypatch.chdir(tmp_path)
+    SharedSystemClient.clear_system_cache() # Clients are cached by the (relative) path of the database
+    engine = RetrievalEngine(openai_api_key="fake_key")
+    engine.vector_store._collection.add(
+                                        ids=["1", "2"],
+                                        embeddings=[[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]],
+                                        documents=["Content A", "Content B"],
+                                        metadatas=[{"link": "https://a.com"}, {"link": "https://b.com"}]
+                                        )
+    return engine
+
+def test_rebuild_index_applies_parameters(populated_retrieval_engine):
+    """Test that rebuilding keeps the records and applies the graph parameters."""
+    populated_retrieval_engine.index_config["M"] = 32
+    assert not populated_retrieval_engine.check_index_config()
+
+    assert populated_retrieval_engine.rebuild_index() == 2
+    assert populated_retrieval_engine.vector_store._collection.count() == 2
+    assert populated_retrieval_engine.vector_store._collection.metadata["hnsw:M"] == 32
+    assert populated_retrieval_engine.check_index_config()
+
+def test_rebuild_index_keeps_live_collection_on_failure(populated_retrieval_engine, monkeypatch):
+    """Test that a failed import leaves the live collection untouched."""
+    def failing_import(vector_store, snapshot_dir):
+        raise ValueError("Corrupted snapshot")
+
+    monkeypatch.setattr("backend.src.RAG.retrieval_engine.import_snapshot", failing_import)
+    with pytest.raises(ValueError, match="Corrupted snapshot"):
+        populated_retrieval_engine.rebuild_index()
+    assert populated_retrieval_engine.vector_store._collection.count() == 2
+
+def test_rebuild_index_keeps_writes_made_during_the_rebuild(populated_retrieval_engine, monkeypatch, tmp_path):
+    """Test that records written while the index is rebuilt wait for the swap and end up in the rebuilt collection."""
+    import threading
+    import time
+    from backend.src.RAG import retrieval_engine as retrieval_engine_module
+
+    other_store = populated_retrieval_engine.create_vector_store(collection_name="other")
+    other_store._collection.add(ids=["3"], embeddings=[[0.7, 0.8, 0.9]], documents=["Content C"], metadatas=[{"link": "https://c.com"}])
+    snapshot_dir = str(tmp_path / "new_records")
+    retrieval_engine_module.export_snapshot(other_store, output_dir=snapshot_dir)
+
+    writer = threading.Thread(target=populated_retrieval_engine.import_snapshot, args=(snapshot_dir,))
+    original_import = retrieval_engine_module.import_snapshot
+    def import_during_write(vector_store, snapshot_dir):
+        if not writer.is_alive() and vector_store is not populated_retrieval_engine.vector_store:
+            writer.start()
+            time.sleep(0.2)
+            assert writer.is_alive(), "The write should wait for the rebuild"
+        return original_import(vector_store, snapshot_dir=snapshot_dir)
+
+    monkeypatch.setattr(retrieval_engine_module, "import_snapshot", import_during_write)
+    assert populated_retrieval_engine.rebuild_index() == 2
+    writer.join(timeout=5)
+
+    assert populated_retrieval_engine.vector_store._collection.count() == 3
+
+def test_check_index_config_ignores_search_parameters(populated_retrieval_engine):
+    """Test that search time parameters do not require a rebuild."""
+    populated_retrieval_engine.index_config["ef_search"] = 500
+    assert populated_retrieval_engine.check_index_config()
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from benchmarks.retrieval_benchmark import generate_corpus, exact_search, run_benchmark
+
+def test_generate_corpus_is_deterministic():
+    """Test that the same seed always produces the same embeddings."""
+    first = np.concatenate([embeddings for _, embeddings in generate_corpus(100, dim=8, seed=42, batch_size=30)])
+    second = np.concatenate([embeddings for _, embeddings in generate_corpus(100, dim=8, seed=42, batch_size=50)])
+
+    assert first.shape == (100, 8)
+    assert np.array_equal(first, second)
+
+def test_exact_search():
+    """Test that exact search returns the nearest neighbours in order."""
+    corpus = np.array([[0.0, 0.0], [1.0, 0.0], [5.0, 5.0]], dtype=np.float32)
+    queries = np.array([[0.9, 0.0]], dtype=np.float32)
+
+    neighbours = exact_search(corpus, queries, k=2)
+
+    assert neighbours.tolist() == [[1, 0]]
+
+@pytest.mark.slow
+def test_run_benchmark_report():
+    """Test that a small benchmark run reports all the metrics."""
+    result = run_benchmark(corpus_size=500, backend="ephemeral", dim=16, k=5, num_queries=10)
+
+    assert result["corpus_size"] == 500
+    assert 0.0 <= result["recall_at_5"] <= 1.0
+    assert result["query_p50_ms"] <= result["query_p99_ms"]
+    assert result["insert_throughput"] > 0
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from backend.src.RAG.semantic_cache import SemanticRetrievalCache
+
+def normalise(vector):
+    """Normalises a vector to unit length."""
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+@pytest.fixture
+def cache():
+    """Fixture to create a small retrieval cache."""
+    return SemanticRetrievalCache(max_size=2, similarity_threshold=0.9)
+
+def test_similar_query_hits(cache):
+    """Test that a query with a similar embedding returns the cached results."""
+    results = [{"page_content": "Paper A", "metadata": {"link": "https://paperA.com"}}]
+    cache.insert(normalise([1.0, 0.0]), filter_key="null", corpus_version=0, results=results)
+
+    assert cache.lookup(normalise([1.0, 0.1]), filter_key="null", corpus_version=0) == results
+    assert cache.lookup(normalise([0.0, 1.0]), filter_key="null", corpus_version=0) is None
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+def test_different_filter_misses(cache):
+    """Test that cached results are only reused for the same metadata filter."""
+    cache.insert(normalise([1.0, 0.0]), filter_key="null", corpus_version=0, results=[{"page_content": "Paper A"}])
+
+    assert cache.lookup(normalise([1.0, 0.0]), filter_key='{"year": 2023}', corpus_version=0) is None
+
+def test_corpus_version_invalidates(cache):
+    """Test that all entries are dropped when the corpus changes."""
+    cache.insert(normalise([1.0, 0.0]), filter_key="null", corpus_version=0, results=[{"page_content": "Paper A"}])
+
+    assert cache.lookup(normalise([1.0, 0.0]), filter_key="null", corpus_version=1) is None
+    assert cache.get_stats()["invalidations"] == 1
+    assert cache.get_stats()["size"] == 0
+
+def test_least_recently_used_is_evicted(cache):
+    """Test that the least recently used entry is evicted when the cache is full."""
+    cache.insert(normalise([1.0, 0.0]), filter_key="null", corpus_version=0, results=[{"page_content": "Paper A"}])
+    cache.insert(normalise([0.0, 1.0]), filter_key="null", corpus_version=0, results=[{"page_content": "Paper B"}])
+    cache.lookup(normalise([1.0, 0.0]), filter_key="null", corpus_version=0) # Paper A is now the most recently used
+    cache.insert(normalise([-1.0, 0.0]), filter_key="null", corpus_version=0, results=[{"page_content": "Paper C"}])
+
+    assert cache.lookup(normalise([0.0, 1.0]), filter_key="null", corpus_version=0) is None
+    assert cache.lookup(normalise([1.0, 0.0]), filter_key="null", corpus_version=0) == [{"page_content": "Paper A"}]
+    assert cache.get_stats()["evictions"] == 1
+
+def test_cached_results_are_copied(cache):
+    """Test that modifying returned results does not modify the cache."""
+    cache.insert(normalise([1.0, 0.0]), filter_key="null", corpus_version=0, results=[{"page_content": "Paper A"}])
+    cache.lookup(normalise([1.0, 0.0]), filter_key="null", corpus_version=0)[0]["page_content"] = "Changed"
+
+    assert cache.lookup(normalise([1.0, 0.0]), filter_key="null", corpus_version=0) == [{"page_content": "Paper A"}]
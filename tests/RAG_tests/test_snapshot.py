@@ -0,0 +1,63 @@
+import json
+import os
+import numpy as np
+import pytest
+from langchain_chroma import Chroma
+
+from backend.src.RAG.snapshot import export_snapshot, import_snapshot, load_manifest, RECORDS_FILE, SNAPSHOT_FORMAT_VERSION
+
+@pytest.fixture
+def populated_store(tmp_path):
+    """Fixture to create a Chroma store containing records with known embeddings."""
+    vector_store = Chroma(collection_name="source_collection", persist_directory=str(tmp_path / "source_db"))
+    vector_store._collection.add(
+                                ids=["1", "2", "3"],
+                                embeddings=[[0.1, 0.2, 0.3], [0.4, 0.5, 0.6], [0.7, 0.8, 0.9]],
+                                documents=["Content A", "Content B", "Content C"],
+                                metadatas=[{"link": "https://a.com"}, {"link": "https://b.com"}, {"link": "https://c.com"}]
+                                )
+    return vector_store
+
+def test_export_snapshot(populated_store, tmp_path):
+    """Test that exporting writes a versioned manifest with the correct record count."""
+    snapshot_dir = str(tmp_path / "snapshot")
+
+    manifest = export_snapshot(populated_store, output_dir=snapshot_dir, batch_size=2)
+
+    assert manifest["format_version"] == SNAPSHOT_FORMAT_VERSION
+    assert manifest["num_records"] == 3
+    assert manifest["embedding_dim"] == 3
+    assert load_manifest(snapshot_dir) == manifest
+
+def test_export_snapshot_twice_raises(populated_store, tmp_path):
+    """Test that an existing snapshot is never overwritten."""
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(populated_store, output_dir=snapshot_dir)
+
+    with pytest.raises(FileExistsError):
+        export_snapshot(populated_store, output_dir=snapshot_dir)
+
+def test_import_snapshot_round_trip(populated_store, tmp_path):
+    """Test that a snapshot can be imported into a fresh store with identical records."""
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(populated_store, output_dir=snapshot_dir)
+
+    fresh_store = Chroma(collection_name="fresh_collection", persist_directory=str(tmp_path / "fresh_db"))
+    num_records = import_snapshot(fresh_store, snapshot_dir=snapshot_dir, batch_size=2)
+
+    assert num_records == 3
+    records = fresh_store._collection.get(ids=["2"], include=["embeddings", "documents", "metadatas"])
+    assert records["documents"] == ["Content B"]
+    assert records["metadatas"] == [{"link": "https://b.com"}]
+    assert np.allclose(records["embeddings"][0], [0.4, 0.5, 0.6])
+
+def test_import_corrupted_snapshot_raises(populated_store, tmp_path):
+    """Test that a checksum mismatch is detected before importing."""
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(populated_store, output_dir=snapshot_dir)
+    with open(os.path.join(snapshot_dir, RECORDS_FILE), "w") as f:
+        json.dump({"ids": [], "documents": [], "metadatas": []}, f)
+
+    fresh_store = Chroma(collection_name="fresh_collection", persist_directory=str(tmp_path / "fresh_db"))
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        import_snapshot(fresh_store, snapshot_dir=snapshot_dir)
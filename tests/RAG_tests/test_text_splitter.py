@@ -0,0 +1,67 @@
+import pytest
+from langchain_core.documents import Document
+
+from backend.src.RAG.text_splitter import TokenTextSplitter
+
+@pytest.fixture
+def text_splitter():
+    """Fixture to create a TokenTextSplitter with a small chunk size."""
+    return TokenTextSplitter(chunk_size=20, chunk_overlap=8)
+
+def test_invalid_overlap():
+    """Test that the overlap must be smaller than the chunk size."""
+    with pytest.raises(ValueError):
+        TokenTextSplitter(chunk_size=10, chunk_overlap=10)
+
+def test_split_sentences(text_splitter):
+    """Test that text is split on sentence-ending punctuation."""
+    sentences = text_splitter.split_sentences("Transformers work well. Do they scale? Yes!  ")
+    assert sentences == ["Transformers work well.", "Do they scale?", "Yes!"]
+
+def test_chunks_respect_token_limit(text_splitter):
+    """Test that every chunk fits into the chunk size (in tokens)."""
+    text = " ".join(f"Sentence number {i} is about neural networks." for i in range(20))
+    doc = Document(page_content=text, metadata={"title": "Paper A", "link": "https://paperA.com"})
+
+    chunks = text_splitter.split_documents([doc])
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.metadata["num_tokens"] <= text_splitter.chunk_size
+        assert len(text_splitter.encoding.encode(chunk.page_content)) <= text_splitter.chunk_size + 2 # Joining spaces
+        assert chunk.metadata["link"] == "https://paperA.com"
+    assert [chunk.metadata["chunk_index"] for chunk in chunks] == list(range(len(chunks)))
+
+def test_chunks_overlap():
+    """Test that consecutive chunks share their boundary sentence."""
+    text_splitter = TokenTextSplitter(chunk_size=30, chunk_overlap=10)
+    text = " ".join(f"Sentence number {i} is about neural networks." for i in range(6))
+    doc = Document(page_content=text, metadata={"link": "https://paperA.com"})
+
+    chunks = text_splitter.split_documents([doc])
+
+    first_chunk_last_sentence = text_splitter.split_sentences(chunks[0].page_content)[-1]
+    assert chunks[1].page_content.startswith(first_chunk_last_sentence)
+
+def test_long_sentence_is_split(text_splitter):
+    """Test that a sentence longer than the chunk size is split on token boundaries."""
+    doc = Document(page_content="word " * 100, metadata={"link": "https://paperA.com"})
+
+    chunks = text_splitter.split_documents([doc])
+
+    assert len(chunks) > 1
+    assert all(chunk.metadata["num_tokens"] <= text_splitter.chunk_size for chunk in chunks)
+
+def test_batch_split_and_stats(text_splitter):
+    """Test that several documents are split in one call and statistics are reported."""
+    docs = [
+        Document(page_content="A short abstract.", metadata={"link": "https://paperA.com"}),
+        Document(page_content="Another short abstract. With two sentences.", metadata={"link": "https://paperB.com"})
+    ]
+
+    chunks = text_splitter.split_documents(docs)
+
+    assert [chunk.metadata["link"] for chunk in chunks] == ["https://paperA.com", "https://paperB.com"]
+    assert text_splitter.last_stats["num_documents"] == 2
+    assert text_splitter.last_stats["num_chunks"] == 2
+    assert text_splitter.last_stats["total_tokens"] == sum(chunk.metadata["num_tokens"] for chunk in chunks)
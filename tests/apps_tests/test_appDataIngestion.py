@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import status
@@ -57,3 +58,30 @@ def test_data_ingestion_exception_integration(monkeypatch):
     response = client.post(ENDPOINT_URLS['data_ingestion']['path'], json=payload)
     # Expect a 500 Internal Server Error.
     assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+def test_data_ingestion_stream_integration(monkeypatch):
+    # Override the pipeline to stream two processed entries.
+    monkeypatch.setattr(
+        ingestion_app.data_pipeline,
+        "run_stream",
+        lambda user_queries: ({"title": f"processed {title}"} for title in ["entry1", "entry2"])
+    )
+
+    payload = {"user_queries": ["query1", "query2"]}
+    response = client.post(ENDPOINT_URLS['data_ingestion']['additional_paths']['stream'], json=payload)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    # One JSON entry per line.
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"title": "processed entry1"}, {"title": "processed entry2"}]
+
+def test_data_ingestion_stream_exception_integration(monkeypatch):
+    # Errors while fetching are reported before the stream starts.
+    def run_stream_error(user_queries):
+        yield dummy_run_error(user_queries)
+
+    monkeypatch.setattr(ingestion_app.data_pipeline, "run_stream", run_stream_error)
+
+    payload = {"user_queries": ["query1", "query2"]}
+    response = client.post(ENDPOINT_URLS['data_ingestion']['additional_paths']['stream'], json=payload)
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -30,7 +30,7 @@ def mock_verification():
 @pytest.fixture
 def mock_query_generator():
     """Mock query_generator"""
-    with patch("backend.apps.app_retrieval.ResearchQueryGenerator.generate", return_value=["query1", "query2"]):
+    with patch("backend.apps.app_retrieval.ResearchQueryGenerator.agenerate", return_value=["query1", "query2"]):
         yield
 
 @pytest.fixture
@@ -82,7 +82,7 @@ def test_retrieve_documents_unauthorized(mock_auth, mock_query_generator, mock_s
 
 def test_retrieve_documents_query_generation_error(mock_auth,mock_query_generator, mock_fast_pipeline,mock_verification):
     """Test when query generation fails"""
-    with patch("backend.apps.app_retrieval.query_generator.generate", return_value="ERROR"):
+    with patch("backend.apps.app_retrieval.query_generator.agenerate", return_value="ERROR"):
         headers = {"Authorization": "Bearer fake_token"}
         request_payload = {"user_query": "What is AI?", "mode": "fast"}
 
@@ -113,3 +113,15 @@ def test_retrieve_documents_internal_server_error(mock_auth,mock_query_generator
 
         assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
         assert "Test error" in response.json()["detail"]
+
+def test_wait_for_indexing_times_out(monkeypatch):
+    """Test that a request stops waiting for a stalled indexing and serves what is already indexed."""
+    from backend.apps import app_retrieval
+    from backend.src.RAG.indexing_queue import IndexingTicket
+
+    monkeypatch.setitem(app_retrieval.INDEXING_QUEUE_CONFIG, "wait_timeout", 0.01)
+    ticket = IndexingTicket(num_docs=1) # Never committed
+
+    assert app_retrieval.wait_for_indexing(ticket) is False
+    ticket.set_done()
+    assert app_retrieval.wait_for_indexing(ticket) is True
@@ -77,7 +77,7 @@ def test_llm_inference_missing_data(mock_auth,mock_verification):
 
 def test_llm_inference_internal_error(mock_auth,mock_verification):
     """Test LLM inference when an internal server error occurs"""
-    with patch("backend.src.RAG.query_responder.QueryResponder.generate_answer", side_effect=Exception("Test error")):
+    with patch("backend.src.RAG.query_responder.QueryResponder.agenerate_answer", side_effect=Exception("Test error")):
     
         headers = {"Authorization": f"Bearer test"}
         request_payload = {
@@ -97,5 +97,27 @@ def test_llm_inference_internal_error(mock_auth,mock_verification):
         assert response.status_code == 500
         assert "Test error" in response.json()["detail"]
 
+def test_llm_inference_batch(mock_auth,mock_verification):
+    """Test batch LLM inference returns one result per question, including failures"""
+    results = [{"answer": "AI is artificial intelligence", "error": None}, {"answer": None, "error": "Timed out after 1 seconds"}]
+    with patch("backend.src.RAG.query_responder.QueryResponder.agenerate_answers_batch", return_value=results) as mock_batch:
+
+        headers = {"Authorization": f"Bearer test"}
+        request_payload = {
+            "requests": [
+                {"user_query": "What is AI?", "responses": []},
+                {"user_query": "What is ML?", "responses": []}
+            ],
+            "timeout": 1
+        }
+
+        response = client.post("/llm_inference/batch", json=request_payload, headers=headers)
+
+        assert response.status_code == 200
+        assert response.json() == {"answers": results}
+        requests = mock_batch.call_args.kwargs["requests"]
+        assert [request["user_query"] for request in requests] == ["What is AI?", "What is ML?"]
+        assert all(request["session_id"] is None for request in requests)
+
 if __name__ == "__main__":
     pytest.main()
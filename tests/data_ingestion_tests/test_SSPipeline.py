@@ -44,6 +44,7 @@ dummy_entries = [
         "paper_link": "https://www.semanticscholar.org/paper/1",
         "citationCount": 10,
         "influentialCitationCount": 5,
+        "source": "semantic_scholar",
     }
 ]
 
@@ -73,12 +74,13 @@ def test_get_entries_success(monkeypatch):
     from backend.src.data_ingestion.semantic_scholar import ss_pipeline as pipeline_module
 
     # Fake fetch_all function that simulates a successful API call.
-    def fake_fetch_all(search_query, limit, max_results, api_key):
+    def fake_fetch_all(search_query, limit, max_results, api_key, start=0):
         # Verify that the pipeline passes the expected parameters.
         assert search_query == "machine learning"
         assert limit == 50
         assert max_results == 100
         assert api_key == "dummy_api_key"
+        assert start == 0
         return dummy_semantic_json
 
     # Fake parse function that returns our dummy entries.
@@ -102,7 +104,7 @@ def test_get_entries_empty(monkeypatch):
     """
     from backend.src.data_ingestion.semantic_scholar import ss_pipeline as pipeline_module
 
-    def fake_fetch_all(search_query, limit, max_results, api_key):
+    def fake_fetch_all(search_query, limit, max_results, api_key, start=0):
         # Simulate an empty response.
         return {"data": []}
 
@@ -160,6 +160,7 @@ def test_parse_papers_single_entry():
     assert isinstance(entry["authors"], list)
     # Ensure the summary is stripped.
     assert entry["summary"] == "This is a sample summary."
+    assert entry["source"] == "arxiv"
 
 def test_parse_papers_author_dict():
     # Test where the author element is a dict (not a list) and should be converted.
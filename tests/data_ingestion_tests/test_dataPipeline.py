@@ -46,8 +46,7 @@ def mock_data_pipeline(monkeypatch):
     Fixture that returns a DataPipeline instance with its dependencies mocked.
     This includes:
       - data_processing_pipeline (and its text_preprocessor)
-      - arxiv_data_ingestion_pipeline
-      - ss_data_ingestion_pipeline
+      - the ingestion pipelines of the arXiv and Semantic Scholar sources
     """
     pipeline = DataPipeline()
 
@@ -62,11 +61,9 @@ def mock_data_pipeline(monkeypatch):
     pipeline.text_preprocessor.remove_newlines.side_effect = ["mocked_newlines_removed", "mocked_newlines_removed"]
     pipeline.text_preprocessor.remove_stopwords.return_value = "mocked_stopwords_removed"
 
-    # Mock the ingestion pipelines.
-    mock_arxiv_pipeline = MagicMock()
-    mock_ss_pipeline = MagicMock()
-    pipeline.arxiv_data_ingestion_pipeline = mock_arxiv_pipeline
-    pipeline.ss_data_ingestion_pipeline = mock_ss_pipeline
+    # Mock the ingestion pipelines of the sources.
+    pipeline.sources["arxiv"].pipeline = MagicMock()
+    pipeline.sources["semantic_scholar"].pipeline = MagicMock()
 
     # Set max_total_entries for predictable iteration.
     pipeline.max_total_entries = 3
@@ -143,7 +140,7 @@ def test_select_entries(mock_data_pipeline, monkeypatch):
     # Patch numpy.random.choice with our custom fake_choice.
     monkeyatch_patch = patch("numpy.random.choice", side_effect=fake_choice)
     with monkeyatch_patch:
-        selected = mock_data_pipeline.select_entries(all_arxiv_entries, all_ss_entries, num_user_queries)
+        selected = mock_data_pipeline.select_entries({"arxiv": all_arxiv_entries, "semantic_scholar": all_ss_entries}, num_user_queries)
     # We expect 3 entries.
     assert len(selected) == 3
     for entry in selected:
@@ -153,18 +150,18 @@ def test_retrieve_documents(mock_data_pipeline):
     """
     Test that retrieve_documents calls the ingestion pipelines with the processed query.
     """
-    mock_data_pipeline.arxiv_data_ingestion_pipeline.fetch_entries.return_value = [{"title": "arxiv doc"}]
-    mock_data_pipeline.ss_data_ingestion_pipeline.get_entries.return_value = [{"title": "ss doc"}]
+    mock_data_pipeline.sources["arxiv"].pipeline.fetch_entries.return_value = [{"title": "arxiv doc"}]
+    mock_data_pipeline.sources["semantic_scholar"].pipeline.get_entries_page.return_value = ([{"title": "ss doc"}], False)
 
-    arxiv_docs, ss_docs = mock_data_pipeline.retrieve_documents("test query")
-    mock_data_pipeline.arxiv_data_ingestion_pipeline.fetch_entries.assert_called_once_with(
-        topic="test query", max_results=mock_data_pipeline.max_total_entries
+    documents = mock_data_pipeline.retrieve_documents("test query")
+    mock_data_pipeline.sources["arxiv"].pipeline.fetch_entries.assert_called_once_with(
+        topic="test query", max_results=mock_data_pipeline.max_total_entries, start=0
     )
-    mock_data_pipeline.ss_data_ingestion_pipeline.get_entries.assert_called_once_with(
-        topic="test query", max_results=mock_data_pipeline.max_total_entries, desired_total=mock_data_pipeline.max_total_entries
+    mock_data_pipeline.sources["semantic_scholar"].pipeline.get_entries_page.assert_called_once_with(
+        topic="test query", max_results=mock_data_pipeline.max_total_entries * mock_data_pipeline.sources["semantic_scholar"].candidates_factor,
+        desired_total=mock_data_pipeline.max_total_entries, start=0
     )
-    assert arxiv_docs == [{"title": "arxiv doc"}]
-    assert ss_docs == [{"title": "ss doc"}]
+    assert documents == {"arxiv": [{"title": "arxiv doc"}], "semantic_scholar": [{"title": "ss doc"}]}
 
 def test_run(mock_data_pipeline):
     """
@@ -173,11 +170,13 @@ def test_run(mock_data_pipeline):
     from backend.src.data_ingestion.data_pipeline import DataPipeline
     # Mock process_query to simply prepend "processed_" to the query.
     mock_data_pipeline.process_query = MagicMock(side_effect=lambda q: f"processed_{q}")
-    # Mock retrieve_documents to return dummy documents for each query.
-    mock_data_pipeline.retrieve_documents = MagicMock(side_effect=lambda q: (
-        [{"title": f"arxiv_{q}_doc"}],
-        [{"title": f"ss_{q}_doc"}]
-    ))
+    # Mock retrieve_pages to return dummy documents for each query.
+    mock_data_pipeline.retrieve_pages = MagicMock(side_effect=lambda q, **kwargs: {
+        "arxiv": ([{"title": f"arxiv_{q}_doc"}], False),
+        "semantic_scholar": ([{"title": f"ss_{q}_doc"}], False)
+    })
+    # Top-ups are covered by test_run_tops_up_shortfall
+    mock_data_pipeline.max_top_ups = 0
     # Mock select_entries to return a fixed final list.
     mock_data_pipeline.select_entries = MagicMock(return_value=[
         {"title": "final doc1"},
@@ -194,7 +193,7 @@ def test_run(mock_data_pipeline):
     result = mock_data_pipeline.run(user_queries)
 
     assert mock_data_pipeline.process_query.call_count == len(user_queries)
-    assert mock_data_pipeline.retrieve_documents.call_count == len(user_queries)
+    assert mock_data_pipeline.retrieve_pages.call_count == len(user_queries)
     mock_data_pipeline.select_entries.assert_called_once()
     mock_data_pipeline.remove_duplicate_entries.assert_called_once()
     mock_data_pipeline.data_processing_pipeline.process.assert_called_once()
@@ -206,7 +205,7 @@ def test_run_no_data(monkeypatch, mock_data_pipeline):
     The final run should return an empty list after processing.
     """
     mock_data_pipeline.process_query = MagicMock(side_effect=lambda q: f"processed_{q}")
-    mock_data_pipeline.retrieve_documents = MagicMock(return_value=([], []))
+    mock_data_pipeline.retrieve_pages = MagicMock(return_value={"arxiv": ([], False), "semantic_scholar": ([], False)})
     mock_data_pipeline.select_entries = MagicMock(return_value=[])
     mock_data_pipeline.remove_duplicate_entries = MagicMock(return_value=[])
     mock_data_pipeline.data_processing_pipeline.process.return_value = []
@@ -214,3 +213,165 @@ def test_run_no_data(monkeypatch, mock_data_pipeline):
     user_queries = ["query1", "query2"]
     result = mock_data_pipeline.run(user_queries)
     assert result == []
+
+def test_run_fetches_queries_and_sources_concurrently(mock_data_pipeline):
+    """
+    Test that run fetches all queries and sources at once, so it takes about as long as the slowest fetch.
+    """
+    import time
+
+    def slow_fetch(result):
+        def fetch(**kwargs):
+            time.sleep(0.2)
+            return [{"title": f"{result}_{kwargs['topic']}"}]
+        return fetch
+
+    mock_data_pipeline.process_query = MagicMock(side_effect=lambda q: f"processed_{q}")
+    mock_data_pipeline.sources["arxiv"].pipeline.fetch_entries.side_effect = slow_fetch("arxiv")
+    mock_data_pipeline.sources["semantic_scholar"].pipeline.get_entries_page.side_effect = lambda **kwargs: (slow_fetch("ss")(**kwargs), False)
+    mock_data_pipeline.select_entries = MagicMock(return_value=[])
+    mock_data_pipeline.data_processing_pipeline.process.return_value = []
+
+    start = time.perf_counter()
+    mock_data_pipeline.run(["query1", "query2"])
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.6 # 4 fetches of 0.2 seconds each in series would take 0.8 seconds
+    entries_by_source = mock_data_pipeline.select_entries.call_args.kwargs["entries_by_source"]
+    all_arxiv_entries, all_ss_entries = entries_by_source["arxiv"], entries_by_source["semantic_scholar"]
+    # The entries are still ordered by query
+    assert all_arxiv_entries == [[{"title": "arxiv_processed_query1"}], [{"title": "arxiv_processed_query2"}]]
+    assert all_ss_entries == [[{"title": "ss_processed_query1"}], [{"title": "ss_processed_query2"}]]
+
+def test_plan_quotas(mock_data_pipeline):
+    """
+    Test that the fetch quotas cover the final number of entries split between the sources and queries.
+    """
+    mock_data_pipeline.max_total_entries = 25
+    mock_data_pipeline.min_entries_per_query = 3
+    mock_data_pipeline.overfetch_factor = 1.2
+    mock_data_pipeline.source_weights = {"arxiv": 0.5, "semantic_scholar": 0.5}
+
+    assert mock_data_pipeline.plan_quotas(5) == {"arxiv": 3, "semantic_scholar": 3}
+    # Every query still gets at least min_entries_per_query entries
+    assert mock_data_pipeline.plan_quotas(20) == {"arxiv": 2, "semantic_scholar": 2}
+
+def test_run_tops_up_shortfall(mock_data_pipeline):
+    """
+    Test that run fetches the next page of the sources only when removing duplicates leaves too few entries.
+    """
+    mock_data_pipeline.max_total_entries = 4
+    mock_data_pipeline.min_entries_per_query = 1
+    mock_data_pipeline.overfetch_factor = 1.0
+    mock_data_pipeline.max_top_ups = 2
+    mock_data_pipeline.process_query = MagicMock(side_effect=lambda q: q)
+
+    def fetch_arxiv(topic, max_results, start):
+        # The first page only has duplicates
+        return [{"title": "duplicate"}] * max_results if start == 0 else [{"title": f"arxiv_{start + i}"} for i in range(max_results)]
+
+    mock_data_pipeline.sources["arxiv"].pipeline.fetch_entries.side_effect = fetch_arxiv
+    mock_data_pipeline.sources["semantic_scholar"].pipeline.get_entries_page.return_value = ([], False) # No results
+    mock_data_pipeline.select_entries = MagicMock(side_effect=lambda entries_by_source, num_user_queries: entries_by_source["arxiv"][0])
+    mock_data_pipeline.data_processing_pipeline.process.side_effect = lambda entries: entries
+
+    result = mock_data_pipeline.run(["query"])
+
+    assert [entry["title"] for entry in result] == ["duplicate", "arxiv_2", "arxiv_3", "arxiv_4"]
+    starts = [call.kwargs["start"] for call in mock_data_pipeline.sources["arxiv"].pipeline.fetch_entries.call_args_list]
+    assert starts == [0, 2] # One top-up, from the end of the first page
+    # Semantic Scholar had no results, so it is not fetched again
+    assert mock_data_pipeline.sources["semantic_scholar"].pipeline.get_entries_page.call_count == 1
+
+def test_run_tops_up_filtered_source(mock_data_pipeline):
+    """
+    Test that a source returning fewer entries than requested after filtering its candidates
+    is still topped up while its pages of candidates are full.
+    """
+    mock_data_pipeline.max_total_entries = 4
+    mock_data_pipeline.min_entries_per_query = 1
+    mock_data_pipeline.overfetch_factor = 1.0
+    mock_data_pipeline.max_top_ups = 2
+    mock_data_pipeline.source_weights = {"arxiv": 0.5, "semantic_scholar": 0.5}
+    mock_data_pipeline.process_query = MagicMock(side_effect=lambda q: q)
+
+    def get_ss_page(topic, max_results, desired_total, start):
+        # The first page of candidates is full, but only one of them is kept
+        return ([{"title": "S0"}], True) if start == 0 else ([{"title": "S1"}, {"title": "S2"}], False)
+
+    mock_data_pipeline.sources["arxiv"].pipeline.fetch_entries.return_value = [] # No results
+    mock_data_pipeline.sources["semantic_scholar"].pipeline.get_entries_page.side_effect = get_ss_page
+    mock_data_pipeline.data_processing_pipeline.process.side_effect = lambda entries: entries
+
+    result = mock_data_pipeline.run(["query"])
+
+    assert [entry["title"] for entry in result] == ["S0", "S1", "S2"]
+    starts = [call.kwargs["start"] for call in mock_data_pipeline.sources["semantic_scholar"].pipeline.get_entries_page.call_args_list]
+    assert starts == [0, 4] # One top-up, after the first page of candidates
+    assert mock_data_pipeline.sources["arxiv"].pipeline.fetch_entries.call_count == 1
+
+def test_select_entries_round_robin_without_duplicates(mock_data_pipeline):
+    """
+    Test that select_entries interleaves the queries and sources and never picks the same paper twice.
+    """
+    mock_data_pipeline.max_total_entries = 5
+    mock_data_pipeline.source_weights = {"arxiv": 0.5, "semantic_scholar": 0.5}
+    mock_data_pipeline.selection_seed = None
+    all_arxiv_entries = [
+        [{"title": "A1"}, {"title": "A2"}, {"title": "A3"}],
+        [{"title": "A1"}, {"title": "B2"}],  # A1 was also found by the first query
+    ]
+    all_ss_entries = [
+        [{"title": "S1"}],
+        [],
+    ]
+
+    selected = mock_data_pipeline.select_entries({"arxiv": all_arxiv_entries, "semantic_scholar": all_ss_entries}, 2)
+
+    # Round 1: query 1 (arXiv, Semantic Scholar), query 2 (arXiv, A1 skipped); round 2: arXiv quota (3) is full
+    # after A2, then the remaining slot is filled from any source
+    assert [entry["title"] for entry in selected] == ["A1", "S1", "B2", "A2", "A3"]
+
+def test_select_entries_fills_quotas_and_is_reproducible(mock_data_pipeline):
+    """
+    Test that select_entries respects the source shares and returns the same entries for the same seed.
+    """
+    mock_data_pipeline.max_total_entries = 4
+    mock_data_pipeline.source_weights = {"arxiv": 0.5, "semantic_scholar": 0.5}
+    all_arxiv_entries = [[{"title": f"A{i}"} for i in range(10)] for _ in range(2)]
+    all_ss_entries = [[{"title": f"S{q}-{i}"} for i in range(10)] for q in range(2)]
+
+    mock_data_pipeline.selection_seed = 7
+    entries_by_source = {"arxiv": all_arxiv_entries, "semantic_scholar": all_ss_entries}
+    first = mock_data_pipeline.select_entries(entries_by_source, 2)
+    second = mock_data_pipeline.select_entries(entries_by_source, 2)
+
+    assert first == second
+    assert len({entry["title"] for entry in first}) == 4
+    assert sum(entry["title"].startswith("A") for entry in first) == 2
+
+def test_run_stream_processes_entries_as_fetches_complete(mock_data_pipeline):
+    """
+    Test that run_stream processes the entries of a source while the other source is still
+    fetching, and drops duplicates as the entries arrive.
+    """
+    import threading
+
+    mock_data_pipeline.source_weights = {"arxiv": 0.5, "semantic_scholar": 0.5}
+    mock_data_pipeline.process_query = MagicMock(side_effect=lambda q: q)
+    ss_released = threading.Event()
+
+    def get_ss_entries(topic, max_results, desired_total, start):
+        assert ss_released.wait(timeout=5)
+        return [{"title": "duplicate"}, {"title": "S1"}], False
+
+    mock_data_pipeline.sources["arxiv"].pipeline.fetch_entries.return_value = [{"title": "A1"}, {"title": "duplicate"}]
+    mock_data_pipeline.sources["semantic_scholar"].pipeline.get_entries_page.side_effect = get_ss_entries
+    mock_data_pipeline.data_processing_pipeline.process_stream.side_effect = lambda entries: ({"title": f"processed {entry['title']}"} for entry in entries)
+
+    stream = mock_data_pipeline.run_stream(["query"])
+    # The arXiv entries are processed before Semantic Scholar answers
+    assert [next(stream), next(stream)] == [{"title": "processed A1"}, {"title": "processed duplicate"}]
+
+    ss_released.set()
+    assert list(stream) == [{"title": "processed S1"}]
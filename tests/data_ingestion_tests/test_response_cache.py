@@ -0,0 +1,128 @@
+import urllib.request
+import pytest
+
+from backend.src.data_ingestion import response_cache as cache_module
+from backend.src.data_ingestion.response_cache import ResponseCache, normalize_query, enable_response_cache, disable_response_cache
+from backend.src.data_ingestion.arxiv.utils import fetch_arxiv_papers
+
+@pytest.fixture
+def cache(tmp_path):
+    """Fixture to create a cache in a temporary file."""
+    cache = ResponseCache(path=str(tmp_path / "responses.db"), ttls={"arxiv": 60}, stale_ttl=60, max_size_bytes=10_000)
+    yield cache
+    cache.close()
+
+class FakeClock:
+    """Replaces time.time in the cache module."""
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        monkeypatch.setattr(cache_module.time, "time", lambda: self.now)
+
+def test_normalize_query():
+    """Test that equivalent queries share a key, but boolean operators are kept."""
+    assert normalize_query("all:Attention%20Is  All") == "all:attention is all"
+    assert normalize_query("all:a AND all:B") == "all:a AND all:b"
+
+def test_hits_are_served_from_the_cache(cache):
+    """Test that a repeated request does not fetch again, and failed fetches are not cached."""
+    calls = []
+    def fetch():
+        calls.append(1)
+        return "<feed>papers</feed>"
+
+    assert cache.fetch("arxiv", "all:attention", offset=0, limit=5, fetch_fn=fetch) == "<feed>papers</feed>"
+    assert cache.fetch("arxiv", "all:Attention ", offset=0, limit=5, fetch_fn=fetch) == "<feed>papers</feed>"
+    cache.fetch("arxiv", "all:attention", offset=5, limit=5, fetch_fn=fetch) # Another page
+    assert len(calls) == 2
+
+    def fail():
+        raise ConnectionError("arXiv is unreachable")
+    with pytest.raises(ConnectionError):
+        cache.fetch("arxiv", "all:transformers", offset=0, limit=5, fetch_fn=fail)
+    assert cache.get(cache.get_key("arxiv", "all:transformers", 0, 5)) is None
+    assert cache.get_stats()["hits"] == 1
+
+def test_stale_responses_are_returned_while_revalidating(cache, monkeypatch):
+    """Test that an expired response is returned and refreshed in the background, then fetched again once too old."""
+    clock = FakeClock(monkeypatch)
+    cache.fetch("arxiv", "all:attention", offset=0, limit=5, fetch_fn=lambda: "old")
+
+    clock.now += 90 # Expired, within the stale window
+    assert cache.fetch("arxiv", "all:attention", offset=0, limit=5, fetch_fn=lambda: "new") == "old"
+    cache.executor.shutdown(wait=True)
+    assert cache.fetch("arxiv", "all:attention", offset=0, limit=5, fetch_fn=lambda: "unused") == "new"
+
+    clock.now += 200 # Beyond the stale window
+    assert cache.fetch("arxiv", "all:attention", offset=0, limit=5, fetch_fn=lambda: "newest") == "newest"
+    assert cache.get_stats()["stale_hits"] == 1
+    assert cache.get_stats()["revalidations"] == 1
+
+def test_concurrent_misses_are_coalesced(cache):
+    """Test that concurrent misses of the same request share one fetch."""
+    import time
+    import threading
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "<feed>papers</feed>"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.fetch("arxiv", "all:attention", offset=0, limit=5, fetch_fn=fetch)))
+    first.start()
+    started.wait(timeout=5)
+    others = [threading.Thread(target=lambda: results.append(cache.fetch("arxiv", "all:Attention", offset=0, limit=5, fetch_fn=fetch))) for _ in range(3)]
+    for thread in others:
+        thread.start()
+    while cache.get_stats()["coalesced"] < 3: # The other requests wait for the running fetch
+        time.sleep(0.01)
+    release.set()
+    for thread in [first] + others:
+        thread.join()
+
+    assert results == ["<feed>papers</feed>"] * 4
+    assert len(calls) == 1
+    assert cache.get_stats()["misses"] == 1
+
+def test_least_recently_used_responses_are_evicted(cache, monkeypatch):
+    """Test that the compressed responses are kept under the size limit by evicting the least recently used."""
+    import os
+    clock = FakeClock(monkeypatch)
+    bodies = {f"all:q{i}": os.urandom(2500).hex() for i in range(3)} # Random, so barely compressible
+
+    for query, body in bodies.items():
+        clock.now += 1
+        cache.fetch("arxiv", query, offset=0, limit=5, fetch_fn=lambda body=body: body)
+    clock.now += 1
+    assert cache.fetch("arxiv", "all:q0", offset=0, limit=5, fetch_fn=lambda: "unused") == bodies["all:q0"] # q1 is now the least recently used
+
+    clock.now += 1
+    cache.fetch("arxiv", "all:q3", offset=0, limit=5, fetch_fn=lambda: os.urandom(2500).hex())
+
+    assert cache.get(cache.get_key("arxiv", "all:q1", 0, 5)) is None
+    assert cache.get(cache.get_key("arxiv", "all:q0", 0, 5)) is not None
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.get_stats()["size_bytes"] <= 10_000
+
+def test_fetch_arxiv_papers_uses_the_cache(tmp_path, monkeypatch):
+    """Test that the arXiv client only calls the API once for identical queries when the cache is enabled."""
+    calls = []
+
+    class DummyResponse:
+        def read(self):
+            return b"<feed></feed>"
+
+    def fake_urlopen(url):
+        calls.append(url)
+        return DummyResponse()
+
+    monkeypatch.setattr(urllib.request, "urlopen", fake_urlopen)
+    enable_response_cache(path=str(tmp_path / "responses.db"))
+    try:
+        assert fetch_arxiv_papers("all:attention", 0, 5) == "<feed></feed>"
+        assert fetch_arxiv_papers("all:attention", 0, 5) == "<feed></feed>"
+    finally:
+        disable_response_cache()
+    assert len(calls) == 1
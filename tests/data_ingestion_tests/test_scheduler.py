@@ -0,0 +1,123 @@
+import threading
+import time
+import pytest
+
+from backend.src.data_ingestion import scheduler as scheduler_module
+from backend.src.data_ingestion.scheduler import TokenBucket, SourceScheduler
+from backend.src.data_ingestion.sources import DataSource, DATA_SOURCES, register_source, get_source
+
+class FakeClock:
+    """Replaces time.monotonic and time.sleep in the scheduler module, sleeping advances the clock."""
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        self.sleeps = []
+        monkeypatch.setattr(scheduler_module.time, "monotonic", lambda: self.now)
+        monkeypatch.setattr(scheduler_module.time, "sleep", self.sleep)
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_token_bucket_allows_bursts_then_the_rate(monkeypatch):
+    """Test that the bucket serves a burst at once, then one request per 1 / rate seconds in arrival order."""
+    FakeClock(monkeypatch)
+    bucket = TokenBucket(rate=0.5, capacity=2)
+
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 2.0, 4.0]
+    with pytest.raises(ValueError):
+        bucket.reserve(cost=3) # Could never be served
+
+def test_token_bucket_pause(monkeypatch):
+    """Test that pausing holds back the next request even when the bucket is full."""
+    clock = FakeClock(monkeypatch)
+    bucket = TokenBucket(rate=1.0, capacity=5)
+
+    bucket.pause(10)
+    assert bucket.acquire() == 11.0
+    clock.now += 100
+    assert bucket.acquire() == 0.0 # Refilled
+
+def test_scheduler_limits_concurrency():
+    """Test that no more than max_concurrency requests of a source are in flight, across threads."""
+    scheduler = SourceScheduler()
+    scheduler.set_limits("arxiv", rate_limit=1000, burst=100, max_concurrency=2)
+    in_flight, max_in_flight = [0], [0]
+    lock = threading.Lock()
+
+    def request():
+        with scheduler.request("arxiv"):
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max_in_flight[0] == 2
+    assert scheduler.get_stats()["arxiv"]["requests"] == 6
+    assert scheduler.get_stats()["arxiv"]["in_flight"] == 0
+
+def test_scheduler_rate_limit_and_cost(monkeypatch):
+    """Test that requests wait for their cost in tokens, and sources without limits are not held back."""
+    clock = FakeClock(monkeypatch)
+    scheduler = SourceScheduler()
+    scheduler.set_limits("semantic_scholar", rate_limit=1.0, burst=2, max_concurrency=1, cost=2)
+
+    for _ in range(3):
+        with scheduler.request("semantic_scholar"):
+            pass
+    with scheduler.request("other"):
+        pass
+
+    assert clock.sleeps == [2.0, 2.0]
+    assert scheduler.get_stats() == {"semantic_scholar": {"requests": 3, "wait_seconds": 4.0, "back_offs": 0, "in_flight": 0}}
+
+def test_scheduler_waits_for_tokens_without_holding_a_slot(monkeypatch):
+    """Test that a request waiting for its tokens leaves its slot free for the requests in flight."""
+    clock = FakeClock(monkeypatch)
+    scheduler = SourceScheduler()
+    scheduler.set_limits("arxiv", rate_limit=1.0, burst=1, max_concurrency=1)
+    limiter = scheduler.limiters["arxiv"]
+    free_slots = []
+
+    def sleep(seconds):
+        free_slots.append(limiter.semaphore.acquire(blocking=False))
+        if free_slots[-1]:
+            limiter.semaphore.release()
+        clock.now += seconds
+    monkeypatch.setattr(scheduler_module.time, "sleep", sleep)
+
+    for _ in range(2):
+        with scheduler.request("arxiv"):
+            pass
+
+    assert free_slots == [True]
+
+def test_register_source(monkeypatch):
+    """Test that a registered source can be created by name and its limits are set in the shared scheduler."""
+    scheduler = SourceScheduler()
+    monkeypatch.setattr(scheduler_module, "source_scheduler", scheduler)
+    monkeypatch.setattr("backend.src.data_ingestion.sources.DATA_SOURCES", dict(DATA_SOURCES))
+
+    @register_source
+    class DummySource(DataSource):
+        name = "dummy"
+        rate_limit = 2.0
+        burst = 4
+        max_concurrency = 1
+
+        def fetch_entries(self, topic, num_entries, start=0):
+            return [{"title": f"{topic} {start + i}"} for i in range(num_entries)]
+
+    source = get_source("dummy")
+    assert source.fetch_entries("attention", 2, start=5) == [{"title": "attention 5"}, {"title": "attention 6"}]
+    assert source.get_num_records(3) == 3
+    assert scheduler.limiters["dummy"].max_concurrency == 1
+    with pytest.raises(ValueError):
+        get_source("unknown")
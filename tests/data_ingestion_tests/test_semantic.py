@@ -1,5 +1,7 @@
 import pytest
 
+from backend.src.data_ingestion import scheduler as scheduler_module
+from backend.src.data_ingestion.scheduler import SourceScheduler
 from backend.src.data_ingestion.semantic_scholar.utils_ss import (
     fetch_semantic_scholar_papers,
     fetch_all_semantic_scholar_papers,
@@ -16,6 +18,7 @@ HTTP responses and cover the following functions:
    - Tests retry logic when a 504 response is initially received and then a success.
    - Confirms that an unexpected HTTP status (e.g. 400) immediately raises an Exception.
    - Checks that after max retries with repeated 504 responses, an Exception is raised.
+   - Checks that a 429 response holds back all requests for the time given by Retry-After.
 
 2. fetch_all_semantic_scholar_papers:
    - An integration test that simulates pagination: one page with data and one empty page to break the loop.
@@ -28,14 +31,26 @@ HTTP responses and cover the following functions:
 
 # Dummy response class to simulate requests responses.
 class DummyResponse:
-    def __init__(self, status_code, json_data=None):
+    def __init__(self, status_code, json_data=None, headers=None):
         self.status_code = status_code
         self._json_data = json_data or {}
+        self.headers = headers or {}
 
     def json(self):
         return self._json_data
 
 
+@pytest.fixture
+def scheduler(monkeypatch):
+    """
+    Fixture that replaces the shared scheduler with one limiting Semantic Scholar, without actually waiting.
+    """
+    scheduler = SourceScheduler()
+    scheduler.set_limits("semantic_scholar", rate_limit=1.0, burst=1, max_concurrency=2)
+    monkeypatch.setattr(scheduler_module, "source_scheduler", scheduler)
+    monkeypatch.setattr(scheduler_module.time, "sleep", lambda seconds: None)
+    return scheduler
+
 # Fixtures for sample API responses and JSON
 @pytest.fixture
 def sample_success_response():
@@ -114,10 +129,10 @@ def test_fetch_semantic_scholar_papers_success(monkeypatch, sample_success_respo
     result = fetch_semantic_scholar_papers("test query", offset=0, limit=50)
     assert result == sample_success_response
 
-def test_fetch_semantic_scholar_papers_retry_success(monkeypatch, sample_success_response):
+def test_fetch_semantic_scholar_papers_retry_success(monkeypatch, scheduler, sample_success_response):
     """
     Test that the function handles a 504 error on the first call and then succeeds.
-    We override time.sleep to avoid actual delays.
+    The scheduler fixture avoids actual delays.
     """
     call_count = {"count": 0}
 
@@ -129,7 +144,6 @@ def test_fetch_semantic_scholar_papers_retry_success(monkeypatch, sample_success
             return DummyResponse(200, sample_success_response)
 
     monkeypatch.setattr("backend.src.data_ingestion.semantic_scholar.utils_ss.requests.get", fake_get)
-    monkeypatch.setattr("backend.src.data_ingestion.semantic_scholar.utils_ss.time.sleep", lambda x: None)
     result = fetch_semantic_scholar_papers("test query", offset=0, limit=50)
     assert result == sample_success_response
 
@@ -144,7 +158,7 @@ def test_fetch_semantic_scholar_papers_error(monkeypatch):
     with pytest.raises(Exception, match="Error fetching Semantic Scholar papers: 400"):
         fetch_semantic_scholar_papers("test query", offset=0, limit=50)
 
-def test_fetch_semantic_scholar_papers_max_retries(monkeypatch):
+def test_fetch_semantic_scholar_papers_max_retries(monkeypatch, scheduler):
     """
     Test that when the API keeps returning a 504, the function eventually raises an Exception
     after max retries.
@@ -153,11 +167,24 @@ def test_fetch_semantic_scholar_papers_max_retries(monkeypatch):
         return DummyResponse(504)
 
     monkeypatch.setattr("backend.src.data_ingestion.semantic_scholar.utils_ss.requests.get", fake_get)
-    monkeypatch.setattr("backend.src.data_ingestion.semantic_scholar.utils_ss.time.sleep", lambda x: None)
     with pytest.raises(Exception, match="Max retries exceeded. Please try again later."):
         fetch_semantic_scholar_papers("test query", offset=0, limit=50)
 
 
+def test_fetch_semantic_scholar_papers_rate_limited(monkeypatch, scheduler, sample_success_response):
+    """
+    Test that a 429 response holds back the next requests to Semantic Scholar for the time given by Retry-After.
+    """
+    responses = [DummyResponse(429, headers={"Retry-After": "30"}), DummyResponse(200, sample_success_response)]
+    monkeypatch.setattr("backend.src.data_ingestion.semantic_scholar.utils_ss.requests.get", lambda url, headers: responses.pop(0))
+
+    result = fetch_semantic_scholar_papers("test query", offset=0, limit=50)
+    assert result == sample_success_response
+    stats = scheduler.get_stats()["semantic_scholar"]
+    assert stats["requests"] == 2
+    assert stats["back_offs"] == 1
+    assert stats["wait_seconds"] >= 29 # The retry waited for the back-off
+
 # Test for fetch_all_semantic_scholar_papers (marked as integration)
 @pytest.mark.integration
 def test_fetch_all_semantic_scholar_papers(monkeypatch, sample_success_response):
@@ -99,3 +99,23 @@ def test_process_with_error(dummy_pipeline):
     # The second entry, which failed, should remain unchanged (or follow our error handling logic)
     # Here, our process() catches the exception and leaves the entry as-is.
     assert processed[1] == entries[1]
+
+def test_process_stream_yields_entries_one_at_a_time(dummy_pipeline):
+    """
+    Test that process_stream processes an entry only when the previous one has been consumed,
+    and yields failed entries unchanged.
+    """
+    consumed = []
+    def entries():
+        for i, fail in enumerate([False, True, False]):
+            consumed.append(i)
+            yield {"id": str(i), "title": f"Title {i}", "summary": f"Summary {i}", "fail": fail}
+
+    stream = dummy_pipeline.process_stream(entries())
+    first = next(stream)
+    assert first["title"] == "processed:Title 0"
+    assert consumed == [0] # The later entries are not processed yet
+
+    rest = list(stream)
+    assert rest[0]["title"] == "Title 1" # Failed, unchanged
+    assert rest[1]["title"] == "processed:Title 2"